@@ -0,0 +1,97 @@
+"""
+Time and peak memory of building a connection page, validated versus the
+constructed fast path used by find_connection
+
+    python -m benchmarks.connection_memory --page-size 500
+"""
+import argparse
+from datetime import datetime
+from time import perf_counter
+from tracemalloc import get_traced_memory, reset_peak, start, stop
+from typing import List
+
+from bson.objectid import ObjectId
+
+from vanmongo import BaseDocument, Connection, Edge, PageInfo
+from vanmongo.connection import MongoCursor, connection_types
+
+
+class Product(BaseDocument, collection="bench_products"):
+    title: str
+    description: str
+    price: int
+    tags: List[str]
+
+
+def make_nodes(count: int) -> List[Product]:
+    now = datetime.utcnow()
+    return [
+        Product(
+            _id=ObjectId(),
+            id=f"{i:010}",
+            created_at=now,
+            updated_at=now,
+            title=f"Product {i}",
+            description="A description " * 20,
+            price=i,
+            tags=[f"tag{t}" for t in range(10)],
+        )
+        for i in range(count)
+    ]
+
+
+def cursor(node: Product) -> str:
+    return MongoCursor(id=f"{node.object_id}").base64_encode()
+
+
+def validated(nodes: List[Product]):
+    Edge[Product].update_forward_refs()
+    edges = [Edge[Product](node=node, cursor=cursor(node)) for node in nodes]
+    page_info = PageInfo(has_next_page=True, has_previous_page=False)
+    return Connection[Product](edges=edges, page_info=page_info)
+
+
+def constructed(nodes: List[Product]):
+    EdgeType, ConnectionType = connection_types(Product)
+    edges = [EdgeType.construct(node=node, cursor=cursor(node)) for node in nodes]
+    page_info = PageInfo.construct(has_next_page=True, has_previous_page=False)
+    return ConnectionType.construct(edges=edges, page_info=page_info)
+
+
+def bench(name: str, build, nodes: List[Product], rounds: int):
+    build(nodes)  # Warm up caches
+
+    begin = perf_counter()
+    for _ in range(rounds):
+        build(nodes)
+    elapsed = (perf_counter() - begin) / rounds
+
+    start()
+    try:
+        reset_peak()
+        baseline, _ = get_traced_memory()
+        build(nodes)
+        _, peak = get_traced_memory()
+    finally:
+        stop()
+
+    print(
+        f"{name:>12}: {elapsed * 1000:>8.2f} ms/page, "
+        f"peak {(peak - baseline) / 1024:>8.1f} KiB/page"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--page-size", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    nodes = make_nodes(args.page_size)
+
+    bench("validated", validated, nodes, args.rounds)
+    bench("constructed", constructed, nodes, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Insert throughput and id index size of random versus sortable ids
+
+    python -m benchmarks.sortable_ids --count 10000000
+
+Requires a running MongoDB (see docker-compose.yml). The benchmark database
+is dropped before and after each run.
+"""
+import argparse
+import asyncio
+from time import perf_counter
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from vanmongo import BaseDocument, Client
+
+
+class RandomItem(BaseDocument, collection="bench_random_ids"):
+    index: int
+
+
+class SortableItem(
+    BaseDocument, collection="bench_sortable_ids", id_strategy="sortable"
+):
+    index: int
+
+
+async def bench(Document, count: int, batch_size: int):
+    items = Client().use(Document)
+
+    start = perf_counter()
+    for offset in range(0, count, batch_size):
+        size = min(batch_size, count - offset)
+        await items.create_many([{"index": offset + i} for i in range(size)])
+    elapsed = perf_counter() - start
+
+    stats = await Client().db.command("collStats", Document._collection)
+    id_index_size = stats["indexSizes"]["id"]
+
+    print(
+        f"{Document.__name__:>12}: {count / elapsed:>10.0f} docs/s, "
+        f"id index {id_index_size / 1024 / 1024:.1f} MiB, "
+        f"all indexes {stats['totalIndexSize'] / 1024 / 1024:.1f} MiB"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=10_000_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--mongo-url", default="mongodb://localhost:27017")
+    parser.add_argument("--mongo-database", default="vanmongo-benchmark")
+    args = parser.parse_args()
+
+    mongo = AsyncIOMotorClient(args.mongo_url)
+    await mongo.drop_database(args.mongo_database)
+    await Client.initialize(
+        mongo_url=args.mongo_url, mongo_database=args.mongo_database
+    )
+    try:
+        for Document in (RandomItem, SortableItem):
+            await bench(Document, args.count, args.batch_size)
+    finally:
+        await mongo.drop_database(args.mongo_database)
+        await Client.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
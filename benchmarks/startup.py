@@ -0,0 +1,74 @@
+"""
+Import time of vanmongo and time spent in Client.initialize per setup mode
+
+    python -m benchmarks.startup
+
+The initialize benchmark requires a running MongoDB (see docker-compose.yml).
+"""
+import argparse
+import asyncio
+import subprocess
+import sys
+from statistics import median
+from time import perf_counter
+
+from vanmongo import BaseDocument, Client
+
+
+def bench_import(rounds: int):
+    timings = []
+    for _ in range(rounds):
+        start = perf_counter()
+        subprocess.run([sys.executable, "-c", "import vanmongo"], check=True)
+        timings.append(perf_counter() - start)
+
+    baseline = []
+    for _ in range(rounds):
+        start = perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+        baseline.append(perf_counter() - start)
+
+    print(f"{'import':>12}: {(median(timings) - median(baseline)) * 1000:>8.1f} ms")
+
+
+async def bench_initialize(args):
+    for setup in ("eager", "background", "lazy"):
+        for index in range(args.documents):
+            type(f"Item{index}", (BaseDocument,), {"__annotations__": {"value": int}})
+
+        start = perf_counter()
+        await Client.initialize(
+            mongo_url=args.mongo_url,
+            mongo_database=args.mongo_database,
+            setup=setup,
+        )
+        initialized = perf_counter() - start
+        Client()
+        await Client.ready()
+        ready = perf_counter() - start
+
+        print(
+            f"{setup:>12}: {initialized * 1000:>8.1f} ms initialize, "
+            f"{ready * 1000:>8.1f} ms until ready"
+        )
+
+        await Client().db.client.drop_database(args.mongo_database)
+        await Client.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--documents", type=int, default=20)
+    parser.add_argument("--mongo-url", default="mongodb://localhost:27017")
+    parser.add_argument("--mongo-database", default="vanmongo-benchmark")
+    parser.add_argument("--skip-initialize", action="store_true")
+    args = parser.parse_args()
+
+    bench_import(args.rounds)
+    if not args.skip_initialize:
+        asyncio.run(bench_initialize(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import asyncio
+import os
 
 import pytest
 from async_search_client import Client as SearchClient
@@ -6,6 +7,10 @@ from pydantic import BaseModel
 from pymongo import MongoClient
 
 from vanmongo import Client
+from vanmongo.backends.memory import MemoryMongoClient, MemorySearchClient
+
+# "memory" runs without services, "mongo" against docker-compose.yml
+BACKEND = os.environ.get("VANMONGO_TEST_BACKEND", "memory")
 
 
 class TestConfig(BaseModel):
@@ -24,11 +29,15 @@ def event_loop():
 
 @pytest.fixture(scope="session")
 def test_config():
+    if BACKEND == "memory":
+        return TestConfig(mongo_url="memory://", meilisearch_url="memory://")
     return TestConfig()
 
 
 @pytest.fixture(scope="session")
 def mongo(test_config):
+    if BACKEND == "memory":
+        return MemoryMongoClient(test_config.mongo_url)
     return MongoClient(test_config.mongo_url)
 
 
@@ -37,9 +46,17 @@ def db(mongo, test_config):
     return mongo[test_config.mongo_database]
 
 
+@pytest.fixture(scope="session")
+def replica_set(mongo):
+    """Transactions are only supported by replica sets"""
+    if not mongo.admin.command("ismaster").get("setName"):
+        pytest.skip("MongoDB is not running as a replica set")
+
+
 @pytest.fixture(scope="session")
 async def search(test_config):
-    async with SearchClient(test_config.meilisearch_url) as client:
+    Search = MemorySearchClient if BACKEND == "memory" else SearchClient
+    async with Search(test_config.meilisearch_url) as client:
         yield client
 
 
@@ -62,8 +79,10 @@ async def wait_for_index(search):
 async def reset(mongo, search, test_config):
     await Client.shutdown()
 
-    # MongoDB
-    mongo.drop_database(test_config.mongo_database)
+    # MongoDB, tenant databases share the name of the database as prefix
+    for name in mongo.list_database_names():
+        if name.startswith(test_config.mongo_database):
+            mongo.drop_database(name)
 
     # meilisearch
     indexes = await search.get_indexes()
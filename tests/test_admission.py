@@ -0,0 +1,81 @@
+from asyncio import ensure_future, gather, sleep
+
+import pytest
+
+from vanmongo import AdmissionPolicy, AdmissionRejected, BaseDocument, Client
+from vanmongo.admission import AdmissionController, Limiter
+
+
+@pytest.mark.asyncio
+async def test_limiter_priorities():
+    limiter = Limiter(limit=2, batch_limit=1, max_queue=10)
+    granted = []
+
+    async def acquire(priority, name):
+        await limiter.acquire(priority)
+        granted.append(name)
+
+    await acquire("batch", "batch 1")
+    waiting_batch = ensure_future(acquire("batch", "batch 2"))
+    await acquire("interactive", "interactive 1")
+    waiting_interactive = ensure_future(acquire("interactive", "interactive 2"))
+    await sleep(0)
+    assert granted == ["batch 1", "interactive 1"]
+
+    # Waiting interactive operations are granted first
+    limiter.release("batch")
+    await waiting_interactive
+    assert granted[-1] == "interactive 2"
+
+    limiter.release("interactive")
+    await waiting_batch
+    assert granted[-1] == "batch 2"
+
+
+@pytest.mark.asyncio
+async def test_rejection():
+    controller = AdmissionController(
+        AdmissionPolicy(max_concurrency=1, max_queue=1, queue_timeout=0.01)
+    )
+
+    async with controller.admit("items"):
+        waiting = ensure_future(controller.admit("items").__aenter__())
+        await sleep(0)
+        # The queue is full
+        with pytest.raises(AdmissionRejected):
+            async with controller.admit("items"):
+                pass
+        # Waited longer than the queue timeout
+        with pytest.raises(AdmissionRejected):
+            await waiting
+
+    metrics = controller.metrics[("items", "interactive")]
+    assert metrics.admitted == 1 and metrics.rejected == 2
+
+
+@pytest.mark.asyncio
+async def test_admission(test_config):
+    class Item(BaseDocument):
+        index: int
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url,
+        mongo_database=test_config.mongo_database,
+        admission=AdmissionPolicy(max_concurrency=10, collections={"items": 1}),
+    )
+
+    client = Client()
+    items = client.use(Item)
+    created = await items.create_many([{"index": i} for i in range(5)])
+
+    async with client.admit("items"):
+        finding = gather(*(items.find_one_by_id(item.id) for item in created))
+        await sleep(0)
+    assert await finding == created
+
+    batch = Client(priority="batch").use(Item)
+    assert [item.index async for item in batch.find(batch_size=2)] == list(range(5))
+
+    metrics = client.admission_metrics
+    assert metrics[("items", "interactive")].queued == 5
+    assert metrics[("items", "batch")].admitted == 3
@@ -0,0 +1,161 @@
+from asyncio import sleep
+from datetime import timedelta
+
+import pytest
+
+from vanmongo import ArchivePolicy, BaseDocument, Client
+from vanmongo.backends.memory import AsyncMemoryCollection
+from vanmongo.ids import utcnow
+
+
+async def age(client, ids, days):
+    updated_at = utcnow() - timedelta(days=days)
+    await client.db["items"].update_many(
+        {"id": {"$in": ids}}, {"$set": {"updated_at": updated_at}}
+    )
+
+
+@pytest.mark.asyncio
+async def test_archive(test_config):
+    class Item(
+        BaseDocument,
+        sort_options=["index"],
+        archive=ArchivePolicy(after=timedelta(days=30), batch_size=2),
+    ):
+        index: int
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url, mongo_database=test_config.mongo_database
+    )
+
+    client = Client()
+    items = client.use(Item)
+    created = await items.create_many([{"index": i} for i in range(6)])
+    await age(client, [item.id for item in created[:4]], days=40)
+
+    assert await items.archive() == 4
+    assert [item.index async for item in items.find()] == [4, 5]
+    assert [item.index async for item in items.find(archived=True)] == [0, 1, 2, 3]
+    assert "sort_index" in await client.db["items_archive"].index_information()
+
+    # Reads by id fall back to the archive
+    assert await items.find_one({"id": created[0].id}) is None
+    found = await items.find_one_by_id(created[0].id)
+    assert found and found.index == 0
+    loaded = await items.load([item.id for item in created])
+    assert [item.index for item in loaded] == list(range(6))
+
+    # Connections continue into the archive after the collection
+    connection = await items.find_connection(first=3, sort="index")
+    assert [edge.node.index for edge in connection.edges] == [4, 5, 0]
+    connection = await items.find_connection(
+        first=3, after=connection.edges[-1].cursor, sort="index"
+    )
+    assert [edge.node.index for edge in connection.edges] == [1, 2, 3]
+    assert not connection.page_info.has_next_page
+
+    connection = await items.find_connection(
+        last=2, before=connection.edges[0].cursor, sort="index"
+    )
+    assert [edge.node.index for edge in connection.edges] == [5, 0]
+
+    # Updates move archived documents back
+    await items.update_one_by_id(created[1].id, {"index": 10})
+    assert [item.index async for item in items.find(sort="index")] == [4, 5, 10]
+    assert [item.index async for item in items.find(archived=True)] == [0, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_archive_in_background(test_config):
+    class Item(BaseDocument, archive=ArchivePolicy(after=timedelta(days=30))):
+        index: int
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url,
+        mongo_database=test_config.mongo_database,
+        archive_interval=0.001,
+    )
+
+    client = Client()
+    items = client.use(Item)
+    created = await items.create_many([{"index": i} for i in range(3)])
+    await age(client, [created[0].id], days=40)
+
+    for _ in range(100):
+        if await client.db["items_archive"].count_documents({}) == 1:
+            break
+        await sleep(0.001)
+    assert [item.index async for item in items.find()] == [1, 2]
+    assert [item.index async for item in items.find(archived=True)] == [0]
+
+
+@pytest.mark.asyncio
+async def test_archive_tenants_in_background(test_config):
+    class Item(BaseDocument, archive=ArchivePolicy(after=timedelta(days=30))):
+        index: int
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url,
+        mongo_database=test_config.mongo_database,
+        archive_interval=0.001,
+    )
+
+    # Moved in the tenant database
+    client = Client(tenant="acme")
+    items = client.use(Item)
+    created = await items.create_many([{"index": i} for i in range(3)])
+    await age(client, [created[0].id], days=40)
+
+    for _ in range(100):
+        if await client.db["items_archive"].count_documents({}) == 1:
+            break
+        await sleep(0.001)
+    assert [item.index async for item in items.find()] == [1, 2]
+    assert [item.index async for item in items.find(archived=True)] == [0]
+
+
+@pytest.mark.asyncio
+async def test_archive_races(test_config, monkeypatch):
+    class Item(BaseDocument, archive=ArchivePolicy(after=timedelta(days=30))):
+        index: int
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url, mongo_database=test_config.mongo_database
+    )
+
+    client = Client()
+    items = client.use(Item)
+    created = await items.create_many([{"index": i} for i in range(3)])
+    await age(client, [created[0].id], days=40)
+
+    # Archived between the read and the write of an update
+    archived = False
+
+    async def archive_first(self, *args, **kwargs):
+        nonlocal archived
+        if not archived:
+            archived = True
+            assert await items.archive() == 1
+        return self.delegate.update_one(*args, **kwargs)
+
+    monkeypatch.setattr(
+        AsyncMemoryCollection, "update_one", archive_first, raising=False
+    )
+    updated = await items.update_one_by_id(created[0].id, {"index": 10})
+    monkeypatch.undo()
+    assert updated.index == 10
+    assert (await items.find_one_by_id(created[0].id)).index == 10
+
+    # Restored as recently updated, not archived again
+    assert await items.archive() == 0
+    assert await client.db["items_archive"].count_documents({}) == 0
+
+    # An interrupted move leaves both copies, the collection's wins
+    raw = await client.db["items"].find_one({"id": created[1].id})
+    await client.db["items_archive"].insert_one({**raw, "index": -1})
+    connection = await items.find_connection(first=2)
+    assert [edge.node.index for edge in connection.edges] == [10, 1]
+    connection = await items.find_connection(first=2, after=connection.edges[-1].cursor)
+    assert [edge.node.index for edge in connection.edges] == [2]
+    assert not connection.page_info.has_next_page
+    assert (await items.find_one_by_id(created[1].id)).index == 1
@@ -0,0 +1,60 @@
+import pytest
+
+from vanmongo import BaseDocument, BatchPolicy, Client
+
+
+def test_batch_policy():
+    policy = BatchPolicy(target_bytes=10000, min_size=5, max_size=500)
+    assert policy.batch_size() == 100
+
+    policy.observe(100)
+    assert policy.batch_size() == 100
+    assert policy.batch_size("search") == 100
+
+    # Moves towards new sizes
+    policy.observe(1100)
+    assert policy.batch_size() == 33
+
+    policy.observe(1000000)
+    assert policy.batch_size() == 5
+
+    tiny = BatchPolicy(target_bytes=10000, max_size=500)
+    tiny.observe(1)
+    assert tiny.batch_size() == 500
+
+
+@pytest.mark.asyncio
+async def test_adaptive_batches(test_config):
+    class Small(BaseDocument):
+        name: str
+
+    class Large(BaseDocument, batch_policy=BatchPolicy(target_bytes=100000)):
+        name: str
+        content: str
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url, mongo_database=test_config.mongo_database
+    )
+
+    # Every document class observes its own sizes
+    assert Small._batch_policy is not Large._batch_policy
+
+    client = Client()
+    small = client.use(Small)
+    large = client.use(Large)
+    await small.create_many([{"name": f"{i}"} for i in range(20)])
+    await large.create_many(
+        [{"name": f"{i}", "content": "x" * 10000} for i in range(20)]
+    )
+
+    assert len([s async for s in small.find()]) == 20
+    assert len([s async for s in large.find()]) == 20
+
+    assert Small._batch_policy.batch_size() == 1000
+    assert Large._batch_policy.batch_size() == 10
+
+    # Partial documents are measured apart
+    Name = Large.partial("name")
+    assert len([s async for s in large.find(partial=Name)]) == 20
+    assert Large._batch_policy.batch_size("cursor:name") == 1000
+    assert Large._batch_policy.batch_size() == 10
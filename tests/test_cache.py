@@ -0,0 +1,146 @@
+from asyncio import sleep
+from typing import Any, Dict
+
+import pytest
+
+from vanmongo import BaseDocument, Client, MemoryCache, RedisCache
+
+
+# Declared at module level to be pickled by RedisCache
+class Product(BaseDocument, cache=True):
+    title: str
+
+
+class FakeRedis:
+    """Subset of the redis-py asyncio client used by RedisCache"""
+
+    def __init__(self):
+        self.values: Dict[str, Any] = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def set(self, key, value, px=None):
+        self.values[key] = value
+
+    async def incr(self, key):
+        self.values[key] = int(self.values.get(key, 0)) + 1
+        return self.values[key]
+
+
+@pytest.mark.asyncio
+async def test_memory_cache():
+    cache = MemoryCache(max_entries=2)
+    await cache.set("a", 1, ttl=60)
+    await cache.set("b", 2, ttl=60)
+    assert await cache.get("a") == 1
+
+    # Least recently used are evicted first
+    await cache.set("c", 3, ttl=60)
+    assert await cache.get("b") is None
+    assert await cache.get("a") == 1
+
+    await cache.set("d", 4, ttl=0.01)
+    await sleep(0.02)
+    assert await cache.get("d") is None
+
+    assert await cache.version("v") == 0
+    assert await cache.bump("v") == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["memory", "redis"])
+async def test_cached_results(test_config, monkeypatch, backend):
+    # Registered again, documents are cleared on shutdown
+    Client._register_document(Product)
+
+    cache = MemoryCache() if backend == "memory" else RedisCache(FakeRedis())
+    await Client.initialize(
+        mongo_url=test_config.mongo_url,
+        mongo_database=test_config.mongo_database,
+        cache=cache,
+    )
+
+    client = Client()
+    products = client.use(Product)
+    created = await products.create_many([{"title": f"p{i}"} for i in range(3)])
+
+    connection = await products.find_connection(first=2, sort="updated_at")
+    assert await products.find_one_by_id(created[0].id) == created[0]
+
+    # Served from the cache without reaching MongoDB
+    reads = 0
+    find = type(products.collection).find
+
+    def counted_find(self, *args, **kwargs):
+        nonlocal reads
+        reads += 1
+        return find(self, *args, **kwargs)
+
+    monkeypatch.setattr(type(products.collection), "find", counted_find)
+    assert await products.find_connection(first=2, sort="updated_at") == connection
+    assert reads == 0
+
+    # Writes invalidate the results of their collection
+    await sleep(0.002)  # Updated in a later millisecond, sorts last
+    updated = await products.update_one_by_id(created[0].id, {"title": "new"})
+    assert await products.find_one_by_id(created[0].id) == updated
+    connection = await products.find_connection(first=2, sort="updated_at")
+    assert reads == 1
+    assert [edge.node.title for edge in connection.edges] == ["p1", "p2"]
+
+    # Partial documents are cached as well
+    Partial = Product.partial("title")
+    connection = await products.find_connection(first=3, partial=Partial)
+    assert await products.find_connection(first=3, partial=Partial) == connection
+    assert reads == 2
+
+
+@pytest.mark.asyncio
+async def test_cache_keys_keep_types(test_config):
+    Client._register_document(Product)
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url,
+        mongo_database=test_config.mongo_database,
+        cache=MemoryCache(),
+    )
+
+    products = Client().use(Product)
+    created = await products.create_one({"title": "x"})
+    raw = await products.collection.find_one({"id": created.id})
+
+    # The hex string of the ObjectId matches nothing, it's not the cached result
+    assert await products.find_one({"_id": raw["_id"]}) == created
+    assert await products.find_one({"_id": str(raw["_id"])}) is None
+
+
+@pytest.mark.asyncio
+async def test_updates_bypass_cache(test_config):
+    # Two nodes sharing MongoDB, each with its own cache
+    caches = [MemoryCache(), MemoryCache()]
+
+    async def node(cache):
+        await Client.shutdown()
+        Client._register_document(Product)
+        await Client.initialize(
+            mongo_url=test_config.mongo_url,
+            mongo_database=test_config.mongo_database,
+            cache=cache,
+        )
+        return Client().use(Product)
+
+    products = await node(caches[0])
+    created = await products.create_one({"title": "x"})
+    assert (await products.find_one_by_id(created.id)).title == "x"
+
+    products = await node(caches[1])
+    await products.update_one_by_id(created.id, {"title": "y"})
+
+    # The first node still caches "x", its update is diffed against "y"
+    products = await node(caches[0])
+    assert (await products.find_one_by_id(created.id)).title == "x"
+    updated = await products.update_one_by_id(created.id, {"title": "x"})
+    assert updated.title == "x"
+    raw = await products.collection.find_one({"id": created.id})
+    assert raw["title"] == "x"
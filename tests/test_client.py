@@ -1,3 +1,5 @@
+import subprocess
+import sys
 from typing import Optional
 
 import pytest
@@ -118,3 +120,35 @@ async def test_multiple_documents(test_config):
     # Make sure they are in the correct collections
     assert await client.db.products.find_one({"id": product.id}) is not None
     assert await client.db.orders.find_one({"id": order.id}) is not None
+
+
+def test_lazy_imports():
+    modules = subprocess.run(
+        [sys.executable, "-c", "import sys, vanmongo; print(' '.join(sys.modules))"],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.split()
+
+    assert "aiostream" not in modules
+    assert "async_search_client" not in modules
+    assert "motor" not in modules
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("setup", ["background", "lazy"])
+async def test_deferred_setup(db, test_config, setup):
+    class Item(BaseDocument):
+        pass
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url,
+        mongo_database=test_config.mongo_database,
+        setup=setup,
+    )
+
+    items = Client().use(Item)
+    await Client.ready()
+
+    assert "id" in db[Item._collection].index_information()
+    assert await items.find_one({}) is None
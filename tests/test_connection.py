@@ -1,8 +1,10 @@
+from datetime import datetime
 from typing import Any, List
 
 import pytest
 
 from vanmongo import BaseDocument, Client, Connection
+from vanmongo.connection import MongoCursor, connection_types
 
 
 def extract_nodes(connection: Connection[Any]):
@@ -52,6 +54,13 @@ async def test_simple_connection(test_config):
     assert extract_nodes(first_page) == fixture[:10]
     assert_page_info(first_page, has_next_page=True)
 
+    # Parametrized models are reused
+    EdgeType, ConnectionType = connection_types(Item)
+    assert type(first_page) is ConnectionType
+    assert type(first_page.edges[0]) is EdgeType
+    validated = ConnectionType(edges=first_page.edges, page_info=first_page.page_info)
+    assert validated == first_page
+
     second_page = await items.find_connection(
         first=10, after=extract_last_cursor(first_page)
     )
@@ -77,6 +86,39 @@ async def test_simple_connection(test_config):
     assert_page_info(before_last_page, has_next_page=True, has_previous_page=True)
 
 
+def test_datetime_cursor():
+    now = datetime(2021, 6, 1, 12, 30, 15, 123000)
+    cursor = MongoCursor(id="a", sort="updated_at", value=now)
+    decoded = MongoCursor.base64_decode(cursor.base64_encode())
+    assert decoded.value == now and decoded.value_type == "datetime"
+
+    # Other values are left as they are
+    cursor = MongoCursor(id="a", sort="title", value="2021-06-01T12:30:15")
+    assert MongoCursor.base64_decode(cursor.base64_encode()).value == cursor.value
+
+
+@pytest.mark.asyncio
+async def test_updated_at_connection(test_config):
+    class Item(BaseDocument):
+        index: int
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url, mongo_database=test_config.mongo_database
+    )
+
+    items = Client().use(Item)
+    fixture = [await items.create_one({"index": index}) for index in range(5)]
+
+    # Cursors compare dates with dates, not with their JSON strings
+    first_page = await items.find_connection(first=2, sort="updated_at")
+    assert extract_nodes(first_page) == fixture[:2]
+
+    second_page = await items.find_connection(
+        first=10, after=extract_last_cursor(first_page), sort="updated_at"
+    )
+    assert extract_nodes(second_page) == fixture[2:]
+
+
 @pytest.mark.asyncio
 async def test_sort_connection(test_config):
     class Item(BaseDocument, sort_options=["index"]):
@@ -175,3 +217,39 @@ async def test_search_connection(test_config, wait_for_index):
     short_page = await products.find_connection(first=10, query="pants 23")
     assert extract_nodes(short_page) == [fixture[23]]
     assert_page_info(short_page)
+
+
+@pytest.mark.asyncio
+async def test_sortable_id_connection(test_config):
+    class Item(BaseDocument, sort_options=["index"], id_strategy="sortable"):
+        index: int
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url, mongo_database=test_config.mongo_database
+    )
+
+    items = Client().use(Item)
+
+    fixture = await items.create_many([{"index": index % 5} for index in range(50)])
+
+    first_page = await items.find_connection(first=10)
+    assert extract_nodes(first_page) == fixture[:10]
+
+    second_page = await items.find_connection(
+        first=10, after=extract_last_cursor(first_page)
+    )
+    assert extract_nodes(second_page) == fixture[10:20]
+
+    before_second_page = await items.find_connection(
+        last=10, before=extract_first_cursor(second_page)
+    )
+    assert extract_nodes(before_second_page) == fixture[:10]
+
+    index_fixture = sorted(fixture, key=lambda item: (item.index, item.id))
+    index_first_page = await items.find_connection(first=10, sort="index")
+    assert extract_nodes(index_first_page) == index_fixture[:10]
+
+    index_second_page = await items.find_connection(
+        first=10, after=extract_last_cursor(index_first_page), sort="index"
+    )
+    assert extract_nodes(index_second_page) == index_fixture[10:20]
@@ -0,0 +1,104 @@
+from asyncio import sleep
+from time import monotonic
+
+import pytest
+from pydantic import BaseModel
+
+from vanmongo import AdmissionPolicy, BaseDocument, Client, Deadline, DeadlineExceeded
+from vanmongo.backends.memory import AsyncMemoryCollection
+
+
+@pytest.mark.asyncio
+async def test_deadline_run():
+    with pytest.raises(DeadlineExceeded):
+        await Deadline.after(0.01).run(sleep(1))
+
+    # Operations are not started once the deadline passed
+    operation = sleep(0)
+    with pytest.raises(DeadlineExceeded):
+        await Deadline(monotonic() - 1).run(operation)
+    assert operation.cr_frame is None
+
+    assert await Deadline.after(1).run(sleep(0, "done")) == "done"
+    assert 0 < Deadline.after(1).max_time_ms() <= 1000
+
+
+@pytest.mark.asyncio
+async def test_expired_deadline(test_config):
+    class Item(BaseDocument):
+        index: int
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url, mongo_database=test_config.mongo_database
+    )
+
+    item = await Client().use(Item).create_one({"index": 1})
+
+    items = Client(deadline=Deadline(monotonic() - 1)).use(Item)
+    with pytest.raises(DeadlineExceeded):
+        await items.find_one({"index": 1})
+    with pytest.raises(DeadlineExceeded):
+        [item async for item in items.find()]
+    with pytest.raises(DeadlineExceeded):
+        await items.load_one(item.id)
+    with pytest.raises(DeadlineExceeded):
+        await items.create_one({"index": 2})
+
+    class Context(BaseModel):
+        deadline: Deadline
+
+        class Config:
+            arbitrary_types_allowed = True
+
+    items = Client(Context(deadline=Deadline(monotonic() - 1))).use(Item)
+    with pytest.raises(DeadlineExceeded):
+        await items.find_one({"index": 1})
+
+
+@pytest.mark.asyncio
+async def test_max_time_ms(test_config, monkeypatch):
+    class Item(BaseDocument):
+        index: int
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url, mongo_database=test_config.mongo_database
+    )
+
+    max_time_ms = []
+    find = AsyncMemoryCollection.find
+
+    def spy(self, *args, **kwargs):
+        max_time_ms.append(kwargs.get("max_time_ms"))
+        return find(self, *args, **kwargs)
+
+    monkeypatch.setattr(AsyncMemoryCollection, "find", spy)
+
+    items = Client(timeout=5).use(Item)
+    await items.create_many([{"index": i} for i in range(3)])
+    assert [item.index async for item in items.find()] == [0, 1, 2]
+    assert 0 < max_time_ms[-1] <= 5000
+
+    [item async for item in Client().use(Item).find()]
+    assert max_time_ms[-1] is None
+
+
+@pytest.mark.asyncio
+async def test_admission_deadline(test_config):
+    class Item(BaseDocument):
+        index: int
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url,
+        mongo_database=test_config.mongo_database,
+        admission=AdmissionPolicy(max_concurrency=1),
+    )
+
+    client = Client()
+    item = await client.use(Item).create_one({"index": 1})
+
+    # Waiting for a slot stops at the deadline
+    async with client.admit("items"):
+        with pytest.raises(DeadlineExceeded):
+            await Client(timeout=0.01).use(Item).find_one_by_id(item.id)
+
+    assert client.admission_metrics[("items", "interactive")].rejected == 1
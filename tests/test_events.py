@@ -45,3 +45,57 @@ async def test_simple_event(test_config):
 
     item = await items.update_one_by_id(item.id, {"index": 2})
     assert called_with == [EventType.UPDATE, item, Context(admin=False)]
+
+
+@pytest.mark.asyncio
+async def test_watched_fields(test_config):
+    class Product(BaseDocument, search=["title"]):
+        title: str
+        price: int
+        stock: int
+
+    product_changes: List[Any] = []
+    stock_changes: List[Any] = []
+
+    @Product.on_change(fields=["title", "price"])
+    async def price_handler(type, product, context=None, **kwargs):
+        product_changes.append((type, kwargs["changes"], kwargs["previous"]))
+
+    def stock_handler(type, product, context=None, changes=None):
+        stock_changes.append(changes)
+
+    Product.on_change(stock_handler, fields=["stock"])
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url,
+        mongo_database=test_config.mongo_database,
+        meilisearch_url=test_config.meilisearch_url,
+    )
+
+    client = Client()
+    products = client.use(Product)
+
+    product = await products.create_one({"title": "a", "price": 1, "stock": 1})
+    assert product_changes == [(EventType.CREATE, None, None)]
+    assert stock_changes == [None]
+
+    await products.update_one_by_id(product.id, {"stock": 2})
+    assert len(product_changes) == 1
+    assert stock_changes == [None, {"stock": 2}]
+
+    await products.update_one_by_id(product.id, {"price": 2, "stock": 3})
+    assert product_changes[1] == (
+        EventType.UPDATE,
+        {"price": 2, "stock": 3},
+        {"price": 1, "stock": 2},
+    )
+
+    # Unchanged fields don't trigger anything
+    await products.update_one_by_id(product.id, {"price": 2})
+    assert len(product_changes) == 2
+    assert len(stock_changes) == 3
+
+    # Search is synced on changes of the searched fields
+    await products.update_one_by_id(product.id, {"title": "renamed"})
+    connection = await products.find_connection(query="renamed", first=1)
+    assert [edge.node.id for edge in connection.edges] == [product.id]
@@ -0,0 +1,195 @@
+from asyncio import TimeoutError, wait_for
+from datetime import timedelta
+
+import pytest
+
+from vanmongo import (
+    BaseDocument,
+    Client,
+    MemoryCheckpoint,
+    MongoCheckpoint,
+    PollPolicy,
+)
+from vanmongo.connection import MongoCursor
+from vanmongo.ids import utcnow
+
+FAST = PollPolicy(interval=0.001, max_interval=0.01, settle=0)
+
+
+def test_poll_policy():
+    poll = PollPolicy(interval=1, backoff=2, max_interval=5)
+    assert [poll.delay(n) for n in range(5)] == [1, 2, 4, 5, 5]
+
+
+@pytest.mark.asyncio
+async def test_follow(test_config):
+    class Item(BaseDocument):
+        index: int
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url, mongo_database=test_config.mongo_database
+    )
+
+    items = Client().use(Item)
+    created = await items.create_many([{"index": i} for i in range(5)])
+
+    # Pages smaller than the documents sharing the same updated_at
+    followed = items.follow(poll=FAST, batch_size=2).__aiter__()
+
+    async def next_index():
+        return (await wait_for(followed.__anext__(), 1)).index
+
+    assert [await next_index() for _ in range(5)] == [0, 1, 2, 3, 4]
+
+    await items.create_one({"index": 5})
+    assert await next_index() == 5
+
+    await items.update_one_by_id(created[1].id, {"index": 10})
+    assert await next_index() == 10
+
+    await followed.aclose()
+
+
+@pytest.mark.asyncio
+async def test_follow_sortable_ids(test_config):
+    class Item(BaseDocument, id_strategy="sortable"):
+        index: int
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url, mongo_database=test_config.mongo_database
+    )
+
+    client = Client()
+    items = client.use(Item)
+    created = await items.create_many([{"index": i} for i in range(4)])
+
+    # Ids are not unique, an id keyset would skip the copy
+    raw = await client.db[Item._collection].find_one({"id": created[1].id})
+    del raw["_id"]
+    await client.db[Item._collection].insert_one({**raw, "index": 10})
+
+    followed = items.follow(poll=FAST, batch_size=1).__aiter__()
+    indexes = [(await wait_for(followed.__anext__(), 1)).index for _ in range(5)]
+    assert indexes == [0, 1, 2, 3, 10]
+    await followed.aclose()
+
+    # Continues from cursors of connections, which hold ids
+    connection = await items.find_connection(first=2, sort="updated_at")
+    after = connection.edges[-1].cursor
+    followed = items.follow(poll=FAST, after=after).__aiter__()
+    assert [(await followed.__anext__()).index for _ in range(3)] == [2, 3, 10]
+    await followed.aclose()
+
+
+@pytest.mark.asyncio
+async def test_follow_checkpoint(test_config):
+    class Item(BaseDocument):
+        index: int
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url, mongo_database=test_config.mongo_database
+    )
+
+    client = Client()
+    items = client.use(Item)
+    await items.create_many([{"index": i} for i in range(5)])
+
+    checkpoint = MongoCheckpoint(client, "item-worker")
+
+    followed = items.follow(poll=FAST, checkpoint=checkpoint).__aiter__()
+    assert (await followed.__anext__()).index == 0
+    assert (await followed.__anext__()).index == 1
+    await followed.aclose()
+
+    # The last document was not acknowledged by asking for the next one
+    followed = items.follow(poll=FAST, checkpoint=checkpoint).__aiter__()
+    assert [(await followed.__anext__()).index for _ in range(4)] == [1, 2, 3, 4]
+    await followed.aclose()
+
+    assert await checkpoint.load() is not None
+
+
+@pytest.mark.asyncio
+async def test_follow_tailable(db, test_config):
+    class Entry(BaseDocument):
+        message: str
+
+    db.create_collection(Entry._collection, capped=True, size=1024 * 1024)
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url, mongo_database=test_config.mongo_database
+    )
+
+    entries = Client().use(Entry)
+    await entries.create_many([{"message": "a"}, {"message": "b"}])
+
+    followed = entries.follow(poll=FAST, tailable=True).__aiter__()
+
+    async def next_message():
+        return (await wait_for(followed.__anext__(), 1)).message
+
+    assert [await next_message(), await next_message()] == ["a", "b"]
+
+    await entries.create_one({"message": "c"})
+    assert await next_message() == "c"
+
+    await followed.aclose()
+
+
+@pytest.mark.asyncio
+async def test_follow_settle(test_config):
+    class Item(BaseDocument):
+        index: int
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url, mongo_database=test_config.mongo_database
+    )
+
+    client = Client()
+    items = client.use(Item)
+    await items.create_many([{"index": i} for i in range(2)])
+
+    # Recent writes may still be ahead of writes not committed yet
+    poll = PollPolicy(interval=0.001, max_interval=0.01, settle=60)
+    followed = items.follow(poll=poll).__aiter__()
+    with pytest.raises(TimeoutError):
+        await wait_for(followed.__anext__(), 0.05)
+
+    updated_at = utcnow() - timedelta(minutes=2)
+    await client.db[Item._collection].update_many(
+        {}, {"$set": {"updated_at": updated_at}}
+    )
+    followed = items.follow(poll=poll).__aiter__()
+    assert [(await followed.__anext__()).index for _ in range(2)] == [0, 1]
+    await followed.aclose()
+
+
+@pytest.mark.asyncio
+async def test_follow_tailable_checkpoint(db, test_config):
+    class Entry(BaseDocument):
+        message: str
+
+    db.create_collection(Entry._collection, capped=True, size=1024 * 1024)
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url, mongo_database=test_config.mongo_database
+    )
+
+    client = Client()
+    entries = client.use(Entry)
+    await entries.create_many([{"message": message} for message in "abc"])
+
+    checkpoint = MemoryCheckpoint()
+    followed = entries.follow(
+        poll=FAST, checkpoint=checkpoint, batch_size=2, tailable=True
+    ).__aiter__()
+    assert (await followed.__anext__()).message == "a"
+    assert (await followed.__anext__()).message == "b"
+    assert await checkpoint.load() is None
+
+    # Saved once a batch was processed, while the cursor is still tailed
+    assert (await followed.__anext__()).message == "c"
+    cursor = MongoCursor.base64_decode(await checkpoint.load())
+    entry = await client.db[Entry._collection].find_one({"message": "b"})
+    assert cursor.id == str(entry["_id"])
+    await followed.aclose()
@@ -0,0 +1,82 @@
+from datetime import datetime
+
+import pytest
+from bson.objectid import ObjectId
+
+from vanmongo import (
+    BaseDocument,
+    Client,
+    ObjectIdGenerator,
+    ShortUUIDGenerator,
+    SortableIdGenerator,
+)
+from vanmongo.ids import utcnow
+
+
+def test_utcnow(monkeypatch):
+    class Clock(datetime):
+        @classmethod
+        def utcnow(cls):
+            return datetime(2021, 6, 1, 12, 30, 15, 999600)
+
+    # Truncated to milliseconds like mongo, never rounded back to the second
+    monkeypatch.setattr("vanmongo.ids.datetime", Clock)
+    assert utcnow() == datetime(2021, 6, 1, 12, 30, 15, 999000)
+
+
+def test_shortuuid_generator():
+    generator = ShortUUIDGenerator()
+
+    ids = generator.generate_many(1000)
+    assert len(set(ids)) == 1000
+    for id in ids:
+        assert len(id) == 10
+        assert set(id) <= set(generator.alphabet)
+
+
+def test_objectid_generator():
+    ids = ObjectIdGenerator().generate_many(100)
+    assert len(set(ids)) == 100
+    assert all(len(id) == 24 for id in ids)
+
+    # Timestamped with the time of the batch
+    now = datetime(2021, 6, 1, 12, 30, 15)
+    ids = ObjectIdGenerator().generate_many(100, now)
+    assert len(set(ids)) == 100
+    assert all(ObjectId(id).generation_time.replace(tzinfo=None) == now for id in ids)
+
+
+def test_sortable_generator():
+    generator = SortableIdGenerator()
+
+    now = datetime.utcnow()
+    ids = generator.generate_many(1000, now) + generator.generate_many(1000, now)
+    assert len(set(ids)) == 2000
+    assert sorted(ids) == ids
+    assert all(len(id) == 26 for id in ids)
+
+    # Clock going back does not break the order
+    earlier = generator.generate(datetime(2000, 1, 1))
+    assert earlier > ids[-1]
+
+
+@pytest.mark.asyncio
+async def test_create_many(test_config):
+    class Item(BaseDocument, id_strategy="sortable"):
+        index: int
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url, mongo_database=test_config.mongo_database
+    )
+
+    items = Client().use(Item)
+
+    assert await items.create_many([]) == []
+
+    created = await items.create_many([{"index": index} for index in range(10)])
+    assert [item.index for item in created] == list(range(10))
+    assert len({item.created_at for item in created}) == 1
+    assert sorted(item.id for item in created) == [item.id for item in created]
+
+    assert [item async for item in items.find()] == created
+    assert await items.find_one_by_id(created[3].id) == created[3]
@@ -49,3 +49,21 @@ async def test_sort_indexes(db, test_config):
         sort_created_at=[("created_at", 1), ("_id", 1)],
         sort_index=[("index", 1), ("_id", 1)],
     )
+
+
+@pytest.mark.asyncio
+async def test_sortable_id_indexes(db, test_config):
+    class Item(BaseDocument, id_strategy="sortable"):
+        pass
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url, mongo_database=test_config.mongo_database
+    )
+
+    assert_indexes(
+        db[Item._collection],
+        id=[("id", 1)],
+        sort_updated_at=[("updated_at", 1), ("id", 1)],
+        sort_created_at=[("created_at", 1), ("id", 1)],
+        follow_updated_at=[("updated_at", 1), ("_id", 1)],
+    )
@@ -0,0 +1,116 @@
+from datetime import datetime
+
+import pytest
+from pymongo import DESCENDING, InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from vanmongo.backends.memory import (
+    AsyncMemoryMongoClient,
+    MemoryMongoClient,
+    MemorySearchClient,
+)
+
+
+@pytest.fixture
+def collection():
+    client = MemoryMongoClient("memory://test-memory")
+    client.drop_database("db")
+    return client["db"]["items"]
+
+
+def test_queries(collection):
+    collection.insert_many([{"index": i, "tags": [f"t{i % 2}"]} for i in range(6)])
+
+    def find(query, **kwargs):
+        return [raw["index"] for raw in collection.find(query, **kwargs)]
+
+    assert find({"index": 3}) == [3]
+    assert find({"index": {"$gt": 3}}) == [4, 5]
+    assert find({"index": {"$gte": 1, "$lt": 3}}) == [1, 2]
+    assert find({"index": {"$in": [1, 5, 9]}}) == [1, 5]
+    assert find({"$or": [{"index": 0}, {"index": {"$gt": 4}}]}) == [0, 5]
+    assert find({"tags": "t1"}) == [1, 3, 5]
+    assert find({"missing": None}) == list(range(6))
+    assert find({"missing": {"$exists": True}}) == []
+
+    assert find({}, sort=[("index", DESCENDING)], limit=2) == [5, 4]
+    assert [raw["index"] for raw in collection.find().sort("index").skip(4)] == [4, 5]
+    assert collection.find_one({"index": 2}, {"index": 1, "_id": 0}) == {"index": 2}
+
+
+def test_updates(collection):
+    collection.insert_one({"_id": 1, "count": 1, "updated_at": datetime(2021, 1, 1)})
+
+    result = collection.update_one(
+        {"_id": 1}, {"$set": {"a.b": 2}, "$inc": {"count": 1}}
+    )
+    assert (result.matched_count, result.modified_count) == (1, 1)
+    assert collection.find_one({"_id": 1})["a"] == {"b": 2}
+    assert collection.find_one({"_id": 1})["count"] == 2
+
+    assert collection.update_one({"_id": 2}, {"$set": {"a": 1}}).matched_count == 0
+    upserted = collection.update_one({"_id": 2}, {"$set": {"a": 1}}, upsert=True)
+    assert upserted.upserted_id == 2
+
+    with pytest.raises(DuplicateKeyError):
+        collection.insert_one({"_id": 1})
+
+    unique = collection.database["unique"]
+    unique.create_index("key", name="key", unique=True)
+    with pytest.raises(BulkWriteError):
+        unique.insert_many([{"key": 1}, {"key": 1}])
+    assert unique.count_documents({}) == 1
+
+    result = collection.bulk_write(
+        [InsertOne({"_id": 3}), UpdateOne({"_id": 3}, {"$set": {"a": 3}})]
+    )
+    assert (result.inserted_count, result.matched_count) == (1, 1)
+
+    assert collection.delete_many({"a": {"$exists": True}}).deleted_count == 3
+
+
+def test_precision(collection):
+    collection.insert_one({"_id": 1, "date": datetime(2021, 1, 1, 0, 0, 0, 123456)})
+    assert collection.find_one()["date"] == datetime(2021, 1, 1, 0, 0, 0, 123000)
+
+
+@pytest.mark.asyncio
+async def test_transaction():
+    client = AsyncMemoryMongoClient("memory://test-memory")
+    await client.drop_database("db")
+    items = client["db"]["items"]
+
+    async with await client.start_session() as session:
+        async with session.start_transaction():
+            await items.insert_one({"_id": 1})
+
+    with pytest.raises(RuntimeError):
+        async with await client.start_session() as session:
+            async with session.start_transaction():
+                await items.insert_one({"_id": 2})
+                raise RuntimeError()
+
+    assert [raw async for raw in items.find()] == [{"_id": 1}]
+
+
+@pytest.mark.asyncio
+async def test_search():
+    async with MemorySearchClient("memory://test-memory") as client:
+        index = await client.get_or_create_index("items")
+        await index.delete()
+        index = await client.get_or_create_index("items")
+
+        await index.update_documents(
+            [{"id": "a", "title": "Red pants"}, {"id": "b", "title": "Red shirt"}]
+        )
+        await index.update_documents([{"id": "a", "size": "small"}])
+
+        result = await index.search("red", attributes_to_retrieve=["id"])
+        assert result.hits == [{"id": "a"}, {"id": "b"}]
+        assert result.nb_hits == 2
+
+        assert (await index.search("red sh")).hits == [
+            {"id": "b", "title": "Red shirt"}
+        ]
+        assert (await index.search("pants small")).nb_hits == 1
+        assert (await index.search("red", offset=1, limit=1)).hits[0]["id"] == "b"
@@ -0,0 +1,139 @@
+from datetime import datetime
+from typing import List
+
+import pytest
+from bson.objectid import ObjectId
+
+from vanmongo import AdmissionPolicy, BaseDocument, Client, MemoryCheckpoint
+from vanmongo.ids import utcnow
+
+
+def declare_item():
+    class Item(BaseDocument):
+        title: str
+        tags: List[str]
+
+    @Item.migration(1)
+    def rename_name(raw):
+        raw["title"] = raw.pop("name")
+        return raw
+
+    @Item.migration(2)
+    def add_tags(raw):
+        return {**raw, "tags": []}
+
+    return Item
+
+
+async def insert_old(client, count):
+    now = utcnow()
+    await client.db["items"].insert_many(
+        [
+            {
+                "id": f"item{i}",
+                "name": f"item {i}",
+                "created_at": now,
+                "updated_at": now,
+            }
+            for i in range(count)
+        ]
+    )
+
+
+@pytest.mark.asyncio
+async def test_migrate_on_read(test_config):
+    Item = declare_item()
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url, mongo_database=test_config.mongo_database
+    )
+
+    client = Client()
+    items = client.use(Item)
+    await insert_old(client, 3)
+
+    found = await items.find_one_by_id("item0")
+    assert found and found.title == "item 0" and found.tags == []
+    assert found.schema_version == 2
+    assert [item.title async for item in items.find()] == ["item 0", "item 1", "item 2"]
+    loaded = await items.load(["item1", "item2"])
+    assert [item.title for item in loaded] == ["item 1", "item 2"]
+    Partial = Item.partial("title")
+    partials = [item async for item in items.find(partial=Partial)]
+    assert [item.title for item in partials] == ["item 0", "item 1", "item 2"]
+
+    # Reads don't write
+    raw = await client.db["items"].find_one({"id": "item0"})
+    assert raw["name"] == "item 0" and "_schema_version" not in raw
+
+    # Updates write the whole migrated document
+    await items.update_one_by_id("item0", {"tags": ["new"]})
+    raw = await client.db["items"].find_one({"id": "item0"})
+    assert raw["title"] == "item 0" and raw["tags"] == ["new"]
+    assert raw["_schema_version"] == 2
+
+    created = await items.create_one({"title": "created", "tags": []})
+    raw = await client.db["items"].find_one({"id": created.id})
+    assert raw["_schema_version"] == 2
+
+    with pytest.raises(Exception):
+        Item.migration(2)(lambda raw: raw)
+
+
+@pytest.mark.asyncio
+async def test_backfill(test_config):
+    Item = declare_item()
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url,
+        mongo_database=test_config.mongo_database,
+        admission=AdmissionPolicy(max_concurrency=4),
+    )
+
+    client = Client()
+    items = client.use(Item)
+    await insert_old(client, 5)
+    await items.update_one_by_id("item3", {"tags": ["new"]})
+
+    checkpoint = MemoryCheckpoint()
+    stats = await items.migrate(batch_size=2, max_rate=10000, checkpoint=checkpoint)
+    assert stats.documents == 4 and stats.migrated == 4
+    # Admitted as batch operations whatever the priority of the client
+    assert client.admission_metrics[("items", "batch")].admitted == 5
+
+    raws = [raw async for raw in client.db["items"].find({})]
+    assert [raw["_schema_version"] for raw in raws] == [2] * 5
+    assert [raw["title"] for raw in raws] == [f"item {i}" for i in range(5)]
+    assert raws[3]["tags"] == ["new"]
+
+    # Starts over once complete, outdated documents may land anywhere
+    assert await checkpoint.load() is None
+    stats = await items.migrate(checkpoint=checkpoint)
+    assert stats.documents == 0
+    await client.db["items"].insert_one(
+        {
+            "_id": ObjectId.from_datetime(datetime(2000, 1, 1)),
+            "id": "restored",
+            "name": "restored",
+            "created_at": utcnow(),
+            "updated_at": utcnow(),
+        }
+    )
+    stats = await items.migrate(checkpoint=checkpoint)
+    assert stats.documents == 1 and stats.migrated == 1
+
+
+@pytest.mark.asyncio
+async def test_migrations_field(test_config):
+    class Item(BaseDocument):
+        schema_version: str
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url, mongo_database=test_config.mongo_database
+    )
+
+    # The field is only added to documents declaring migrations
+    item = await Client().use(Item).create_one({"schema_version": "v1"})
+    assert item.schema_version == "v1"
+    with pytest.raises(Exception):
+        Item.migration(1)(lambda raw: raw)
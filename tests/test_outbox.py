@@ -0,0 +1,208 @@
+from asyncio import sleep
+from datetime import timedelta
+from typing import Any, List
+
+import pytest
+
+from vanmongo import BaseDocument, Client, EventType, OutboxDispatcher, RetryPolicy
+from vanmongo.outbox import OUTBOX_COLLECTION
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("transactions", [True, False])
+async def test_outbox(test_config, monkeypatch, transactions):
+    class Order(BaseDocument, outbox=True):
+        number: int
+
+    called_with: List[Any] = []
+
+    @Order.on_change
+    async def handler(type, order, context=None, changes=None):
+        called_with.append((type, order.number, changes))
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url, mongo_database=test_config.mongo_database
+    )
+
+    async def supports_transactions(self):
+        return transactions
+
+    monkeypatch.setattr(Client, "supports_transactions", supports_transactions)
+
+    client = Client()
+    orders = client.use(Order)
+    order = await orders.create_one({"number": 1})
+    await orders.update_one_by_id(order.id, {"number": 2})
+
+    # Handlers don't run on the write path
+    assert called_with == []
+    assert await client.db[OUTBOX_COLLECTION].count_documents({}) == 2
+
+    dispatcher = OutboxDispatcher(client)
+    assert await dispatcher.run_once() == 2
+    assert sorted(called_with, key=lambda c: c[1]) == [
+        (EventType.CREATE, 1, None),
+        (EventType.UPDATE, 2, {"number": 2}),
+    ]
+    assert await client.db[OUTBOX_COLLECTION].count_documents({}) == 0
+
+
+@pytest.mark.asyncio
+async def test_outbox_transaction(test_config, replica_set):
+    class Order(BaseDocument, outbox=True):
+        number: int
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url, mongo_database=test_config.mongo_database
+    )
+
+    client = Client()
+    orders = client.use(Order)
+
+    with pytest.raises(ValueError):
+        async with client.transaction():
+            await orders.create_one({"number": 1})
+            raise ValueError()
+
+    # Entries are only written with their documents
+    assert await client.db[OUTBOX_COLLECTION].count_documents({}) == 0
+
+    async with client.transaction():
+        await orders.create_one({"number": 1})
+    assert await client.db[OUTBOX_COLLECTION].count_documents({}) == 1
+
+
+@pytest.mark.asyncio
+async def test_outbox_retries(test_config):
+    class Order(BaseDocument, outbox=True):
+        number: int
+
+    failures = 2
+
+    @Order.on_change
+    async def handler(type, order, context=None):
+        nonlocal failures
+        if failures:
+            failures -= 1
+            raise ValueError("unavailable")
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url, mongo_database=test_config.mongo_database
+    )
+
+    client = Client()
+    await client.use(Order).create_one({"number": 1})
+    outbox = client.db[OUTBOX_COLLECTION]
+
+    dispatcher = OutboxDispatcher(
+        client, retry_policy=RetryPolicy(attempts=2, backoff=0.01, max_backoff=0.01)
+    )
+
+    # Leased entries are not claimed by other dispatchers
+    [entry] = await dispatcher.claim()
+    assert await OutboxDispatcher(client).claim() == []
+
+    await dispatcher.dispatch(entry)
+    entry = await outbox.find_one({})
+    assert entry["attempts"] == 1 and "unavailable" in entry["error"]
+
+    await sleep(0.02)
+    assert await dispatcher.run_once() == 1
+
+    # Out of attempts, kept without being retried
+    await sleep(0.02)
+    assert await dispatcher.run_once() == 0
+    entry = await outbox.find_one({})
+    assert entry["attempts"] == 2 and entry["available_at"] is None
+
+    # Entries which can't be parsed count as failed attempts too
+    await outbox.delete_many({})
+    await client.use(Order).create_one({"number": 2})
+    await outbox.update_one({}, {"$set": {"document.number": "two"}})
+    [entry] = await dispatcher.claim()
+    await dispatcher.dispatch(entry)
+    entry = await outbox.find_one({})
+    assert entry["attempts"] == 1 and "number" in entry["error"]
+    assert entry["available_at"] is not None
+
+
+@pytest.mark.asyncio
+async def test_outbox_lease(test_config):
+    class Order(BaseDocument, outbox=True):
+        number: int
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url, mongo_database=test_config.mongo_database
+    )
+
+    client = Client()
+    await client.use(Order).create_many([{"number": i} for i in range(3)])
+
+    first = OutboxDispatcher(client, batch_size=2, lease=timedelta(milliseconds=20))
+    second = OutboxDispatcher(client, batch_size=2)
+    assert len(await first.claim()) == 2
+    assert len(await second.claim()) == 1
+    assert await second.claim() == []
+
+    # Entries of a dispatcher which died are claimed again once the lease expired
+    await sleep(0.03)
+    assert len(await second.claim()) == 2
+
+
+@pytest.mark.asyncio
+async def test_outbox_background(test_config):
+    class Order(BaseDocument, outbox=True):
+        number: int
+
+    called_with: List[Any] = []
+
+    @Order.on_change
+    def handler(type, order, context=None):
+        called_with.append(order.number)
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url, mongo_database=test_config.mongo_database
+    )
+
+    client = Client()
+    dispatcher = OutboxDispatcher(client, poll_interval=0.001)
+    dispatcher.start()
+
+    await client.use(Order).create_one({"number": 1})
+    for _ in range(100):
+        if called_with:
+            break
+        await sleep(0.001)
+    await dispatcher.stop()
+
+    assert called_with == [1]
+
+
+@pytest.mark.asyncio
+async def test_outbox_tenants(test_config):
+    class Order(BaseDocument, outbox=True):
+        number: int
+
+    called_with: List[Any] = []
+
+    @Order.on_change
+    def handler(type, order, context=None):
+        called_with.append(order.number)
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url,
+        mongo_database=test_config.mongo_database,
+        dispatch_outbox=True,
+    )
+
+    # Dispatched from the tenant database
+    client = Client(tenant="acme")
+    await client.use(Order).create_one({"number": 1})
+    # Polls every second by default
+    for _ in range(300):
+        if called_with:
+            break
+        await sleep(0.01)
+
+    assert called_with == [1]
+    assert await client.db[OUTBOX_COLLECTION].count_documents({}) == 0
@@ -0,0 +1,113 @@
+from asyncio import sleep
+
+import pytest
+
+from vanmongo import BaseDocument, Client
+from vanmongo.pages import PAGES_COLLECTION
+
+
+async def walk_pages(items, size, sort=None, reverse=False):
+    pages, after = [], None
+    while True:
+        connection = await items.find_connection(
+            first=size, after=after, sort=sort, reverse=reverse
+        )
+        pages.append([edge.node.index for edge in connection.edges])
+        if not connection.page_info.has_next_page:
+            return pages
+        after = connection.edges[-1].cursor
+
+
+@pytest.mark.asyncio
+async def test_jump_to_page(test_config):
+    class Item(BaseDocument, sort_options=["index"], page_index=4):
+        index: int
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url, mongo_database=test_config.mongo_database
+    )
+
+    client = Client()
+    items = client.use(Item)
+    await items.create_many([{"index": (i * 7) % 25} for i in range(25)])
+    await items.refresh_pages()
+
+    for sort in [None, "index", "created_at"]:
+        for reverse in [False, True]:
+            pages = await walk_pages(items, 3, sort, reverse)
+            for page, expected in enumerate(pages, 1):
+                connection = await items.find_connection(
+                    first=3, page=page, sort=sort, reverse=reverse
+                )
+                assert [edge.node.index for edge in connection.edges] == expected
+
+    with pytest.raises(Exception):
+        await items.find_connection(first=3, page=10)
+
+    # Writes only move the boundaries from the lowest value they changed
+    item = await items.find_one({"index": 20})
+    await items.update_one_by_id(item.id, {"index": 30})
+    await items.create_one({"index": 25})
+    state = await client.db[PAGES_COLLECTION].find_one({"_id": "items:index"})
+    assert state["dirty_from"] == 20
+
+    await items.refresh_pages()
+    pages = await walk_pages(items, 3, "index")
+    for page, expected in enumerate(pages, 1):
+        connection = await items.find_connection(first=3, page=page, sort="index")
+        assert [edge.node.index for edge in connection.edges] == expected
+    assert pages[-1] == [25, 30]
+
+
+@pytest.mark.asyncio
+async def test_refresh_in_background(test_config):
+    class Item(BaseDocument, page_index=2):
+        index: int
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url,
+        mongo_database=test_config.mongo_database,
+        refresh_pages=0.001,
+    )
+
+    client = Client()
+    items = client.use(Item)
+    await items.create_many([{"index": i} for i in range(5)])
+
+    pages = client.db[PAGES_COLLECTION]
+    for _ in range(100):
+        state = await pages.find_one({"_id": "items:"})
+        if state and state.get("count") == 5:
+            break
+        await sleep(0.001)
+
+    connection = await items.find_connection(first=2, page=3)
+    assert [edge.node.index for edge in connection.edges] == [4]
+
+
+@pytest.mark.asyncio
+async def test_refresh_tenants_in_background(test_config):
+    class Item(BaseDocument, page_index=2):
+        index: int
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url,
+        mongo_database=test_config.mongo_database,
+        refresh_pages=0.001,
+    )
+
+    # Refreshed in the tenant database
+    client = Client(tenant="acme")
+    items = client.use(Item)
+    await items.create_many([{"index": i} for i in range(5)])
+
+    pages = client.db[PAGES_COLLECTION]
+    for _ in range(100):
+        state = await pages.find_one({"_id": "items:"})
+        if state and state.get("count") == 5:
+            break
+        await sleep(0.001)
+
+    assert state and state["count"] == 5
+    default = await Client().db[PAGES_COLLECTION].find_one({"_id": "items:"})
+    assert not default or default["count"] == 0
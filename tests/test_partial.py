@@ -0,0 +1,74 @@
+from typing import List
+
+import pytest
+
+from vanmongo import BaseDocument, Client
+
+
+@pytest.mark.asyncio
+async def test_partial_find(test_config):
+    class Product(BaseDocument, sort_options=["price"]):
+        title: str
+        price: int
+        tags: List[str]
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url, mongo_database=test_config.mongo_database
+    )
+
+    Summary = Product.partial("title", "price")
+    assert Product.partial("price", "title") is Summary
+    assert list(Summary.__fields__) == ["object_id", "id", "price", "title"]
+
+    with pytest.raises(Exception):
+        Product.partial("missing")
+
+    products = Client().use(Product)
+    created = await products.create_many(
+        [{"title": f"{i}", "price": 10 - i, "tags": ["a"] * 100} for i in range(5)]
+    )
+
+    found = [p async for p in products.find(sort="price", partial=Summary)]
+    assert [type(p) for p in found] == [Summary] * 5
+    assert [(p.id, p.title, p.price) for p in found] == [
+        (p.id, p.title, p.price) for p in reversed(created)
+    ]
+    assert not hasattr(found[0], "tags")
+
+    first = await products.find_connection(first=2, partial=Summary)
+    assert [e.node.title for e in first.edges] == ["0", "1"]
+    assert type(first.edges[0].node) is Summary
+
+    # The sort field is added to keep the cursor value
+    Titles = Product.partial("title")
+    first = await products.find_connection(first=2, sort="price", partial=Titles)
+    second = await products.find_connection(
+        first=2, sort="price", after=first.edges[-1].cursor, partial=Titles
+    )
+    assert [e.node.title for e in first.edges + second.edges] == ["4", "3", "2", "1"]
+    assert type(second.edges[0].node) is Product.partial("title", "price")
+
+
+@pytest.mark.asyncio
+async def test_partial_load(test_config):
+    class Product(BaseDocument):
+        title: str
+        tags: List[str]
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url, mongo_database=test_config.mongo_database
+    )
+
+    Title = Product.partial("title")
+
+    client = Client()
+    products = client.use(Product)
+    created = await products.create_one({"title": "a", "tags": ["b"]})
+
+    partial = await products.load_one(created.id, partial=Title)
+    full = await products.load_one(created.id)
+    assert type(partial) is Title and partial.title == "a"
+    assert type(full) is Product and full.tags == ["b"]
+
+    [partial, missing] = await products.load([created.id, "missing"], partial=Title)
+    assert type(partial) is Title and missing is None
@@ -0,0 +1,102 @@
+import warnings
+
+import pytest
+
+from vanmongo import BaseDocument, Client, QueryPlanError, QueryPlanWarning
+from vanmongo.plan import plan_problems, query_shape
+
+
+def test_plan_problems():
+    assert query_shape({"a": 1, "b": {"$gt": 2}, "$or": [{"c": "d"}]}) == {
+        "a": 1,
+        "b": {"$gt": 1},
+        "$or": [{"c": 1}],
+    }
+    assert query_shape({"a": {"$in": [1, 2]}, "$or": [{"b": [1]}]}) == query_shape(
+        {"a": {"$in": [1, 2, 3]}, "$or": [{"b": [1, 2]}]}
+    )
+    assert query_shape({"$or": [{"a": 1}]}) != query_shape({"$or": [{"a": 1}] * 2})
+
+    full_index_scan = {
+        "queryPlan": {
+            "stage": "FETCH",
+            "filter": {"name": {"$eq": "a"}},
+            "inputStage": {
+                "stage": "IXSCAN",
+                "indexName": "sort_updated_at",
+                "indexBounds": {
+                    "updated_at": ["[MinKey, MaxKey]"],
+                    "_id": ["[MinKey, MaxKey]"],
+                },
+            },
+        }
+    }
+    assert plan_problems(full_index_scan) == ["full scan of index sort_updated_at"]
+
+    blocking_sort = {
+        "stage": "SORT",
+        "inputStage": {"stage": "COLLSCAN", "filter": {"name": {"$eq": "a"}}},
+    }
+    assert plan_problems(blocking_sort) == ["SORT", "COLLSCAN"]
+
+
+@pytest.mark.asyncio
+async def test_warn_query_plans(test_config):
+    class Item(BaseDocument, sort_options=["index"]):
+        index: int
+        name: str
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url,
+        mongo_database=test_config.mongo_database,
+        check_query_plans="warn",
+    )
+
+    items = Client().use(Item)
+    await items.create_many([{"index": i, "name": f"{i}"} for i in range(5)])
+
+    with pytest.warns(QueryPlanWarning, match="index name by adding them to Item"):
+        assert [i.name async for i in items.find({"name": "1"})] == ["1"]
+
+    # Each query shape is only explained once
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", QueryPlanWarning)
+
+        assert [i.name async for i in items.find({"name": "2"})] == ["2"]
+
+        assert len([i async for i in items.find(sort="updated_at")]) == 5
+
+        first = await items.find_connection(first=2, sort="index")
+        second = await items.find_connection(
+            first=2, sort="index", after=first.edges[-1].cursor
+        )
+        assert len(second.edges) == 2
+
+
+@pytest.mark.asyncio
+async def test_raise_query_plans(test_config):
+    class Item(BaseDocument, sort_options=["index"]):
+        index: int
+        name: str
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url,
+        mongo_database=test_config.mongo_database,
+        check_query_plans="raise",
+    )
+
+    items = Client().use(Item)
+    await items.create_many([{"index": i, "name": f"{i}"} for i in range(5)])
+
+    assert [i.index async for i in items.find(sort="index", reverse=True)] == [
+        4,
+        3,
+        2,
+        1,
+        0,
+    ]
+    assert len([i async for i in items.find({"index": {"$gte": 3}}, sort="index")]) == 2
+
+    for _ in range(2):
+        with pytest.raises(QueryPlanError, match="SORT"):
+            [i async for i in items.find(sort="name")]
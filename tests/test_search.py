@@ -1,8 +1,11 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from typing import List
 
 import pytest
+from pydantic import BaseModel
 
 from vanmongo import BaseDocument, Client
+from vanmongo.search import SearchMaker
 
 from .test_connection import extract_nodes
 
@@ -47,3 +50,65 @@ async def test_initialize_search(test_config, wait_for_index):
 
     first_page = await products.find_connection(first=100, query="pants")
     assert extract_nodes(first_page) == fixture
+
+
+class Variant(BaseModel):
+    id: str
+    title: str
+
+
+def normalize(variant: Variant):
+    return {"id": variant.id, "title": variant.title.lower()}
+
+
+async def make_async(variant: Variant):
+    return normalize(variant)
+
+
+@pytest.mark.asyncio
+async def test_search_document(test_config):
+    class Product(BaseDocument, search=["title"]):
+        title: str
+        colors: List[str]
+
+    @Product.search_document
+    async def make(product):
+        return {"id": product.id, "title": " ".join([product.title, *product.colors])}
+
+    class Shirt(BaseDocument, search=["title"]):
+        title: str
+
+    @Shirt.search_document(cpu_bound=True)
+    def make_shirt(shirt):
+        return {"id": shirt.id, "title": shirt.title.upper()}
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url,
+        mongo_database=test_config.mongo_database,
+        meilisearch_url=test_config.meilisearch_url,
+        search_executor=ThreadPoolExecutor(),
+    )
+
+    products = Client().use(Product)
+    product = await products.create_one({"title": "pants", "colors": ["teal"]})
+    connection = await products.find_connection(query="teal", first=10)
+    assert extract_nodes(connection) == [product]
+
+    shirts = Client().use(Shirt)
+    await shirts.create_many([{"title": f"shirt {i}"} for i in range(5)])
+    await shirts.reindex()
+    connection = await shirts.find_connection(query="SHIRT", first=10)
+    assert len(connection.edges) == 5
+
+
+@pytest.mark.asyncio
+async def test_search_maker_process_pool():
+    maker = SearchMaker(normalize, cpu_bound=True)
+    variants = [Variant(id=str(i), title=f"Shirt {i}") for i in range(3)]
+
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        made = await maker.make_many(variants, executor)
+    assert made == [{"id": str(i), "title": f"shirt {i}"} for i in range(3)]
+
+    with pytest.raises(Exception):
+        SearchMaker(make_async, cpu_bound=True)
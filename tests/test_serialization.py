@@ -0,0 +1,81 @@
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import List
+
+import pytest
+from bson.objectid import ObjectId
+
+from vanmongo import BaseDocument, Client, register_encoder, to_json_bytes
+
+
+def test_to_json_bytes():
+    class Item(BaseDocument):
+        title: str
+        tags: List[str]
+
+    now = datetime(2021, 6, 1, 12, 30, 15, 123000)
+    object_id = ObjectId()
+    item = Item(
+        _id=object_id, id="abc", created_at=now, updated_at=now, title="a", tags=["b"]
+    )
+
+    assert json.loads(item.to_json_bytes()) == {
+        "object_id": str(object_id),
+        "id": "abc",
+        "created_at": "2021-06-01T12:30:15.123000",
+        "updated_at": "2021-06-01T12:30:15.123000",
+        "title": "a",
+        "tags": ["b"],
+    }
+
+
+@pytest.mark.parametrize("encoder", ["orjson", "json"])
+def test_non_str_keys(encoder, monkeypatch):
+    if encoder == "json":
+        monkeypatch.setattr("vanmongo.serialization.orjson", None)
+    else:
+        pytest.importorskip("orjson")
+
+    assert json.loads(to_json_bytes({1: "a", "b": {2.5: True}})) == {
+        "1": "a",
+        "b": {"2.5": True},
+    }
+
+
+def test_register_encoder():
+    class Price(Decimal):
+        pass
+
+    with pytest.raises(TypeError):
+        to_json_bytes({"price": Price("1.5")})
+
+    register_encoder(Price, str)
+    assert json.loads(to_json_bytes({"price": Price("1.5")})) == {"price": "1.5"}
+
+
+@pytest.mark.asyncio
+async def test_stream_json(test_config):
+    class Item(BaseDocument, sort_options=["index"]):
+        index: int
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url, mongo_database=test_config.mongo_database
+    )
+
+    items = Client().use(Item)
+
+    assert b"".join([chunk async for chunk in items.stream_json()]) == b"[]"
+
+    await items.create_many([{"index": index} for index in range(5)])
+
+    chunks = [chunk async for chunk in items.stream_json(sort="index", limit=3)]
+    assert [item["index"] for item in json.loads(b"".join(chunks))] == [0, 1, 2]
+
+    connection = await items.find_connection(first=2)
+    data = json.loads(connection.to_json_bytes())
+    assert data["page_info"] == {"has_next_page": True, "has_previous_page": False}
+    assert data["edges"] == [
+        {"node": json.loads(edge.node.to_json_bytes()), "cursor": edge.cursor}
+        for edge in connection.edges
+    ]
@@ -0,0 +1,69 @@
+import pytest
+
+from vanmongo import BaseDocument, Client
+
+from .test_index import assert_indexes
+
+
+@pytest.mark.asyncio
+async def test_shard_key_indexes(db, test_config):
+    class Item(BaseDocument, shard_key=["region", "id"]):
+        region: str
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url, mongo_database=test_config.mongo_database
+    )
+
+    assert_indexes(
+        db[Item._collection],
+        id=[("id", 1)],
+        shard_key=[("region", 1), ("id", 1)],
+        sort_updated_at=[("updated_at", 1), ("_id", 1)],
+        sort_created_at=[("created_at", 1), ("_id", 1)],
+    )
+
+
+@pytest.mark.asyncio
+async def test_shard_key_queries(test_config):
+    class Item(BaseDocument, shard_key=["region"]):
+        region: str
+        index: int
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url, mongo_database=test_config.mongo_database
+    )
+
+    items = Client().use(Item)
+
+    eu, us, us2 = await items.create_many(
+        [
+            {"region": "eu", "index": 0},
+            {"region": "us", "index": 1},
+            {"region": "us", "index": 2},
+        ]
+    )
+
+    assert await items.find_one_by_id(eu.id, shard={"region": "eu"}) == eu
+    assert await items.find_one_by_id(eu.id, shard={"region": "us"}) is None
+
+    assert await items.load(
+        [us.id, eu.id, us2.id, "fakeid", eu.id],
+        shards=[{"region": "us"}, {"region": "eu"}, None, {"region": "eu"}, None],
+    ) == [us, eu, us2, None, eu]
+
+    updated = await items.update_one_by_id(us.id, {"index": 10}, shard={"region": "us"})
+    assert updated.index == 10
+    assert await items.find_one_by_id(us.id) == updated
+
+
+@pytest.mark.asyncio
+async def test_shard_key_required(test_config):
+    class Item(BaseDocument):
+        pass
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url, mongo_database=test_config.mongo_database
+    )
+
+    with pytest.raises(Exception):
+        await Client().use(Item).load_one("fakeid", shard={"region": "eu"})
@@ -0,0 +1,111 @@
+from asyncio import sleep
+
+import pytest
+
+from vanmongo import BaseDocument, Client, ResultStream
+
+
+@pytest.mark.asyncio
+async def test_result_stream(test_config):
+    class Item(BaseDocument, sort_options=["index"]):
+        index: int
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url, mongo_database=test_config.mongo_database
+    )
+
+    items = Client().use(Item)
+    await items.create_many([{"index": i} for i in range(10)])
+
+    assert [i.index for i in await items.find(sort="index").to_list()] == list(
+        range(10)
+    )
+    assert len(await items.find().to_list(max=3)) == 3
+
+    chunks = [c async for c in items.find(sort="index").chunks(4)]
+    assert [[i.index for i in chunk] for chunk in chunks] == [
+        [0, 1, 2, 3],
+        [4, 5, 6, 7],
+        [8, 9],
+    ]
+
+    # Sync functions are mapped as well
+    assert await items.find(sort="index").map(lambda i: i.index * 2).to_list() == [
+        i * 2 for i in range(10)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_result_stream_concurrency(test_config):
+    class Item(BaseDocument, sort_options=["index"]):
+        index: int
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url, mongo_database=test_config.mongo_database
+    )
+
+    items = Client().use(Item)
+    await items.create_many([{"index": i} for i in range(20)])
+
+    running = 0
+    most_running = 0
+    started = []
+
+    async def process(item):
+        nonlocal running, most_running
+        started.append(item.index)
+        running += 1
+        most_running = max(most_running, running)
+        await sleep(0.001 * (item.index % 3))
+        running -= 1
+        return item.index
+
+    # Results keep their order, at most 4 calls run at once
+    results = await items.find(sort="index").map(process, concurrency=4).to_list()
+    assert results == list(range(20))
+    assert most_running == 4
+
+    # Documents are only read as the results are consumed
+    started.clear()
+    async for index in items.find(sort="index").map(process, concurrency=4):
+        if index == 2:
+            break
+    assert started == [0, 1, 2, 3, 4, 5]
+
+    async def fail_odd(item):
+        if item.index % 2:
+            raise ValueError(item.index)
+
+    errors = await items.find().for_each(
+        fail_odd, concurrency=3, return_exceptions=True
+    )
+    assert sorted(e.args[0] for e in errors) == list(range(1, 20, 2))
+
+    with pytest.raises(ValueError):
+        await items.find(sort="index").for_each(fail_odd)
+
+
+@pytest.mark.asyncio
+async def test_close_stream():
+    closed = []
+
+    async def numbers():
+        try:
+            for number in range(5):
+                yield number
+        finally:
+            closed.append(True)
+
+    # Iterations left early are closed on exit, not once garbage collected
+    async with ResultStream(numbers) as stream:
+        async for number in stream:
+            if number == 1:
+                break
+        assert closed == []
+    assert closed == [True]
+
+    stream = ResultStream(numbers)
+    iterator = stream.__aiter__()
+    assert await iterator.__anext__() == 0
+    await stream.aclose()
+    assert closed == [True, True]
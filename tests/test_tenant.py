@@ -0,0 +1,93 @@
+import logging
+
+import pytest
+
+from vanmongo import BaseDocument, Client
+
+
+@pytest.mark.asyncio
+async def test_tenant_databases(test_config, mongo):
+    class Item(BaseDocument, sort_options=["index"]):
+        index: int
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url, mongo_database=test_config.mongo_database
+    )
+
+    acme = Client(tenant="acme").use(Item)
+    globex = Client(tenant="globex").use(Item)
+
+    item = await acme.create_one({"index": 1})
+    await globex.create_one({"index": 2})
+
+    assert [item.index async for item in acme.find()] == [1]
+    assert await acme.load_one(item.id) == item
+    assert await globex.find_one_by_id(item.id) is None
+    assert await Client().use(Item).find_one({}) is None
+
+    # Indexes are set up in the tenant database on first use
+    await Client.ready(tenant="acme")
+    database = mongo[f"{test_config.mongo_database}_acme"]
+    assert "sort_index" in database[Item._collection].index_information()
+
+    with pytest.raises(Exception):
+        Client(tenant="../admin")
+
+
+@pytest.mark.asyncio
+async def test_tenant_search(test_config):
+    class Product(BaseDocument, search=["title"]):
+        title: str
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url,
+        mongo_database=test_config.mongo_database,
+        meilisearch_url=test_config.meilisearch_url,
+        tenant_index_prefix="tenant-{tenant}-",
+    )
+
+    acme = Client(tenant="acme")
+    await Client.ready(tenant="acme")
+    assert acme.use(Product).index.uid == f"tenant-acme-{Product._collection}"
+
+    await acme.use(Product).create_one({"title": "anvil"})
+    await Client(tenant="globex").use(Product).create_one({"title": "anvil"})
+
+    connection = await acme.use(Product).find_connection(query="anvil", first=10)
+    assert len(connection.edges) == 1
+
+
+@pytest.mark.asyncio
+async def test_tenant_setup(test_config, monkeypatch, caplog):
+    class Item(BaseDocument):
+        index: int
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url, mongo_database=test_config.mongo_database
+    )
+
+    # Setup starts on the first operation, not when clients are created
+    items = Client(tenant="acme").use(Item)
+    assert "acme" not in Client._Client__tenant_setups
+
+    setup_indexes = Client._Client__mongo_setup_indexes
+    failures = 1
+
+    async def fail_once(tenant=None):
+        nonlocal failures
+        if failures:
+            failures -= 1
+            raise Exception("Unavailable")
+        await setup_indexes(tenant)
+
+    monkeypatch.setattr(Client, "_Client__mongo_setup_indexes", fail_once)
+
+    with caplog.at_level(logging.ERROR, logger="vanmongo.main"):
+        await items.create_one({"index": 1})
+        with pytest.raises(Exception):
+            await Client.ready(tenant="acme")
+    assert 'Setting up tenant "acme" failed' in caplog.text
+
+    # A failed setup is retried by the next operation
+    assert await items.find_one({"index": 1})
+    await Client.ready(tenant="acme")
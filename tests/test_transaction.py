@@ -0,0 +1,71 @@
+from typing import Any, List
+
+import pytest
+
+from vanmongo import BaseDocument, Client, EventType
+
+
+class Order(BaseDocument):
+    number: int
+
+
+class LineItem(BaseDocument):
+    order_id: str
+    quantity: int
+
+
+called_with: List[Any] = []
+
+
+@Order.on_change
+async def change_handler(type: EventType, order: Order, context=None):
+    called_with.append(type)
+
+
+@pytest.mark.asyncio
+async def test_transaction(test_config, replica_set):
+    global called_with
+    called_with = []
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url, mongo_database=test_config.mongo_database
+    )
+
+    client = Client()
+    orders = client.use(Order)
+    line_items = client.use(LineItem)
+
+    async with client.transaction():
+        order = await orders.create_one({"number": 1})
+        line_item = await line_items.create_one({"order_id": order.id, "quantity": 1})
+        line_item = await line_items.update_one_by_id(line_item.id, {"quantity": 2})
+
+        assert order.object_id is not None
+        assert called_with == []
+        assert await orders.find_one_by_id(order.id) is None
+
+    assert called_with == [EventType.CREATE]
+    assert await orders.find_one_by_id(order.id) == order
+    assert await line_items.find_one_by_id(line_item.id) == line_item
+
+
+@pytest.mark.asyncio
+async def test_transaction_abort(test_config, replica_set):
+    global called_with
+    called_with = []
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url, mongo_database=test_config.mongo_database
+    )
+
+    client = Client()
+    orders = client.use(Order)
+
+    with pytest.raises(RuntimeError):
+        async with client.transaction():
+            order = await orders.create_one({"number": 1})
+            raise RuntimeError()
+
+    assert called_with == []
+    assert await orders.find_one_by_id(order.id) is None
+    assert client.active_transaction is None
@@ -0,0 +1,63 @@
+from io import BytesIO
+
+import pytest
+
+from vanmongo import BaseDocument, Client, export_documents, import_documents
+from vanmongo.transfer import encode, read_records
+
+
+@pytest.mark.parametrize("format", ["ndjson", "bson"])
+def test_read_records(format):
+    raws = [{"id": str(index), "index": index} for index in range(3)]
+    data = b"".join(encode(raw, format) for raw in raws)
+
+    records = list(read_records(BytesIO(data), format))
+    assert [raw for raw, _ in records] == raws
+    assert records[-1][1] == len(data)
+
+    # Resume after the first record
+    file = BytesIO(data)
+    file.seek(records[0][1])
+    assert [raw for raw, _ in read_records(file, format)] == raws[1:]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("format", ["ndjson", "bson"])
+async def test_export_import(test_config, tmp_path, format):
+    class Item(BaseDocument):
+        index: int
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url, mongo_database=test_config.mongo_database
+    )
+
+    items = Client().use(Item)
+    fixture = await items.create_many([{"index": index} for index in range(25)])
+
+    path = str(tmp_path / f"items.{format}")
+    exported = await export_documents(items, path, format=format)
+    assert exported.documents == 25
+
+    await items.collection.delete_many({})
+
+    progress = []
+    imported = await import_documents(
+        items,
+        path,
+        format=format,
+        batch_size=10,
+        workers=3,
+        on_progress=lambda stats: progress.append(stats.offset),
+    )
+    assert imported.documents == 25 and imported.duplicates == 0
+    assert imported.offset == exported.offset
+    assert progress == sorted(progress)
+    assert [item async for item in items.find()] == fixture
+
+    # Existing documents are skipped when resuming
+    with open(path, "rb") as file:
+        offsets = [end for _, end in read_records(file, format)]
+    await items.collection.delete_many({"id": fixture[-1].id})
+    resumed = await import_documents(items, path, format=format, offset=offsets[9])
+    assert resumed.documents == 1 and resumed.duplicates == 14
+    assert [item async for item in items.find()] == fixture
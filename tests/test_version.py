@@ -0,0 +1,103 @@
+from asyncio import gather
+from typing import Optional
+
+import pytest
+
+from vanmongo import BaseDocument, Client, RetryPolicy
+
+
+@pytest.mark.asyncio
+async def test_unversioned(test_config):
+    class Item(BaseDocument):
+        index: int
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url, mongo_database=test_config.mongo_database
+    )
+
+    items = Client().use(Item)
+
+    item = await items.create_one({"index": 1})
+    assert "version" not in item.dict()
+
+    updated = await items.update_one_by_id(item.id, {"index": 2})
+    assert "version" not in updated.dict()
+    assert "version" not in await items.collection.find_one({"id": item.id})
+
+
+@pytest.mark.asyncio
+async def test_own_version_field(test_config):
+    class Release(BaseDocument):
+        version: str
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url, mongo_database=test_config.mongo_database
+    )
+
+    releases = Client().use(Release)
+
+    release = await releases.create_one({"version": "1.0.0"})
+    assert release.version == "1.0.0"
+    updated = await releases.update_one_by_id(release.id, {"version": "1.1.0"})
+    assert updated.version == "1.1.0"
+    raw = await releases.collection.find_one({"id": release.id})
+    assert raw["version"] == "1.1.0"
+
+    with pytest.raises(Exception):
+
+        class Versioned(BaseDocument, versioned=True):
+            version: str
+
+
+@pytest.mark.asyncio
+async def test_versioned(test_config):
+    class Item(BaseDocument, versioned=True):
+        index: int
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url, mongo_database=test_config.mongo_database
+    )
+
+    items = Client().use(Item)
+
+    item = await items.create_one({"index": 1})
+    assert item.version == 1
+
+    updated = await items.update_one_by_id(item.id, {"index": 2, "version": 10})
+    assert updated.version == 2
+    assert await items.find_one_by_id(item.id) == updated
+
+    # Nothing changed, nothing written
+    unchanged = await items.update_one_by_id(item.id, {"index": 2})
+    assert unchanged.version == 2
+
+
+@pytest.mark.asyncio
+async def test_versioned_concurrent_updates(test_config):
+    class Item(
+        BaseDocument,
+        versioned=True,
+        retry_policy=RetryPolicy(attempts=20, backoff=0.001),
+    ):
+        a: Optional[int]
+        b: Optional[int]
+        c: Optional[int]
+
+    await Client.initialize(
+        mongo_url=test_config.mongo_url, mongo_database=test_config.mongo_database
+    )
+
+    items = Client().use(Item)
+
+    item = await items.create_one({})
+
+    await gather(
+        items.update_one_by_id(item.id, {"a": 1}),
+        items.update_one_by_id(item.id, {"b": 2}),
+        items.update_one_by_id(item.id, {"c": 3}),
+    )
+
+    result = await items.find_one_by_id(item.id)
+    assert result
+    assert (result.a, result.b, result.c) == (1, 2, 3)
+    assert result.version == 4
@@ -1,6 +1,26 @@
+from .admission import AdmissionMetrics, AdmissionPolicy, AdmissionRejected
+from .archive import ArchiveMover, ArchivePolicy
+from .backends import Backend, MemoryBackend, MotorBackend
+from .cache import CacheBackend, MemoryCache, RedisCache
+from .collection import ConcurrentUpdateError
 from .connection import Connection, Edge, PageInfo
+from .deadline import Deadline, DeadlineExceeded
+from .document import BatchPolicy, RetryPolicy
 from .events import EventType
+from .follow import Checkpoint, MemoryCheckpoint, MongoCheckpoint, PollPolicy
+from .ids import (
+    IdGenerator,
+    ObjectIdGenerator,
+    ShortUUIDGenerator,
+    SortableIdGenerator,
+)
 from .main import BaseCollection, BaseDocument, Client
+from .migrations import MigrationStats
+from .outbox import OutboxDispatcher
+from .plan import QueryPlanError, QueryPlanWarning
+from .serialization import register_encoder, to_json_bytes
+from .stream import ResultStream
+from .transfer import TransferError, TransferStats, export_documents, import_documents
 
 __all__ = [
     "Client",
@@ -10,4 +30,39 @@ __all__ = [
     "Edge",
     "PageInfo",
     "EventType",
+    "RetryPolicy",
+    "BatchPolicy",
+    "ConcurrentUpdateError",
+    "IdGenerator",
+    "ShortUUIDGenerator",
+    "ObjectIdGenerator",
+    "SortableIdGenerator",
+    "register_encoder",
+    "to_json_bytes",
+    "export_documents",
+    "import_documents",
+    "TransferStats",
+    "TransferError",
+    "Backend",
+    "MotorBackend",
+    "MemoryBackend",
+    "QueryPlanWarning",
+    "QueryPlanError",
+    "ResultStream",
+    "PollPolicy",
+    "Checkpoint",
+    "MemoryCheckpoint",
+    "MongoCheckpoint",
+    "OutboxDispatcher",
+    "CacheBackend",
+    "MemoryCache",
+    "RedisCache",
+    "AdmissionPolicy",
+    "AdmissionMetrics",
+    "AdmissionRejected",
+    "Deadline",
+    "DeadlineExceeded",
+    "ArchivePolicy",
+    "ArchiveMover",
+    "MigrationStats",
 ]
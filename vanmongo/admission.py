@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+from asyncio import Future, TimeoutError, get_event_loop, wait_for
+from collections import deque
+from contextlib import asynccontextmanager
+from time import monotonic
+from typing import AsyncIterator, Deque, Dict, List, Literal, Optional, Tuple
+
+from pydantic import BaseModel
+
+from .deadline import Deadline
+
+Priority = Literal["interactive", "batch"]
+PRIORITIES: List[Priority] = ["interactive", "batch"]
+
+
+class AdmissionRejected(Exception):
+    """The wait queue is full or the operation waited longer than allowed"""
+
+
+class AdmissionPolicy(BaseModel):
+    """Limits of the MongoDB operations running at once"""
+
+    max_concurrency: int = 100
+    """Limit of every collection, unless set in collections"""
+    collection_concurrency: Optional[int] = None
+    collections: Dict[str, int] = {}
+    """Share of the slots batch operations may take"""
+    batch_share: float = 0.5
+    """Operations waiting beyond it are rejected right away"""
+    max_queue: int = 1000
+    queue_timeout: Optional[float] = None
+
+
+class AdmissionMetrics(BaseModel):
+    """Operations of a collection and priority"""
+
+    admitted: int = 0
+    rejected: int = 0
+    """Admitted after waiting in the queue"""
+    queued: int = 0
+    wait_seconds: float = 0
+    max_wait_seconds: float = 0
+
+    @property
+    def mean_wait_seconds(self) -> float:
+        return self.wait_seconds / self.queued if self.queued else 0
+
+
+class Limiter:
+    """
+    Semaphore granting waiting interactive operations first, batch operations
+    only get up to batch_limit slots so interactive ones always find some
+    """
+
+    def __init__(self, limit: int, batch_limit: int, max_queue: int):
+        self.limit = limit
+        self.batch_limit = batch_limit
+        self.max_queue = max_queue
+        self.active: Dict[Priority, int] = {priority: 0 for priority in PRIORITIES}
+        self.__waiters: Dict[Priority, Deque[Future]] = {
+            priority: deque() for priority in PRIORITIES
+        }
+
+    def __can_take(self, priority: Priority) -> bool:
+        if sum(self.active.values()) >= self.limit:
+            return False
+        return priority == "interactive" or self.active["batch"] < self.batch_limit
+
+    def __grant(self):
+        for priority in PRIORITIES:
+            waiters = self.__waiters[priority]
+            while waiters and self.__can_take(priority):
+                waiter = waiters.popleft()
+                if not waiter.done():
+                    self.active[priority] += 1
+                    waiter.set_result(None)
+
+    async def acquire(
+        self, priority: Priority, timeout: Optional[float] = None
+    ) -> bool:
+        """Take a slot, returns whether the operation had to wait"""
+        waiting = sum(len(waiters) for waiters in self.__waiters.values())
+        ahead = self.__waiters["interactive"] or (
+            priority == "batch" and self.__waiters["batch"]
+        )
+        if not ahead and self.__can_take(priority):
+            self.active[priority] += 1
+            return False
+        if waiting >= self.max_queue:
+            raise AdmissionRejected("Too many operations waiting")
+
+        waiter = get_event_loop().create_future()
+        self.__waiters[priority].append(waiter)
+        try:
+            await wait_for(waiter, timeout)
+        except BaseException as error:
+            if waiter in self.__waiters[priority]:
+                self.__waiters[priority].remove(waiter)
+            if waiter.done() and not waiter.cancelled():
+                # Granted while being cancelled
+                self.release(priority)
+            if isinstance(error, TimeoutError):
+                raise AdmissionRejected("Waited too long to be admitted")
+            raise
+        return True
+
+    def release(self, priority: Priority):
+        self.active[priority] -= 1
+        self.__grant()
+
+
+@asynccontextmanager
+async def unlimited() -> AsyncIterator[None]:
+    yield
+
+
+class AdmissionController:
+    """Admits operations within the global and the collection limits"""
+
+    def __init__(self, policy: AdmissionPolicy):
+        self.policy = policy
+        self.metrics: Dict[Tuple[str, Priority], AdmissionMetrics] = {}
+        self.__global = self.__limiter(policy.max_concurrency)
+        self.__collections: Dict[str, Limiter] = {}
+
+    def __limiter(self, limit: int) -> Limiter:
+        batch_limit = max(1, int(limit * self.policy.batch_share))
+        return Limiter(limit, batch_limit, self.policy.max_queue)
+
+    def __collection(self, collection: str) -> Optional[Limiter]:
+        limit = self.policy.collections.get(
+            collection, self.policy.collection_concurrency
+        )
+        if not limit:
+            return None
+        if collection not in self.__collections:
+            self.__collections[collection] = self.__limiter(limit)
+        return self.__collections[collection]
+
+    @asynccontextmanager
+    async def admit(
+        self,
+        collection: str,
+        priority: Priority = "interactive",
+        deadline: Optional[Deadline] = None,
+    ) -> AsyncIterator[None]:
+        metrics = self.metrics.setdefault((collection, priority), AdmissionMetrics())
+        # Collection first, global slots aren't held while waiting on it
+        limiters = [self.__collection(collection), self.__global]
+        acquired: List[Limiter] = []
+        queued = False
+        start = monotonic()
+        try:
+            for limiter in limiters:
+                if limiter:
+                    timeout = self.policy.queue_timeout
+                    if timeout is not None:
+                        timeout = max(0, timeout - (monotonic() - start))
+                    if deadline:
+                        remaining = deadline.remaining()
+                        timeout = (
+                            remaining if timeout is None else min(timeout, remaining)
+                        )
+                    queued = await limiter.acquire(priority, timeout) or queued
+                    acquired.append(limiter)
+        except BaseException as error:
+            for limiter in acquired:
+                limiter.release(priority)
+            if isinstance(error, AdmissionRejected):
+                metrics.rejected += 1
+                # Waited until the deadline rather than the queue timeout
+                if deadline:
+                    deadline.remaining()
+            raise
+
+        waited = monotonic() - start
+        metrics.admitted += 1
+        if queued:
+            metrics.queued += 1
+            metrics.wait_seconds += waited
+            metrics.max_wait_seconds = max(metrics.max_wait_seconds, waited)
+
+        try:
+            yield
+        finally:
+            for limiter in acquired:
+                limiter.release(priority)
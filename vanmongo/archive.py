@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import logging
+from asyncio import Task, ensure_future, gather, sleep
+from datetime import timedelta
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Type
+
+from pydantic import BaseModel
+from pymongo import ASCENDING, ReplaceOne
+
+from .events import EventType
+from .ids import utcnow
+from .pages import before, dirty_values, mark_pages
+
+if TYPE_CHECKING:
+    from .collection import Collection
+    from .document import BaseDocument
+    from .main import Client
+
+logger = logging.getLogger(__name__)
+
+
+class ArchivePolicy(BaseModel):
+    """Moves the documents not updated for a while to an archive collection"""
+
+    """Documents not updated for longer are archived"""
+    after: timedelta
+    """Documents moved per batch"""
+    batch_size: int = 500
+    """Seconds to wait between batches, spreads the writes of large moves"""
+    pause: float = 0
+    """Archive collection, the collection with an _archive suffix by default"""
+    collection: Optional[str] = None
+
+
+def archive_name(Document: Type[BaseDocument]) -> str:
+    if not Document._archive:
+        raise Exception("Document must be declared with archive")
+    return Document._archive.collection or f"{Document._collection}_archive"
+
+
+def moved_values(documents: List[BaseDocument]) -> Dict[Optional[str], Any]:
+    """Lowest value of every sort of the documents moved out"""
+    values: Dict[Optional[str], Any] = {}
+    for document in documents:
+        for sort, value in dirty_values(EventType.CREATE, document).items():
+            if sort not in values or before(value, values[sort]):
+                values[sort] = value
+    return values
+
+
+async def archive_documents(collection: Collection) -> int:
+    """
+    Move the documents not updated within the archive policy, oldest first
+
+    Documents are copied before they are removed, an interrupted move leaves
+    them in both collections and reads find the hot copy. Documents updated
+    while being moved stay in the hot collection.
+    """
+    Document = collection.Document
+    policy = Document._archive
+    if not policy:
+        raise Exception("Document must be declared with archive")
+
+    client = collection.client
+    hot = collection.collection
+    archive = collection.archive_collection
+    cutoff = utcnow() - policy.after
+    moved = 0
+
+    while True:
+        # Walks the sort_updated_at index
+        cursor = (
+            hot.find({"updated_at": {"$lt": cutoff}})
+            .sort([("updated_at", ASCENDING), (Document._order_field, ASCENDING)])
+            .limit(policy.batch_size)
+        )
+        async with client.admit(Document._collection):
+            raws = [raw async for raw in cursor]
+        if not raws:
+            break
+
+        ids = [raw["_id"] for raw in raws]
+        async with client.admit(archive_name(Document)):
+            await archive.bulk_write(
+                [ReplaceOne({"_id": raw["_id"]}, raw, upsert=True) for raw in raws],
+                ordered=False,
+            )
+        async with client.admit(Document._collection):
+            result = await hot.delete_many(
+                {"_id": {"$in": ids}, "updated_at": {"$lt": cutoff}}
+            )
+            kept = [
+                raw["_id"] async for raw in hot.find({"_id": {"$in": ids}}, {"_id": 1})
+            ]
+        if kept:
+            await archive.delete_many({"_id": {"$in": kept}})
+        moved += result.deleted_count
+
+        if Document._page_index:
+            documents = [Document.parse_obj(raw) for raw in raws]
+            await mark_pages(client.db, documents[0], moved_values(documents))
+        if client.result_cache and Document._cache:
+            await client.result_cache.invalidate(client.db.name, Document._collection)
+
+        if len(raws) < policy.batch_size:
+            break
+        if policy.pause:
+            await sleep(policy.pause)
+
+    return moved
+
+
+class ArchiveMover:
+    """Archives the old documents of all documents declared with archive"""
+
+    def __init__(self, client: Client, interval: float = 60):
+        self.client = client
+        self.interval = interval
+        self.__task: Optional[Task] = None
+
+    async def run_once(self) -> int:
+        moved = 0
+        for Document in self.client.documents():
+            if Document._archive:
+                moved += await self.client.use(Document).archive()
+        return moved
+
+    async def run(self):
+        """Move documents until cancelled"""
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Archiving failed")
+            await sleep(self.interval)
+
+    def start(self):
+        if not self.__task:
+            self.__task = ensure_future(self.run())
+
+    async def stop(self):
+        if self.__task:
+            self.__task.cancel()
+            await gather(self.__task, return_exceptions=True)
+            self.__task = None
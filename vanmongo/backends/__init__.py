@@ -0,0 +1,52 @@
+from abc import ABC, abstractmethod
+from typing import Any, Optional
+
+
+class Backend(ABC):
+    """Creates the clients used to access MongoDB and MeiliSearch"""
+
+    @abstractmethod
+    def create_mongo_client(self, url: str) -> Any:
+        """Motor compatible client"""
+
+    @abstractmethod
+    def create_search_client(self, url: str, key: Optional[str]) -> Any:
+        """async_search_client compatible client"""
+
+
+class MotorBackend(Backend):
+    """MongoDB through motor and MeiliSearch (default)"""
+
+    def create_mongo_client(self, url: str) -> Any:
+        # Only imported once used
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        return AsyncIOMotorClient(url)
+
+    def create_search_client(self, url: str, key: Optional[str]) -> Any:
+        from async_search_client import Client as SearchClient
+
+        return SearchClient(url, key) if key else SearchClient(url)
+
+
+class MemoryBackend(Backend):
+    """
+    In-memory stand-ins for MongoDB and MeiliSearch, for tests and benchmarks
+    Used for urls starting with memory://
+    """
+
+    def create_mongo_client(self, url: str) -> Any:
+        from .memory import AsyncMemoryMongoClient
+
+        return AsyncMemoryMongoClient(url)
+
+    def create_search_client(self, url: str, key: Optional[str]) -> Any:
+        from .memory import MemorySearchClient
+
+        return MemorySearchClient(url, key)
+
+
+def get_backend(url: str) -> Backend:
+    if url.startswith("memory://"):
+        return MemoryBackend()
+    return MotorBackend()
@@ -0,0 +1,1071 @@
+"""
+In-memory stand-ins for MongoDB and MeiliSearch
+
+Supports the subset of queries, updates and search used by vanmongo so tests
+and CPU bound benchmarks run without any services. Data is shared between all
+clients created with the same url within the process.
+"""
+from __future__ import annotations
+
+import re
+from copy import deepcopy
+from datetime import datetime, timezone
+from functools import cmp_to_key
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from bson.objectid import ObjectId
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from pymongo.operations import (
+    DeleteMany,
+    DeleteOne,
+    InsertOne,
+    ReplaceOne,
+    UpdateMany,
+    UpdateOne,
+)
+from pymongo.results import (
+    BulkWriteResult,
+    DeleteResult,
+    InsertManyResult,
+    InsertOneResult,
+    UpdateResult,
+)
+
+MISSING = object()
+
+Keys = List[Tuple[str, Any]]
+Snapshot = Dict[str, Dict[str, Tuple[Dict[Any, Any], Dict[str, Any]]]]
+
+
+def normalize(value: Any) -> Any:
+    """Deep copy a value the way it round trips through BSON"""
+    if isinstance(value, dict):
+        return {key: normalize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize(item) for item in value]
+    if isinstance(value, datetime):
+        if value.tzinfo:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        # Mongo stores milliseconds
+        return value.replace(microsecond=value.microsecond // 1000 * 1000)
+    return value
+
+
+def type_rank(value: Any) -> int:
+    """BSON comparison order of types"""
+    if value is None or value is MISSING:
+        return 1
+    if isinstance(value, bool):
+        return 8
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, str):
+        return 3
+    if isinstance(value, dict):
+        return 4
+    if isinstance(value, list):
+        return 5
+    if isinstance(value, bytes):
+        return 6
+    if isinstance(value, ObjectId):
+        return 7
+    if isinstance(value, datetime):
+        return 9
+    return 10
+
+
+def compare(a: Any, b: Any) -> int:
+    rank_a, rank_b = type_rank(a), type_rank(b)
+    if rank_a != rank_b:
+        return -1 if rank_a < rank_b else 1
+    if rank_a == 1:
+        return 0
+    if rank_a in (4, 5):
+        a, b = repr(a), repr(b)
+    return -1 if a < b else (1 if a > b else 0)
+
+
+def get_path(document: Any, path: str) -> Any:
+    value = document
+    for part in path.split("."):
+        if isinstance(value, dict):
+            value = value.get(part, MISSING)
+        elif isinstance(value, list) and part.isdigit():
+            index = int(part)
+            value = value[index] if index < len(value) else MISSING
+        else:
+            return MISSING
+        if value is MISSING:
+            return MISSING
+    return value
+
+
+def set_path(document: Dict[str, Any], path: str, value: Any):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        document = document.setdefault(part, {})
+    document[parts[-1]] = value
+
+
+def unset_path(document: Dict[str, Any], path: str):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        document = document.get(part, {})
+        if not isinstance(document, dict):
+            return
+    document.pop(parts[-1], None)
+
+
+def candidates(value: Any) -> List[Any]:
+    """Values compared against a condition, arrays match by element"""
+    if isinstance(value, list):
+        return [value] + value
+    return [value]
+
+
+def equals(value: Any, expected: Any) -> bool:
+    if expected is None:
+        return value is MISSING or value is None
+    return any(
+        type_rank(c) == type_rank(expected) and compare(c, expected) == 0
+        for c in candidates(value)
+    )
+
+
+def comparison(value: Any, expected: Any, accept: Callable[[int], bool]) -> bool:
+    # Only values of the same type are compared
+    return any(
+        type_rank(c) == type_rank(expected) and accept(compare(c, expected))
+        for c in candidates(value)
+        if c is not MISSING
+    )
+
+
+OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "$eq": equals,
+    "$ne": lambda value, expected: not equals(value, expected),
+    "$gt": lambda value, expected: comparison(value, expected, lambda c: c > 0),
+    "$gte": lambda value, expected: comparison(value, expected, lambda c: c >= 0),
+    "$lt": lambda value, expected: comparison(value, expected, lambda c: c < 0),
+    "$lte": lambda value, expected: comparison(value, expected, lambda c: c <= 0),
+    "$in": lambda value, expected: any(equals(value, e) for e in expected),
+    "$nin": lambda value, expected: not any(equals(value, e) for e in expected),
+    "$exists": lambda value, expected: (value is not MISSING) == bool(expected),
+}
+
+
+def is_operator_dict(value: Any) -> bool:
+    return isinstance(value, dict) and bool(value) and next(iter(value)).startswith("$")
+
+
+def matches(document: Dict[str, Any], query: Optional[Dict[str, Any]]) -> bool:
+    for key, condition in (query or {}).items():
+        if key == "$or":
+            if not any(matches(document, q) for q in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(document, q) for q in condition):
+                return False
+        elif key == "$nor":
+            if any(matches(document, q) for q in condition):
+                return False
+        elif key.startswith("$"):
+            raise OperationFailure(f"Unsupported query operator {key}")
+        else:
+            value = get_path(document, key)
+            if is_operator_dict(condition):
+                for op, expected in condition.items():
+                    if op not in OPERATORS:
+                        raise OperationFailure(f"Unsupported query operator {op}")
+                    if not OPERATORS[op](value, expected):
+                        return False
+            elif not equals(value, condition):
+                return False
+    return True
+
+
+def normalize_keys(keys: Union[str, Keys], direction: Any = None) -> Keys:
+    if isinstance(keys, str):
+        return [(keys, ASCENDING if direction is None else direction)]
+    return list(keys)
+
+
+def sort_documents(documents: List[Dict[str, Any]], keys: Keys):
+    def cmp(a: Dict[str, Any], b: Dict[str, Any]) -> int:
+        for key, direction in keys:
+            result = compare(get_path(a, key), get_path(b, key))
+            if result:
+                return result * (1 if direction == ASCENDING else -1)
+        return 0
+
+    documents.sort(key=cmp_to_key(cmp))
+
+
+def project(document: Dict[str, Any], projection: Any) -> Dict[str, Any]:
+    if not projection:
+        return document
+    if isinstance(projection, (list, tuple)):
+        projection = {key: 1 for key in projection}
+    include_id = projection.get("_id", 1)
+    fields = {k: v for k, v in projection.items() if k != "_id"}
+    if fields and all(fields.values()):
+        result: Dict[str, Any] = {}
+        if include_id and "_id" in document:
+            result["_id"] = document["_id"]
+        for key in fields:
+            value = get_path(document, key)
+            if value is not MISSING:
+                set_path(result, key, value)
+        return result
+    result = deepcopy(document)
+    for key in fields:
+        unset_path(result, key)
+    if not include_id:
+        result.pop("_id", None)
+    return result
+
+
+def apply_update(
+    document: Dict[str, Any], update: Dict[str, Any], inserting: bool = False
+) -> Dict[str, Any]:
+    if not is_operator_dict(update):
+        # Replacement
+        replacement: Dict[str, Any] = normalize(update)
+        if "_id" in document:
+            replacement = {"_id": document["_id"], **replacement}
+        return replacement
+
+    document = deepcopy(document)
+    for op, fields in update.items():
+        for path, value in fields.items():
+            if op == "$set":
+                set_path(document, path, normalize(value))
+            elif op == "$setOnInsert":
+                if inserting:
+                    set_path(document, path, normalize(value))
+            elif op == "$unset":
+                unset_path(document, path)
+            elif op == "$inc":
+                current = get_path(document, path)
+                set_path(document, path, (0 if current is MISSING else current) + value)
+            elif op == "$min":
+                current = get_path(document, path)
+                if current is MISSING or compare(value, current) < 0:
+                    set_path(document, path, normalize(value))
+            else:
+                raise OperationFailure(f"Unsupported update operator {op}")
+    return document
+
+
+def upsert_document(query: Dict[str, Any]) -> Dict[str, Any]:
+    """Equality conditions of a query become the fields of an upserted document"""
+    document: Dict[str, Any] = {}
+    for key, condition in query.items():
+        if key.startswith("$"):
+            continue
+        if is_operator_dict(condition):
+            if "$eq" in condition:
+                set_path(document, key, normalize(condition["$eq"]))
+            continue
+        set_path(document, key, normalize(condition))
+    return document
+
+
+def index_scan(
+    name: str, key: Keys, query: Dict[str, Any], sort: Optional[Keys]
+) -> Tuple[int, bool, Dict[str, Any]]:
+    """
+    How well an index serves a query, the number of leading index fields
+    bounded by the query, whether it provides the sort and its IXSCAN stage
+    """
+    bounded = 0
+    for field, _ in key:
+        if field not in query:
+            break
+        bounded += 1
+        condition = query[field]
+        if is_operator_dict(condition) and not set(condition) <= {"$eq", "$in"}:
+            # Range conditions end the usable prefix
+            break
+
+    # Fields matched by equality don't change the order of the others
+    def ordered(keys: Keys) -> Keys:
+        return [
+            (field, direction)
+            for field, direction in keys
+            if field not in query or is_operator_dict(query[field])
+        ]
+
+    rest, wanted = ordered(key), ordered(sort or [])
+    provides_sort = not wanted
+    if wanted and [f for f, _ in rest[: len(wanted)]] == [f for f, _ in wanted]:
+        same = [a == b for (_, a), (_, b) in zip(rest, wanted)]
+        provides_sort = all(same) or not any(same)
+
+    stage = {
+        "stage": "IXSCAN",
+        "keyPattern": dict(key),
+        "indexName": name,
+        "indexBounds": {
+            field: ["[MinKey, MaxKey]"] if i >= bounded else ["[bounded]"]
+            for i, (field, _) in enumerate(key)
+        },
+    }
+    return bounded, provides_sort, stage
+
+
+class MemoryCollection:
+    """pymongo compatible collection"""
+
+    def __init__(self, database: MemoryDatabase, name: str):
+        self.database = database
+        self.name = name
+        self.documents: Dict[Any, Dict[str, Any]] = {}
+        self.indexes: Dict[str, Dict[str, Any]] = {"_id_": {"key": [("_id", 1)]}}
+
+    def __check_unique(self, document: Dict[str, Any], ignore: Any = MISSING):
+        if document["_id"] != ignore and document["_id"] in self.documents:
+            raise DuplicateKeyError(
+                f"E11000 duplicate key error collection: {self.name} index: _id_",
+                11000,
+            )
+        for name, index in self.indexes.items():
+            if not index.get("unique") or name == "_id_":
+                continue
+            values = [get_path(document, key) for key, _ in index["key"]]
+            for other in self.documents.values():
+                if other["_id"] == ignore or other["_id"] == document["_id"]:
+                    continue
+                if values == [get_path(other, key) for key, _ in index["key"]]:
+                    raise DuplicateKeyError(
+                        f"E11000 duplicate key error collection: {self.name} "
+                        f"index: {name}",
+                        11000,
+                    )
+
+    def _find(
+        self,
+        query: Optional[Dict[str, Any]] = None,
+        sort: Optional[Keys] = None,
+        skip: int = 0,
+        limit: int = 0,
+    ) -> List[Dict[str, Any]]:
+        documents = [d for d in self.documents.values() if matches(d, query)]
+        if sort:
+            sort_documents(documents, sort)
+        documents = documents[skip:]
+        if limit:
+            documents = documents[: abs(limit)]
+        return documents
+
+    def _plan(self, query: Dict[str, Any], sort: Optional[Keys]) -> Dict[str, Any]:
+        """A winning plan the way MongoDB's planner would roughly pick it"""
+        if "$or" in query and len(query) == 1:
+            branches = [self._plan(branch, sort) for branch in query["$or"]]
+            if all(branch["stage"] != "SORT" for branch in branches):
+                # Every branch is read in order so they are merged in order
+                return {
+                    "stage": "SORT_MERGE" if sort else "OR",
+                    "inputStages": branches,
+                }
+            branches = [self._plan(branch, None) for branch in query["$or"]]
+            if any(branch["stage"] == "COLLSCAN" for branch in branches):
+                plan: Dict[str, Any] = {"stage": "COLLSCAN", "filter": query}
+            else:
+                plan = {"stage": "OR", "inputStages": branches}
+            return {"stage": "SORT", "inputStage": plan} if sort else plan
+
+        best: Optional[Tuple[int, bool, Dict[str, Any]]] = None
+        for name, index in self.indexes.items():
+            bounded, provides_sort, stage = index_scan(name, index["key"], query, sort)
+            if not bounded and not (sort and provides_sort):
+                continue
+            if not best or (bounded > 0, provides_sort, bounded) > (
+                best[0] > 0,
+                best[1],
+                best[0],
+            ):
+                best = (bounded, provides_sort, stage)
+
+        if not best:
+            plan = {"stage": "COLLSCAN", "filter": query}
+            return {"stage": "SORT", "inputStage": plan} if sort else plan
+
+        bounded, provides_sort, stage = best
+        covered = [field for field, _ in self.indexes[stage["indexName"]]["key"]]
+        remaining = {k: v for k, v in query.items() if k not in covered[:bounded]}
+        plan = {"stage": "FETCH", "inputStage": stage}
+        if remaining:
+            plan["filter"] = remaining
+        if not provides_sort:
+            plan = {"stage": "SORT", "inputStage": plan}
+        return plan
+
+    def find(self, filter: Optional[Dict[str, Any]] = None, projection=None, **kwargs):
+        return MemoryCursor(self, filter, projection, **kwargs)
+
+    def find_one(self, filter: Optional[Dict[str, Any]] = None, *args, **kwargs):
+        if filter is not None and not isinstance(filter, dict):
+            filter = {"_id": filter}
+        for document in self.find(filter, *args, **kwargs).limit(1):
+            return document
+        return None
+
+    def count_documents(self, filter: Dict[str, Any], **kwargs) -> int:
+        return len(self._find(filter))
+
+    def estimated_document_count(self, **kwargs) -> int:
+        return len(self.documents)
+
+    def __insert(self, document: Dict[str, Any]) -> Any:
+        if "_id" not in document:
+            document["_id"] = ObjectId()
+        stored = normalize({"_id": document["_id"], **document})
+        self.__check_unique(stored)
+        self.documents[stored["_id"]] = stored
+        return stored["_id"]
+
+    def insert_one(self, document: Dict[str, Any], **kwargs) -> InsertOneResult:
+        return InsertOneResult(self.__insert(document), True)
+
+    def insert_many(
+        self, documents: List[Dict[str, Any]], ordered: bool = True, **kwargs
+    ) -> InsertManyResult:
+        inserted_ids = []
+        errors = []
+        for index, document in enumerate(documents):
+            try:
+                inserted_ids.append(self.__insert(document))
+            except DuplicateKeyError as error:
+                errors.append({"index": index, "code": 11000, "errmsg": str(error)})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError(
+                {
+                    "writeErrors": errors,
+                    "writeConcernErrors": [],
+                    "nInserted": len(inserted_ids),
+                    "nUpserted": 0,
+                    "nMatched": 0,
+                    "nModified": 0,
+                    "nRemoved": 0,
+                    "upserted": [],
+                }
+            )
+        return InsertManyResult(inserted_ids, True)
+
+    def __update(
+        self,
+        filter: Dict[str, Any],
+        update: Dict[str, Any],
+        upsert: bool,
+        multi: bool,
+        sort: Optional[Keys] = None,
+    ) -> Tuple[Dict[str, Any], List[Dict[str, Any]], Any]:
+        """Returns the raw result, the documents before and the upserted _id"""
+        matched = self._find(filter, sort=sort, limit=0 if multi else 1)
+        modified = 0
+        for document in matched:
+            updated = apply_update(document, update)
+            if updated != document:
+                self.__check_unique(updated, ignore=document["_id"])
+                self.documents[document["_id"]] = updated
+                modified += 1
+        raw = {"n": len(matched), "nModified": modified, "ok": 1.0}
+        if matched or not upsert:
+            return raw, matched, None
+
+        document = apply_update(upsert_document(filter), update, inserting=True)
+        upserted_id = self.__insert(document)
+        raw.update({"n": 1, "upserted": upserted_id})
+        return raw, [], upserted_id
+
+    def update_one(self, filter, update, upsert: bool = False, **kwargs):
+        raw, _, _ = self.__update(filter, update, upsert, multi=False)
+        return UpdateResult(raw, True)
+
+    def update_many(self, filter, update, upsert: bool = False, **kwargs):
+        raw, _, _ = self.__update(filter, update, upsert, multi=True)
+        return UpdateResult(raw, True)
+
+    def replace_one(self, filter, replacement, upsert: bool = False, **kwargs):
+        raw, _, _ = self.__update(filter, replacement, upsert, multi=False)
+        return UpdateResult(raw, True)
+
+    def find_one_and_update(
+        self,
+        filter: Dict[str, Any],
+        update: Dict[str, Any],
+        projection=None,
+        sort: Optional[Keys] = None,
+        upsert: bool = False,
+        return_document: bool = ReturnDocument.BEFORE,
+        **kwargs,
+    ) -> Optional[Dict[str, Any]]:
+        _, before, upserted_id = self.__update(
+            filter, update, upsert, multi=False, sort=sort
+        )
+        if return_document == ReturnDocument.AFTER:
+            _id = before[0]["_id"] if before else upserted_id
+            if _id is None:
+                return None
+            return project(deepcopy(self.documents[_id]), projection)
+        return project(deepcopy(before[0]), projection) if before else None
+
+    def __delete(self, filter: Dict[str, Any], multi: bool) -> int:
+        matched = self._find(filter, limit=0 if multi else 1)
+        for document in matched:
+            del self.documents[document["_id"]]
+        return len(matched)
+
+    def delete_one(self, filter: Dict[str, Any], **kwargs) -> DeleteResult:
+        return DeleteResult({"n": self.__delete(filter, multi=False)}, True)
+
+    def delete_many(self, filter: Dict[str, Any], **kwargs) -> DeleteResult:
+        return DeleteResult({"n": self.__delete(filter, multi=True)}, True)
+
+    def bulk_write(self, requests: List[Any], ordered: bool = True, **kwargs):
+        result: Dict[str, Any] = {
+            "writeErrors": [],
+            "writeConcernErrors": [],
+            "nInserted": 0,
+            "nUpserted": 0,
+            "nMatched": 0,
+            "nModified": 0,
+            "nRemoved": 0,
+            "upserted": [],
+        }
+        for index, request in enumerate(requests):
+            try:
+                if isinstance(request, InsertOne):
+                    # Like pymongo, the _id is set on dicts, not on raw BSON
+                    document = request._doc
+                    self.__insert(
+                        document if isinstance(document, dict) else dict(document)
+                    )
+                    result["nInserted"] += 1
+                elif isinstance(request, (UpdateOne, UpdateMany, ReplaceOne)):
+                    raw, _, upserted_id = self.__update(
+                        dict(request._filter),
+                        dict(request._doc),
+                        request._upsert,
+                        multi=isinstance(request, UpdateMany),
+                    )
+                    if upserted_id is not None:
+                        result["nUpserted"] += 1
+                        result["upserted"].append({"index": index, "_id": upserted_id})
+                    else:
+                        result["nMatched"] += raw["n"]
+                        result["nModified"] += raw["nModified"]
+                elif isinstance(request, (DeleteOne, DeleteMany)):
+                    result["nRemoved"] += self.__delete(
+                        dict(request._filter), multi=isinstance(request, DeleteMany)
+                    )
+                else:
+                    raise OperationFailure(f"Unsupported request {request}")
+            except DuplicateKeyError as error:
+                result["writeErrors"].append(
+                    {"index": index, "code": 11000, "errmsg": str(error)}
+                )
+                if ordered:
+                    break
+        if result["writeErrors"]:
+            raise BulkWriteError(result)
+        return BulkWriteResult(result, True)
+
+    def create_index(
+        self,
+        keys: Union[str, Keys],
+        name: Optional[str] = None,
+        unique: bool = False,
+        **kwargs,
+    ) -> str:
+        key = normalize_keys(keys)
+        name = name or "_".join(f"{field}_{direction}" for field, direction in key)
+        index: Dict[str, Any] = {"key": key}
+        if unique:
+            index["unique"] = True
+        index.update(kwargs)
+        self.indexes[name] = index
+        return name
+
+    def index_information(self) -> Dict[str, Dict[str, Any]]:
+        return {name: {"v": 2, **index} for name, index in self.indexes.items()}
+
+    def drop(self, **kwargs):
+        # Handles stay valid, like in pymongo
+        self.documents = {}
+        self.indexes = {"_id_": {"key": [("_id", 1)]}}
+
+
+class MemoryCursor:
+    """pymongo compatible cursor"""
+
+    def __init__(
+        self,
+        collection: MemoryCollection,
+        filter: Optional[Dict[str, Any]] = None,
+        projection: Any = None,
+        sort: Optional[Keys] = None,
+        skip: int = 0,
+        limit: int = 0,
+        batch_size: int = 0,
+        **kwargs,
+    ):
+        self.collection = collection
+        self.filter = filter or {}
+        self.projection = projection
+        self.__sort: Optional[Keys] = sort
+        self.__skip = skip
+        self.__limit = limit
+        self.__batch_size = batch_size
+        self.__max_time_ms: Optional[int] = None
+        self.__results: Optional[Iterator[Dict[str, Any]]] = None
+        # Tailable cursors are not supported, cursors die once exhausted
+        self.alive = True
+
+    def sort(self, key_or_list: Union[str, Keys], direction: Any = None):
+        self.__sort = normalize_keys(key_or_list, direction)
+        return self
+
+    def limit(self, limit: int):
+        self.__limit = limit
+        return self
+
+    def skip(self, skip: int):
+        self.__skip = skip
+        return self
+
+    def batch_size(self, batch_size: int):
+        self.__batch_size = batch_size
+        return self
+
+    def max_time_ms(self, max_time_ms: Optional[int]):
+        self.__max_time_ms = max_time_ms
+        return self
+
+    def close(self):
+        self.__results = iter([])
+        self.alive = False
+
+    def explain(self) -> Dict[str, Any]:
+        plan = self.collection._plan(self.filter, self.__sort)
+        if self.__limit:
+            plan = {"stage": "LIMIT", "limitAmount": self.__limit, "inputStage": plan}
+        return {
+            "queryPlanner": {
+                "namespace": f"{self.collection.database.name}.{self.collection.name}",
+                "parsedQuery": self.filter,
+                "winningPlan": plan,
+                "rejectedPlans": [],
+            },
+            "ok": 1.0,
+        }
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> Dict[str, Any]:
+        if self.__results is None:
+            documents = self.collection._find(
+                self.filter, self.__sort, self.__skip, self.__limit
+            )
+            self.__results = iter(
+                [project(deepcopy(d), self.projection) for d in documents]
+            )
+        try:
+            return next(self.__results)
+        except StopIteration:
+            self.alive = False
+            raise
+
+
+class MemoryDatabase:
+    """pymongo compatible database"""
+
+    def __init__(self, client: MemoryMongoClient, name: str):
+        self.client = client
+        self.name = name
+        self.collections: Dict[str, MemoryCollection] = {}
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        if name not in self.collections:
+            self.collections[name] = MemoryCollection(self, name)
+        return self.collections[name]
+
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def create_collection(self, name: str, **kwargs) -> MemoryCollection:
+        # Options like capped are accepted but not enforced
+        return self[name]
+
+    def command(self, command: Union[str, Dict[str, Any]], *args, **kwargs):
+        name = command if isinstance(command, str) else next(iter(command))
+        if name in ("ismaster", "isMaster", "hello"):
+            # Transactions are emulated so act as a replica set
+            return {"ismaster": True, "setName": "memory", "ok": 1.0}
+        if name == "ping":
+            return {"ok": 1.0}
+        raise OperationFailure(f"Unsupported command {name}")
+
+
+SERVERS: Dict[str, Dict[str, MemoryDatabase]] = {}
+
+
+class MemoryMongoClient:
+    """pymongo compatible client, clients with the same url share their data"""
+
+    def __init__(self, url: str = "memory://", **kwargs):
+        self.url = url
+        self.databases = SERVERS.setdefault(url, {})
+
+    def __getitem__(self, name: str) -> MemoryDatabase:
+        if name not in self.databases:
+            self.databases[name] = MemoryDatabase(self, name)
+        return self.databases[name]
+
+    def __getattr__(self, name: str) -> MemoryDatabase:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def list_database_names(self) -> List[str]:
+        return list(self.databases)
+
+    def drop_database(self, name: Union[str, MemoryDatabase]):
+        database = self[name if isinstance(name, str) else name.name]
+        for collection in database.collections.values():
+            collection.drop()
+
+    def _snapshot(self) -> Snapshot:
+        return {
+            name: {
+                collection.name: deepcopy((collection.documents, collection.indexes))
+                for collection in database.collections.values()
+            }
+            for name, database in self.databases.items()
+        }
+
+    def _restore(self, snapshot: Snapshot):
+        for name in self.databases:
+            self.drop_database(name)
+        for name, collections in snapshot.items():
+            database = self[name]
+            for collection_name, (documents, indexes) in collections.items():
+                collection = database[collection_name]
+                collection.documents = deepcopy(documents)
+                collection.indexes = deepcopy(indexes)
+
+
+class AsyncMemoryCursor:
+    """motor compatible cursor"""
+
+    def __init__(self, cursor: MemoryCursor):
+        self.delegate = cursor
+
+    def sort(self, *args, **kwargs):
+        self.delegate.sort(*args, **kwargs)
+        return self
+
+    def limit(self, limit: int):
+        self.delegate.limit(limit)
+        return self
+
+    def skip(self, skip: int):
+        self.delegate.skip(skip)
+        return self
+
+    def batch_size(self, batch_size: int):
+        self.delegate.batch_size(batch_size)
+        return self
+
+    def max_time_ms(self, max_time_ms: Optional[int]):
+        self.delegate.max_time_ms(max_time_ms)
+        return self
+
+    async def to_list(self, length: Optional[int]) -> List[Dict[str, Any]]:
+        documents = []
+        for document in self.delegate:
+            documents.append(document)
+            if length and len(documents) >= length:
+                break
+        return documents
+
+    async def close(self):
+        self.delegate.close()
+
+    async def explain(self) -> Dict[str, Any]:
+        return self.delegate.explain()
+
+    @property
+    def alive(self) -> bool:
+        return self.delegate.alive
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Dict[str, Any]:
+        try:
+            return next(self.delegate)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class AsyncMemoryCollection:
+    """motor compatible collection"""
+
+    def __init__(self, database: AsyncMemoryDatabase, name: str):
+        self.database = database
+        self.name = name
+
+    @property
+    def delegate(self) -> MemoryCollection:
+        return self.database.delegate[self.name]
+
+    def find(self, *args, **kwargs) -> AsyncMemoryCursor:
+        return AsyncMemoryCursor(self.delegate.find(*args, **kwargs))
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        method = getattr(self.delegate, name)
+
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+
+        return call
+
+
+class AsyncMemoryDatabase:
+    """motor compatible database"""
+
+    def __init__(self, client: AsyncMemoryMongoClient, name: str):
+        self.client = client
+        self.name = name
+
+    @property
+    def delegate(self) -> MemoryDatabase:
+        return self.client.delegate[self.name]
+
+    def __getitem__(self, name: str) -> AsyncMemoryCollection:
+        return AsyncMemoryCollection(self, name)
+
+    def __getattr__(self, name: str) -> AsyncMemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    async def command(self, *args, **kwargs):
+        return self.delegate.command(*args, **kwargs)
+
+
+class MemorySession:
+    """
+    motor compatible session
+
+    Transactions snapshot all data of the client when started and restore it
+    when aborted, writes of other sessions are not isolated.
+    """
+
+    def __init__(self, client: AsyncMemoryMongoClient):
+        self.client = client
+        self.__snapshot: Optional[Snapshot] = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.end_session()
+
+    async def end_session(self):
+        await self.abort_transaction()
+
+    def start_transaction(self, *args, **kwargs) -> MemoryTransaction:
+        if self.__snapshot is not None:
+            raise OperationFailure("Transaction already in progress")
+        self.__snapshot = self.client.delegate._snapshot()
+        return MemoryTransaction(self)
+
+    async def commit_transaction(self):
+        self.__snapshot = None
+
+    async def abort_transaction(self):
+        if self.__snapshot is not None:
+            self.client.delegate._restore(self.__snapshot)
+            self.__snapshot = None
+
+    @property
+    def in_transaction(self) -> bool:
+        return self.__snapshot is not None
+
+
+class MemoryTransaction:
+    def __init__(self, session: MemorySession):
+        self.session = session
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, *args):
+        if exc_type:
+            await self.session.abort_transaction()
+        else:
+            await self.session.commit_transaction()
+
+
+class AsyncMemoryMongoClient:
+    """motor compatible client"""
+
+    def __init__(self, url: str = "memory://", **kwargs):
+        self.delegate = MemoryMongoClient(url)
+
+    def __getitem__(self, name: str) -> AsyncMemoryDatabase:
+        return AsyncMemoryDatabase(self, name)
+
+    def __getattr__(self, name: str) -> AsyncMemoryDatabase:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    async def drop_database(self, name: Union[str, AsyncMemoryDatabase]):
+        self.delegate.drop_database(name if isinstance(name, str) else name.name)
+
+    async def list_database_names(self) -> List[str]:
+        return self.delegate.list_database_names()
+
+    async def start_session(self, **kwargs) -> MemorySession:
+        return MemorySession(self)
+
+    def close(self):
+        pass
+
+
+class MemorySearchResults:
+    def __init__(self, hits: List[Dict[str, Any]], offset: int, limit: int, total: int):
+        self.hits = hits
+        self.offset = offset
+        self.limit = limit
+        self.nb_hits = total
+
+
+class MemoryUpdateStatus:
+    status = "processed"
+
+
+class MemorySearchIndex:
+    """async_search_client compatible index"""
+
+    def __init__(self, client: MemorySearchClient, uid: str):
+        self.client = client
+        self.uid = uid
+
+    @property
+    def documents(self) -> Dict[Any, Dict[str, Any]]:
+        return self.client.indexes.setdefault(self.uid, {})
+
+    async def add_documents(
+        self, documents: List[Dict[str, Any]], primary_key: Optional[str] = None
+    ):
+        for document in documents:
+            self.documents[document[primary_key or "id"]] = deepcopy(document)
+        return {"updateId": 0}
+
+    async def update_documents(
+        self, documents: List[Dict[str, Any]], primary_key: Optional[str] = None
+    ):
+        for document in documents:
+            key = document[primary_key or "id"]
+            self.documents[key] = {**self.documents.get(key, {}), **deepcopy(document)}
+        return {"updateId": 0}
+
+    async def delete_documents(self, ids: List[Any]):
+        for id in ids:
+            self.documents.pop(id, None)
+        return {"updateId": 0}
+
+    async def search(
+        self,
+        query: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 20,
+        attributes_to_retrieve: Optional[List[str]] = None,
+        **kwargs,
+    ) -> MemorySearchResults:
+        terms = tokenize(query or "")
+        hits = []
+        for document in self.documents.values():
+            if not terms or search_matches(document, terms):
+                hit = document
+                if attributes_to_retrieve and "*" not in attributes_to_retrieve:
+                    hit = {
+                        k: document[k] for k in attributes_to_retrieve if k in document
+                    }
+                hits.append(deepcopy(hit))
+        return MemorySearchResults(
+            hits[offset : offset + limit], offset, limit, len(hits)
+        )
+
+    async def get_all_update_status(self) -> List[MemoryUpdateStatus]:
+        return []
+
+    async def delete(self):
+        self.client.indexes.pop(self.uid, None)
+
+
+def tokenize(text: str) -> List[str]:
+    return re.findall(r"\w+", text.lower())
+
+
+def search_matches(document: Dict[str, Any], terms: List[str]) -> bool:
+    """Every term has to match a word, the last one as a prefix"""
+    words = set()
+    for value in document.values():
+        if isinstance(value, (list, tuple)):
+            value = " ".join(str(v) for v in value)
+        if value is not None:
+            words.update(tokenize(str(value)))
+    *complete, last = terms
+    if any(term not in words for term in complete):
+        return False
+    return any(word.startswith(last) for word in words)
+
+
+SEARCH_SERVERS: Dict[str, Dict[str, Dict[Any, Dict[str, Any]]]] = {}
+
+
+class MemorySearchClient:
+    """async_search_client compatible client with a simple full text search"""
+
+    def __init__(self, url: str = "memory://", api_key: Optional[str] = None):
+        self.url = url
+        self.indexes = SEARCH_SERVERS.setdefault(url, {})
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        pass
+
+    def index(self, uid: str) -> MemorySearchIndex:
+        return MemorySearchIndex(self, uid)
+
+    async def create_index(self, uid: str, primary_key: Optional[str] = None):
+        self.indexes.setdefault(uid, {})
+        return self.index(uid)
+
+    async def get_or_create_index(self, uid: str, primary_key: Optional[str] = None):
+        return await self.create_index(uid, primary_key)
+
+    async def get_index(self, uid: str) -> MemorySearchIndex:
+        return self.index(uid)
+
+    async def get_indexes(self) -> List[MemorySearchIndex]:
+        return [self.index(uid) for uid in self.indexes]
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import pickle
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from hashlib import sha1
+from time import monotonic
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+from bson import json_util
+from bson.json_util import CANONICAL_JSON_OPTIONS
+
+T = TypeVar("T")
+
+
+class CacheBackend(ABC):
+    """Stores cached results and the version counters of the collections"""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Any]:
+        """Value of the key, None when missing or expired"""
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: float):
+        """Store a value for ttl seconds"""
+
+    @abstractmethod
+    async def version(self, key: str) -> int:
+        """Current value of a counter, 0 before its first bump"""
+
+    @abstractmethod
+    async def bump(self, key: str) -> int:
+        """Increment a counter, counters don't expire"""
+
+
+class MemoryCache(CacheBackend):
+    """
+    In-process cache keeping up to max_entries results, the least recently
+    used are evicted first. Results are shared, they must not be modified
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self.__entries: OrderedDict[str, Tuple[float, Any]] = OrderedDict()
+        self.__versions: Dict[str, int] = {}
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self.__entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= monotonic():
+            del self.__entries[key]
+            return None
+        self.__entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: float):
+        self.__entries[key] = (monotonic() + ttl, value)
+        self.__entries.move_to_end(key)
+        while len(self.__entries) > self.max_entries:
+            self.__entries.popitem(last=False)
+
+    async def version(self, key: str) -> int:
+        return self.__versions.get(key, 0)
+
+    async def bump(self, key: str) -> int:
+        self.__versions[key] = self.__versions.get(key, 0) + 1
+        return self.__versions[key]
+
+
+class RedisCache(CacheBackend):
+    """
+    Cache shared by all processes in Redis, or any client with the async
+    get, set and incr of redis-py. Results are pickled, so documents must be
+    declared at module level. Configure maxmemory to bound its memory
+    """
+
+    def __init__(self, redis: Any, prefix: str = "vanmongo:"):
+        self.redis = redis
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self.redis.get(self.prefix + key)
+        return pickle.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Any, ttl: float):
+        await self.redis.set(
+            self.prefix + key, pickle.dumps(value), px=max(1, int(ttl * 1000))
+        )
+
+    async def version(self, key: str) -> int:
+        return int(await self.redis.get(self.prefix + key) or 0)
+
+    async def bump(self, key: str) -> int:
+        return int(await self.redis.incr(self.prefix + key))
+
+
+class ResultCache:
+    """
+    Results of queries, keyed by collection, query name and arguments
+
+    Keys include the version of their collection, which is bumped by every
+    write, so results are never read after a write to their collection.
+    Entries of older versions expire after ttl seconds, or are evicted first.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float = 60):
+        self.backend = backend
+        self.ttl = ttl
+
+    @staticmethod
+    def version_key(database: str, collection: str) -> str:
+        return f"version:{database}:{collection}"
+
+    async def get_or_fetch(
+        self,
+        database: str,
+        collection: str,
+        name: str,
+        arguments: Dict[str, Any],
+        fetch: Callable[[], Awaitable[T]],
+    ) -> T:
+        # The version is read first, results of a fetch racing a write are
+        # stored under the version they may predate
+        version = await self.backend.version(self.version_key(database, collection))
+        # Canonical extended JSON keeps types apart, an ObjectId and its hex
+        # string don't share a key
+        serialized = json_util.dumps(
+            arguments, sort_keys=True, default=str, json_options=CANONICAL_JSON_OPTIONS
+        )
+        digest = sha1(serialized.encode()).hexdigest()
+        key = f"result:{database}:{collection}:{version}:{name}:{digest}"
+
+        # Wrapped so that None results are cached as well
+        cached = await self.backend.get(key)
+        if cached is not None:
+            result: T = cached[0]
+            return result
+        value = await fetch()
+        await self.backend.set(key, (value,), self.ttl)
+        return value
+
+    async def invalidate(self, database: str, collection: str):
+        await self.backend.bump(self.version_key(database, collection))
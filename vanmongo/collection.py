@@ -1,33 +1,58 @@
 from __future__ import annotations
 
-from datetime import datetime
+from asyncio import sleep
 from typing import (
     TYPE_CHECKING,
     Any,
     AsyncGenerator,
+    Awaitable,
+    Callable,
     Coroutine,
     Dict,
     Generic,
     List,
     Optional,
+    Set,
     Type,
     TypeVar,
     cast,
 )
 
+import bson
 from bson.objectid import ObjectId
 from pydantic import BaseModel
 from pymongo import ASCENDING, DESCENDING
-from shortuuid import ShortUUID
 
-from .connection import Connection, Edge, MeilCursor, MongoCursor, PageInfo
-from .document import BaseDocument
+from .archive import archive_documents, archive_name
+from .connection import (
+    Edge,
+    MeilCursor,
+    MongoCursor,
+    PageInfo,
+    connection_types,
+    keyset_query,
+    node_cursor,
+)
+from .document import SCHEMA_VERSION, BaseDocument, PartialDocument
+from .events import EventType
+from .follow import Checkpoint, PollPolicy, follow_documents
+from .ids import utcnow
+from .migrations import MigrationStats, migrate_documents
+from .outbox import OUTBOX_COLLECTION, outbox_entry
+from .pages import PageIndex
+from .serialization import to_json_bytes
+from .stream import ResultStream
 
 if TYPE_CHECKING:
     from vanmongo import Client
 
 TContext = TypeVar("TContext", bound="BaseModel")
 TDocument = TypeVar("TDocument", bound="BaseDocument")
+T = TypeVar("T")
+
+
+class ConcurrentUpdateError(Exception):
+    """A versioned document was modified by another writer"""
 
 
 class Collection(Generic[TDocument]):
@@ -49,21 +74,59 @@ class Collection(Generic[TDocument]):
     def collection(self):
         return self.client.db[self.Document._collection]
 
+    @property
+    def archive_collection(self):
+        return self.client.db[archive_name(self.Document)]
+
     @property
     def index(self):
-        return self.client.search.index(self.Document._collection)
+        return self.client.search.index(
+            self.client.index_name(self.Document._collection, self.client.tenant)
+        )
 
     @property
     def loader(self):
         return self.client.loaders[self.Document._collection]
 
-    def load_one(self, id: str) -> Coroutine[Any, Any, Optional[TDocument]]:
-        return cast(Coroutine[Any, Any, Optional[TDocument]], self.loader.load(id))
+    def _loader(self, partial: Optional[Type[PartialDocument]] = None):
+        return self.client.partial_loader(partial) if partial else self.loader
 
-    def load(self, ids: List[str]) -> Coroutine[Any, Any, List[Optional[TDocument]]]:
+    def _loader_key(self, id: str, shard: Optional[Dict[str, Any]] = None) -> Any:
+        if not shard:
+            return id
+        if not self.Document._shard_key:
+            raise Exception("Document does not declare a shard key")
+        return (id, tuple(shard[key] for key in self.Document._shard_key))
+
+    def load_one(
+        self,
+        id: str,
+        shard: Optional[Dict[str, Any]] = None,
+        partial: Optional[Type[PartialDocument]] = None,
+    ) -> Coroutine[Any, Any, Optional[TDocument]]:
+        """
+        Load a document by ID, batched with other loads
+        Pass the shard key values when known to target a single shard
+        Pass a Document.partial() to load only some fields
+        """
+        return cast(
+            Coroutine[Any, Any, Optional[TDocument]],
+            self._loader(partial).load(self._loader_key(id, shard)),
+        )
+
+    def load(
+        self,
+        ids: List[str],
+        shards: Optional[List[Optional[Dict[str, Any]]]] = None,
+        partial: Optional[Type[PartialDocument]] = None,
+    ) -> Coroutine[Any, Any, List[Optional[TDocument]]]:
+        keys = [
+            self._loader_key(id, shards[i] if shards else None)
+            for i, id in enumerate(ids)
+        ]
         return cast(
             Coroutine[Any, Any, List[Optional[TDocument]]],
-            self.loader.load_many(ids),
+            self._loader(partial).load_many(keys),
         )
 
     async def find_one(self, query: Dict[str, Any]) -> Optional[TDocument]:
@@ -71,46 +134,196 @@ class Collection(Generic[TDocument]):
         Find a document base on the query
         Works similar to db.collection.findOne() in MongoDB
         """
-        raw = await self.collection.find_one(query)
+        return await self.__cached(
+            "find_one", {"query": query}, lambda: self.__find_one(query)
+        )
+
+    async def __find_one(
+        self, query: Dict[str, Any], archived: bool = False
+    ) -> Optional[TDocument]:
+        collection = self.archive_collection if archived else self.collection
+        name = archive_name(self.Document) if archived else self.Document._collection
+        async with self.client.admit(name):
+            raw = await self.client.within_deadline(
+                collection.find_one(query, max_time_ms=self.client.max_time_ms())
+            )
         return self.Document.parse_obj(raw) if raw else None
 
-    async def find_one_by_id(self, id: str) -> Optional[TDocument]:
+    async def find_one_by_id(
+        self, id: str, shard: Optional[Dict[str, Any]] = None
+    ) -> Optional[TDocument]:
         """
-        Find a document by ID
+        Find a document by ID, in the archive if the collection misses it
+        Pass the shard key values when known to target a single shard
         """
-        return await self.find_one({"id": id})
+        query = {"id": id, **(shard or {})}
+        document = await self.find_one(query)
+        if document or not self.Document._archive:
+            return document
+        return await self.__find_one(query, archived=True)
 
-    async def find(
+    def find(
         self,
         query: Dict[str, Any] = {},  # TODO rename (gets confusing with search)
         limit: Optional[int] = None,
         sort: Optional[str] = None,
         reverse: bool = False,
-        batch_size=100,
-    ) -> AsyncGenerator[TDocument, None]:
+        batch_size: Optional[int] = None,
+        partial: Optional[Type[PartialDocument]] = None,
+        archived: bool = False,
+    ) -> ResultStream[TDocument]:
         """
         Find documents in the collection.
         If no argument is given, it will act similar as
         "db.collection.find({})" in Mongodb.
+        Pass a Document.partial() to load only some fields.
+        The batch size defaults to the batch policy of the document.
+        Iterate the results with async for or process them with the
+        chunks, map, for_each and to_list methods of the stream.
+        Pass archived to find the documents moved to the archive instead.
         """
-        cursor = self.collection.find(query, batch_size=batch_size)
+        return ResultStream(
+            lambda: self.__find(
+                query, limit, sort, reverse, batch_size, partial, archived
+            )
+        )
 
+    async def __find(
+        self,
+        query: Dict[str, Any],
+        limit: Optional[int],
+        sort: Optional[str],
+        reverse: bool,
+        batch_size: Optional[int],
+        partial: Optional[Type[PartialDocument]],
+        archived: bool = False,
+        order_field: Optional[str] = None,
+    ) -> AsyncGenerator[TDocument, None]:
         direction = DESCENDING if reverse else ASCENDING
-        mongo_sort = [("_id", direction)]
+        mongo_sort = [(order_field or self.Document._order_field, direction)]
         if sort:
             mongo_sort = [(sort, direction)] + mongo_sort
+
+        collection = self.archive_collection if archived else self.collection
+        name = archive_name(self.Document) if archived else self.Document._collection
+
+        if self.client.plan_checker and not archived:
+            await self.client.plan_checker.check(self, query, mongo_sort, limit)
+
+        Model: Any = partial or self.Document
+        projection = partial._projection() if partial else None
+
+        policy = self.Document._batch_policy
+        kind = f"cursor:{','.join(partial._fields)}" if partial else "cursor"
+        if not batch_size:
+            batch_size = policy.batch_size(kind)
+            if limit:
+                batch_size = min(batch_size, limit)
+
+        # The server stops the query once the deadline passed
+        cursor = collection.find(
+            query,
+            projection,
+            batch_size=batch_size,
+            max_time_ms=self.client.max_time_ms(),
+        )
         cursor.sort(mongo_sort)
 
         if limit:
             cursor.limit(limit)
 
-        async for raw in cursor:
-            yield self.Document.parse_obj(raw)
+        raws = cursor.__aiter__()
+        count = 0
+        try:
+            while True:
+                try:
+                    if count % batch_size == 0:
+                        # Only the round trips fetching a batch wait for a slot
+                        async with self.client.admit(name):
+                            raw = await self.client.within_deadline(raws.__anext__())
+                    else:
+                        raw = await raws.__anext__()
+                except StopAsyncIteration:
+                    break
+                if count % policy.sample_every == 0:
+                    policy.observe(len(bson.encode(raw)), kind)
+                count += 1
+                yield Model.parse_obj(raw)
+        finally:
+            # Stopped early, don't wait for the cursor to be collected
+            await cursor.close()
+
+    def _find_updated(
+        self,
+        query: Dict[str, Any],
+        limit: int,
+        partial: Optional[Type[PartialDocument]],
+    ) -> ResultStream[TDocument]:
+        """Documents in (updated_at, _id) order, the keyset of follows"""
+        return ResultStream(
+            lambda: self.__find(
+                query, limit, "updated_at", False, None, partial, order_field="_id"
+            )
+        )
+
+    def follow(
+        self,
+        query: Dict[str, Any] = {},
+        after: Optional[str] = None,
+        poll: Optional[PollPolicy] = None,
+        checkpoint: Optional[Checkpoint] = None,
+        batch_size: int = 100,
+        partial: Optional[Type[PartialDocument]] = None,
+        tailable: bool = False,
+    ) -> ResultStream[TDocument]:
+        """
+        Stream new and updated documents continuously, in updated_at order
+        Pages on (updated_at, _id), _id is unique even when ids are not,
+        after is a cursor of a follow or of a connection sorted by
+        updated_at. Polls wait longer while no documents change.
+        A checkpoint keeps the position of processed documents so the
+        follow resumes from it, documents are delivered at least once.
+        Documents are only followed once updated poll.settle seconds ago,
+        writes committing later than that can be skipped.
+        Capped collections can be tailed instead, streaming inserted
+        documents in insertion order, checkpointed every batch_size.
+        """
+        return ResultStream(
+            lambda: follow_documents(
+                self,
+                query,
+                after,
+                poll or PollPolicy(),
+                checkpoint,
+                batch_size,
+                partial,
+                tailable,
+            )
+        )
+
+    async def stream_json(
+        self,
+        query: Dict[str, Any] = {},
+        limit: Optional[int] = None,
+        sort: Optional[str] = None,
+        reverse: bool = False,
+    ) -> AsyncGenerator[bytes, None]:
+        """
+        Find documents and stream them as a JSON array
+        Documents are encoded one by one, the list is never materialized
+        """
+        separator = b"["
+        async for document in self.find(
+            query=query, limit=limit, sort=sort, reverse=reverse
+        ):
+            yield separator + to_json_bytes(document)
+            separator = b","
+        yield b"[]" if separator == b"[" else b"]"
 
     async def find_by_ids(self, ids: List[str]) -> List[Optional[TDocument]]:
         """Find documents by a list of IDs"""
         documents = {}
-        async for document in self.find({"$or": [{"id": i} for i in ids]}):
+        async for document in self.find({"id": {"$in": ids}}):
             documents[document.id] = document
         return [documents.get(i) for i in ids]
 
@@ -122,6 +335,7 @@ class Collection(Generic[TDocument]):
         before: Optional[str] = None,
         sort: Optional[str] = None,
         reverse: bool = False,
+        partial: Optional[Type[PartialDocument]] = None,
     ):
         page_size = first or last
         if not page_size:
@@ -133,64 +347,93 @@ class Collection(Generic[TDocument]):
         if not first:
             reverse = not reverse
 
+        # Sortable ids are paginated on directly
+        order_field = self.Document._order_field
+
         connection_query: Dict[str, Any] = {}
+        archived = False
         if raw_cursor:
             cursor = MongoCursor.base64_decode(raw_cursor)
-            object_id = ObjectId(cursor.id)
-            op = "$lt" if reverse else "$gt"
-            connection_query = {"_id": {op: object_id}}
-
-            if cursor.sort and cursor.value and cursor.sort == sort:
-                connection_query = {
-                    "$or": [
-                        {cursor.sort: {op: cursor.value}},
-                        # Need secondary comparison for correct pagination
-                        # when primary comparison has duplicate values
-                        {
-                            cursor.sort: cursor.value,
-                            "_id": connection_query["_id"],
-                        },
-                    ]
-                }
+            connection_query = keyset_query(cursor, sort, order_field, reverse)
+            archived = bool(cursor.archived)
 
-        cursor = self.find(
-            query=connection_query,
-            sort=sort,
-            reverse=reverse,
-            limit=page_size + 1,
-        )
-        nodes = [node async for node in cursor]
+        # Documents of the collection come first, then those of the archive
+        tiers = [False, True] if self.Document._archive else [False]
+        if not first:
+            tiers.reverse()
+        tiers = tiers[tiers.index(archived) :]
+
+        if partial and sort and sort not in partial.__fields__:
+            # Cursors need the value of the sort field
+            partial = self.Document.partial(*partial._fields, sort)
+
+        EdgeType, ConnectionType = connection_types(partial or self.Document)
+
+        # Edges are built while the cursor is consumed, documents are validated
+        # once when parsed so the connection is constructed without validation
+        edges: List[Edge[TDocument]] = []
+        extra_node = False
+        for tier in tiers:
+            while not extra_node:
+                limit = page_size + 1 - len(edges)
+                nodes = await self.find(
+                    query=connection_query,
+                    sort=sort,
+                    reverse=reverse,
+                    limit=limit,
+                    partial=partial,
+                    archived=tier,
+                ).to_list()
+                hot_ids = await self.__hot_ids(nodes) if tier else set()
+                for node in nodes:
+                    if node.id in hot_ids:
+                        continue
+                    if len(edges) == page_size:
+                        # Limit allows a single extra node
+                        extra_node = True
+                        continue
+                    cursor = node_cursor(node, sort, order_field, tier)
+                    edges.append(
+                        EdgeType.construct(node=node, cursor=cursor.base64_encode())
+                    )
+                if len(nodes) < limit or not hot_ids:
+                    break
+                # Skipped copies left room, continue after the last one read
+                connection_query = keyset_query(
+                    node_cursor(nodes[-1], sort, order_field),
+                    sort,
+                    order_field,
+                    reverse,
+                )
+            # Only reached once the previous tier is exhausted, read from its start
+            connection_query = {}
 
         has_next_page = False
         has_previous_page = False
 
-        extra_node = len(nodes) > page_size
-        if extra_node:
-            nodes.pop()
-
         if first:
             has_next_page = extra_node
             has_previous_page = bool(after)
         if before:
-            nodes.reverse()
+            edges.reverse()
             has_next_page = True
             has_previous_page = extra_node
 
-        Edge[TDocument].update_forward_refs()
-
-        page_info = PageInfo(
+        page_info = PageInfo.construct(
             has_next_page=has_next_page, has_previous_page=has_previous_page
         )
-        edges: List[Edge[TDocument]] = []
-        for node in nodes:
-            cursor = MongoCursor(
-                id=f"{node.object_id}",
-                sort=sort,
-                value=getattr(node, sort, None) if sort else None,
-            ).base64_encode()
-            edges.append(Edge[TDocument](node=node, cursor=cursor))
+        return ConnectionType.construct(edges=edges, page_info=page_info)
 
-        return Connection[TDocument](edges=edges, page_info=page_info)
+    async def __hot_ids(self, nodes: List[Any]) -> Set[str]:
+        """
+        Ids of archived documents also in the collection, an interrupted move
+        leaves both copies and the collection's is the current one
+        """
+        if not nodes:
+            return set()
+        query = {"id": {"$in": [node.id for node in nodes]}}
+        async with self.client.admit(self.Document._collection):
+            return {raw["id"] async for raw in self.collection.find(query, {"id": 1})}
 
     async def __meil_find_connection(
         self,
@@ -199,6 +442,7 @@ class Collection(Generic[TDocument]):
         after: Optional[str] = None,
         last: Optional[int] = None,
         before: Optional[str] = None,
+        partial: Optional[Type[PartialDocument]] = None,
     ):
         page_size = first or last
         if not page_size:
@@ -222,26 +466,31 @@ class Collection(Generic[TDocument]):
                 limit = min(limit, cursor.offset)
 
         index = self.index
-        result = await index.search(
-            query,
-            attributes_to_retrieve=["id"],
-            limit=page_size,
-            offset=offset,
+        # The request is cancelled once the deadline passed
+        result = await self.client.within_deadline(
+            index.search(
+                query,
+                attributes_to_retrieve=["id"],
+                limit=page_size,
+                offset=offset,
+            )
         )
 
-        nodes = await self.load([cast(str, hit["id"]) for hit in result.hits])
+        nodes = await self.load(
+            [cast(str, hit["id"]) for hit in result.hits], partial=partial
+        )
 
-        Edge[TDocument].update_forward_refs()
+        EdgeType, ConnectionType = connection_types(partial or self.Document)
 
-        page_info = PageInfo(
+        page_info = PageInfo.construct(
             has_next_page=offset + limit < result.nb_hits,
             has_previous_page=offset != 0,
         )
         edges: List[Edge[TDocument]] = []
         for i, node in enumerate(nodes):
             cursor = MeilCursor(offset=offset + i, query=query).base64_encode()
-            edges.append(Edge[TDocument](node=node, cursor=cursor))
-        return Connection[TDocument](edges=edges, page_info=page_info)
+            edges.append(EdgeType.construct(node=node, cursor=cursor))
+        return ConnectionType.construct(edges=edges, page_info=page_info)
 
     async def find_connection(
         self,
@@ -252,58 +501,289 @@ class Collection(Generic[TDocument]):
         before: Optional[str] = None,
         sort: Optional[str] = None,
         reverse: bool = False,
+        partial: Optional[Type[PartialDocument]] = None,
+        page: Optional[int] = None,
     ):
-        if query:
-            return await self.__meil_find_connection(
-                query=query,
+        """
+        Page through the documents, or the search results of query
+        Pass page with first to jump to a page, from the page index of the
+        document or the offset of search results
+        """
+        if page is not None:
+            if not first:
+                raise Exception("Must provide first with page")
+            after = await self.page_cursor(page, first, query, sort, reverse)
+
+        async def fetch():
+            if query:
+                return await self.__meil_find_connection(
+                    query=query,
+                    first=first,
+                    after=after,
+                    last=last,
+                    before=before,
+                    partial=partial,
+                )
+            return await self.__mongo_find_connection(
                 first=first,
                 after=after,
                 last=last,
                 before=before,
+                sort=sort,
+                reverse=reverse,
+                partial=partial,
             )
-        return await self.__mongo_find_connection(
-            first=first,
-            after=after,
-            last=last,
-            before=before,
-            sort=sort,
-            reverse=reverse,
+
+        if not self.__cache_enabled():
+            return await fetch()
+
+        async def fetch_edges():
+            # Stored without the generic connection types, they can't be pickled
+            connection = await fetch()
+            edges = [(edge.node, edge.cursor) for edge in connection.edges]
+            return edges, connection.page_info
+
+        arguments = {
+            "query": query,
+            "first": first,
+            "after": after,
+            "last": last,
+            "before": before,
+            "sort": sort,
+            "reverse": reverse,
+            "partial": partial._fields if partial else None,
+        }
+        edges, page_info = await self.__cached(
+            "find_connection", arguments, fetch_edges
+        )
+        EdgeType, ConnectionType = connection_types(partial or self.Document)
+        return ConnectionType.construct(
+            edges=[
+                EdgeType.construct(node=node, cursor=cursor) for node, cursor in edges
+            ],
+            page_info=page_info,
         )
 
-    async def create_one(self, document: Dict[str, Any]) -> TDocument:
-        """Create a new document"""
+    async def page_cursor(
+        self,
+        page: int,
+        size: int,
+        query: Optional[str] = None,
+        sort: Optional[str] = None,
+        reverse: bool = False,
+    ) -> Optional[str]:
+        """Cursor to pass as after to find_connection to get a page"""
+        if query:
+            if page < 1:
+                raise Exception("Pages start at 1")
+            if page == 1:
+                return None
+            offset = (page - 1) * size - 1
+            return MeilCursor(offset=offset, query=query).base64_encode()
+
+        if not self.Document._page_index:
+            raise Exception("Document must be declared with page_index")
+        pages = PageIndex(self, self.Document._page_index)
+        return await pages.cursor(page, size, sort, reverse)
+
+    async def refresh_pages(self):
+        """Update the page index of every sort option"""
+        if not self.Document._page_index:
+            raise Exception("Document must be declared with page_index")
+        pages = PageIndex(self, self.Document._page_index)
+        for sort in [None, *self.Document._sort_options]:
+            await pages.refresh(sort)
+
+    async def migrate(
+        self,
+        batch_size: int = 500,
+        max_rate: Optional[float] = None,
+        checkpoint: Optional[Checkpoint] = None,
+        archived: bool = False,
+    ) -> MigrationStats:
+        """
+        Persist the migrations of the documents stored before them
+        Walks the outdated documents in order in batches of bulk writes, at
+        most max_rate documents per second. The position is saved to the
+        checkpoint after every batch, in vanmongo_checkpoints by default, so
+        an interrupted backfill resumes where it stopped.
+        """
+        return await migrate_documents(self, batch_size, max_rate, checkpoint, archived)
+
+    async def archive(self) -> int:
+        """Move the documents not updated within the archive policy"""
+        return await archive_documents(self)
+
+    def __cache_enabled(self) -> bool:
+        return bool(self.client.result_cache and self.Document._cache)
+
+    async def __cached(
+        self, name: str, arguments: Dict[str, Any], fetch: Callable[[], Awaitable[T]]
+    ) -> T:
+        result_cache = self.client.result_cache
+        if not result_cache or not self.Document._cache:
+            return await fetch()
+        return await result_cache.get_or_fetch(
+            self.client.db.name, self.Document._collection, name, arguments, fetch
+        )
 
-        now = datetime.utcnow()
-        # Keep same precision as mongo
-        now = now.replace(microsecond=int(round(now.microsecond, -3) % 1000000))
+    async def reindex(self, concurrency: int = 2):
+        """
+        Build and upload the search documents of all documents
+        Reading, building and uploading run as concurrent stages, each with up
+        to concurrency batches in flight
+        """
+        maker = self.Document._search_maker
+        policy = self.Document._batch_policy
+        executor = self.client.search_executor() if maker.cpu_bound else None
+        index = self.index
 
-        document.update(
-            {
-                "_id": "",  # Removed before insert
-                "id": ShortUUID().random(length=10),
-                "created_at": now,
-                "updated_at": now,
-            }
+        async def build(batch: List[TDocument]) -> List[Dict[str, Any]]:
+            return await maker.make_many(batch, executor)
+
+        async def send(made: List[Dict[str, Any]]):
+            for made_item in made[:: policy.sample_every]:
+                policy.observe(len(to_json_bytes(made_item)), "search")
+            await index.update_documents(made)
+
+        # Batches are sized from the observed size of the search documents
+        await (
+            self.find()
+            .chunks(lambda: policy.batch_size("search"))
+            .map(build, concurrency=concurrency)
+            .for_each(send, concurrency=concurrency)
         )
 
-        doc = self.Document.parse_obj(document)
+    async def create_one(self, document: Dict[str, Any]) -> TDocument:
+        """Create a new document"""
+        [doc] = await self.create_many([document])
+        return doc
 
-        doc_dict = doc.dict(by_alias=True)
-        doc_dict.pop("_id", None)  # Remove _id
+    async def __atomic(self, write: Callable[..., Awaitable[T]], *args) -> T:
+        """
+        Writes of outbox documents run in a transaction so the outbox entries
+        are written atomically with them, when MongoDB supports transactions
+        """
+        client = self.client
+        if (
+            self.Document._outbox
+            and not client.active_transaction
+            and await client.supports_transactions()
+        ):
+            async with client.transaction():
+                result = await write(*args)
+            return result
+        return await write(*args)
+
+    async def create_many(self, documents: List[Dict[str, Any]]) -> List[TDocument]:
+        """
+        Create new documents in a single insert
+        Ids are generated as a batch and all documents share the same timestamp
+        """
+        return await self.__atomic(self.__create_many, documents)
+
+    async def __create_many(self, documents: List[Dict[str, Any]]) -> List[TDocument]:
+        if not documents:
+            return []
+
+        now = utcnow()
+        ids = self.Document._id_generator.generate_many(len(documents), now)
+
+        docs: List[TDocument] = []
+        doc_dicts: List[Dict[str, Any]] = []
+        for document, id in zip(documents, ids):
+            document.update(
+                {
+                    "_id": "",  # Removed before insert
+                    "id": id,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+            )
 
-        inserted_result = await self.collection.insert_one(doc_dict)
-        doc.object_id = inserted_result.inserted_id  # Add generated _id
+            if self.Document._versioned:
+                document["version"] = 1
+            if self.Document._migrations:
+                document[SCHEMA_VERSION] = self.Document._schema_version()
+
+            doc = self.Document.parse_obj(document)
+
+            doc_dict = doc.dict(by_alias=True)
+            doc_dict.pop("_id", None)  # Remove _id
+
+            docs.append(doc)
+            doc_dicts.append(doc_dict)
+
+        transaction = self.client.active_transaction
+        if transaction:
+            for doc, doc_dict in zip(docs, doc_dicts):
+                # Generate _id ahead of the commit
+                doc.object_id = doc_dict["_id"] = ObjectId()
+                transaction.insert(doc, doc_dict)
+            return docs
+
+        async with self.client.admit(self.Document._collection):
+            if len(doc_dicts) == 1:
+                inserted_result = await self.client.within_deadline(
+                    self.collection.insert_one(doc_dicts[0])
+                )
+                inserted_ids = [inserted_result.inserted_id]
+            else:
+                inserted_many = await self.client.within_deadline(
+                    self.collection.insert_many(doc_dicts)
+                )
+                inserted_ids = inserted_many.inserted_ids
+        for doc, inserted_id in zip(docs, inserted_ids):
+            doc.object_id = inserted_id  # Add generated _id
+
+        if self.Document._outbox:
+            await self.client.db[OUTBOX_COLLECTION].insert_many(
+                [outbox_entry(EventType.CREATE, doc) for doc in docs]
+            )
+            return docs
 
-        await self.Document._trigger_create(doc, context=self.client.context)
+        with self.client.events():
+            for doc in docs:
+                await self.Document._trigger_create(doc, context=self.client.context)
 
-        return doc
+        return docs
 
     async def update_one(self, query: Dict[str, Any], update: Dict[str, Any] = {}):
         """
         Update a document based on the query
         Works similar to db.collection.updateOne() in MongoDB
+
+        Versioned documents only write if nobody else updated the document
+        in the meantime, otherwise the update is reapplied to a fresh copy
+        following the document's retry policy.
         """
-        original_document = await self.find_one(query)
+        if not self.Document._versioned:
+            return await self.__atomic(self.__update_one, query, update)
+
+        policy = self.Document._retry_policy
+        for attempt in range(policy.attempts):
+            try:
+                return await self.__atomic(self.__update_one, query, update)
+            except ConcurrentUpdateError:
+                if attempt + 1 >= policy.attempts:
+                    raise
+                await sleep(policy.delay(attempt))
+
+    async def __update_one(self, query: Dict[str, Any], update: Dict[str, Any]):
+        transaction = self.client.active_transaction
+
+        original_document = None
+        if transaction and isinstance(query.get("id"), str):
+            # Continue from the uncommitted state
+            original_document = cast(
+                Optional[TDocument],
+                transaction.get(self.Document._collection, query["id"]),
+            )
+        if not original_document:
+            # Never from the result cache, writes diff against the stored document
+            original_document = await self.__find_one(query)
+        if not original_document and self.Document._archive:
+            original_document = await self.__restore(query)
 
         if not original_document:
             raise Exception("Does not exist")
@@ -323,21 +803,110 @@ class Collection(Generic[TDocument]):
                 continue
             updated_values[key] = new_value
 
+        if self.Document._versioned:
+            # The version is managed here, never by the caller
+            updated_values.pop("version", None)
+            # The field is added by versioned=True, it's not on the base class
+            setattr(updated_document, "version", getattr(original_document, "version"))
+
         if updated_values:
-            now = datetime.utcnow()
-            # Keep same precision as mongo
-            now = now.replace(microsecond=int(round(now.microsecond, -3) % 1000000))
-            updated_values["updated_at"] = updated_document.updated_at = now
-            await self.collection.update_one(
-                {"id": original_document.id}, update={"$set": updated_values}
-            )
+            # Bookkeeping fields are not part of the changes passed to events
+            changes = dict(updated_values)
+            previous = {key: original_dict.get(key) for key in changes}
+
+            if original_document._migrated:
+                # The stored document predates the migrations, it's written whole
+                updated_values = {
+                    **{
+                        key: value
+                        for key, value in updated_dict.items()
+                        if key != "_id"
+                    },
+                    **updated_values,
+                }
 
-            await self.Document._trigger_update(
-                updated_document, context=self.client.context
-            )
+            updated_values["updated_at"] = updated_document.updated_at = utcnow()
+
+            update_filter: Dict[str, Any] = {
+                "id": original_document.id,
+                **original_document._shard_filter(),
+            }
+            if self.Document._versioned:
+                # Compare and set, only matches if nobody else wrote in between
+                version: Optional[int] = getattr(original_document, "version")
+                update_filter["version"] = version
+                updated_values["version"] = (version or 0) + 1
+                setattr(updated_document, "version", updated_values["version"])
+
+            if transaction:
+                transaction.update(
+                    updated_document,
+                    update_filter,
+                    {"$set": updated_values},
+                    changes=changes,
+                    previous=previous,
+                )
+                return updated_document
+
+            async with self.client.admit(self.Document._collection):
+                result = await self.client.within_deadline(
+                    self.collection.update_one(
+                        update_filter, update={"$set": updated_values}
+                    )
+                )
+            if not result.matched_count:
+                if self.Document._versioned:
+                    raise ConcurrentUpdateError(
+                        f'Document "{original_document.id}" was modified concurrently'
+                    )
+                # Archived between the read and the write, updated once restored
+                if self.Document._archive and await self.__restore(
+                    {"id": original_document.id, **original_document._shard_filter()}
+                ):
+                    return await self.__update_one(query, update)
+                raise Exception("Does not exist")
+
+            if self.Document._outbox:
+                await self.client.db[OUTBOX_COLLECTION].insert_one(
+                    outbox_entry(EventType.UPDATE, updated_document, changes, previous)
+                )
+                return updated_document
+
+            with self.client.events():
+                await self.Document._trigger_update(
+                    updated_document,
+                    context=self.client.context,
+                    changes=changes,
+                    previous=previous,
+                )
 
         return updated_document
 
-    async def update_one_by_id(self, id: str, update: Dict[str, Any] = {}):
+    async def __restore(self, query: Dict[str, Any]) -> Optional[TDocument]:
+        """
+        Move an archived document back to the collection to update it
+        Only inserted if missing, a hot copy restored or updated meanwhile is
+        kept. Restored as updated now so the next move doesn't archive it again.
+        """
+        archive = self.archive_collection
+        async with self.client.admit(archive_name(self.Document)):
+            raw = await archive.find_one(query)
+        if not raw:
+            return None
+        raw["updated_at"] = utcnow()
+        _id = raw.pop("_id")
+        async with self.client.admit(self.Document._collection):
+            await self.collection.update_one(
+                {"_id": _id}, {"$setOnInsert": raw}, upsert=True
+            )
+        await archive.delete_one({"_id": _id})
+        return await self.__find_one({"_id": _id})
+
+    async def update_one_by_id(
+        self,
+        id: str,
+        update: Dict[str, Any] = {},
+        shard: Optional[Dict[str, Any]] = None,
+    ):
         """Update a document with specific ID"""
-        return await self.update_one({"id": id}, update)
+        return await self.update_one({"id": id, **(shard or {})}, update)
@@ -1,11 +1,16 @@
 from __future__ import annotations
 
 from base64 import b64decode, b64encode
-from typing import Any, Generic, List, Optional, Type, TypeVar
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, Generic, List, Literal, Optional, Tuple, Type, TypeVar
 
-from pydantic import BaseModel
+from bson.objectid import ObjectId
+from pydantic import BaseModel, root_validator
 from pydantic.generics import GenericModel
 
+from .serialization import to_json_bytes
+
 Node = TypeVar("Node")
 Model = TypeVar("Model", bound=BaseModel)
 
@@ -22,8 +27,21 @@ class MongoCursor(BaseModel):
     id: str
     sort: Optional[str] = None
     value: Optional[Any] = None
-
-    def base64_encode(self):
+    """Type of values which don't survive the JSON round trip"""
+    value_type: Optional[Literal["datetime"]] = None
+    """Position in the archive, after the documents of the collection"""
+    archived: Optional[bool] = None
+
+    @root_validator
+    def typed_value(cls, values):
+        value = values.get("value")
+        if isinstance(value, datetime):
+            values["value_type"] = "datetime"
+        elif values.get("value_type") == "datetime" and isinstance(value, str):
+            values["value"] = datetime.fromisoformat(value)
+        return values
+
+    def base64_encode(self) -> str:
         return base64_encode_model(self)
 
     @classmethod
@@ -31,11 +49,43 @@ class MongoCursor(BaseModel):
         return base64_decode_model(cls, value)
 
 
+def node_cursor(
+    node: Any, sort: Optional[str], order_field: str, archived: bool = False
+) -> MongoCursor:
+    """Cursor of a document in the given sort"""
+    return MongoCursor(
+        id=f"{node.object_id}" if order_field == "_id" else node.id,
+        sort=sort,
+        value=getattr(node, sort, None) if sort else None,
+        archived=archived or None,
+    )
+
+
+def keyset_query(
+    cursor: MongoCursor, sort: Optional[str], order_field: str, reverse: bool = False
+) -> Dict[str, Any]:
+    """Query of the documents after a cursor in the given sort"""
+    order_value = ObjectId(cursor.id) if order_field == "_id" else cursor.id
+    op = "$lt" if reverse else "$gt"
+    query: Dict[str, Any] = {order_field: {op: order_value}}
+
+    if cursor.sort and cursor.value is not None and cursor.sort == sort:
+        query = {
+            "$or": [
+                {cursor.sort: {op: cursor.value}},
+                # Need secondary comparison for correct pagination
+                # when primary comparison has duplicate values
+                {cursor.sort: cursor.value, order_field: query[order_field]},
+            ]
+        }
+    return query
+
+
 class MeilCursor(BaseModel):
     offset: int
     query: str
 
-    def base64_encode(self):
+    def base64_encode(self) -> str:
         return base64_encode_model(self)
 
     @classmethod
@@ -56,3 +106,15 @@ class PageInfo(BaseModel):
 class Connection(GenericModel, Generic[Node]):
     edges: List[Edge[Node]]
     page_info: PageInfo
+
+    def to_json_bytes(self) -> bytes:
+        """Fast JSON encoding of the connection"""
+        return to_json_bytes(self)
+
+
+@lru_cache(maxsize=None)
+def connection_types(Node: Type[Any]) -> Tuple[Type[Edge], Type[Connection]]:
+    """Edge and Connection parametrized by the node type, created once per type"""
+    EdgeType = Edge[Node]  # type: ignore
+    EdgeType.update_forward_refs()
+    return EdgeType, Connection[Node]  # type: ignore
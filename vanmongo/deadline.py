@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from asyncio import TimeoutError, wait_for
+from time import monotonic
+from typing import Awaitable, TypeVar
+
+from pymongo.errors import ExecutionTimeout
+
+T = TypeVar("T")
+
+
+class DeadlineExceeded(Exception):
+    """The deadline of the client passed before the operation completed"""
+
+
+class Deadline:
+    """Point in time by which the operations of a client must complete"""
+
+    def __init__(self, at: float):
+        """at is a time.monotonic() timestamp"""
+        self.at = at
+
+    @classmethod
+    def after(cls, seconds: float) -> Deadline:
+        return cls(monotonic() + seconds)
+
+    def remaining(self) -> float:
+        """Seconds left, raises DeadlineExceeded once passed"""
+        remaining = self.at - monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded("Deadline exceeded")
+        return remaining
+
+    def max_time_ms(self) -> int:
+        """Remaining time as the maxTimeMS of MongoDB operations"""
+        return max(1, int(self.remaining() * 1000))
+
+    async def run(self, operation: Awaitable[T]) -> T:
+        """Wait for the operation until the deadline, then cancel it"""
+        try:
+            remaining = self.remaining()
+        except DeadlineExceeded:
+            # Never started, closed so it isn't reported as never awaited
+            close = getattr(operation, "close", None)
+            if close:
+                close()
+            raise
+        try:
+            return await wait_for(operation, remaining)
+        except (TimeoutError, ExecutionTimeout) as error:
+            raise DeadlineExceeded("Deadline exceeded") from error
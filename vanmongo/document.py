@@ -1,22 +1,129 @@
 from datetime import datetime
 from inspect import isawaitable
+from random import random
 from typing import (
     Any,
     Callable,
     ClassVar,
-    Coroutine,
+    Dict,
     List,
     Optional,
+    Tuple,
     Type,
     TypeVar,
     cast,
 )
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr, create_model
+from pydantic.fields import FieldInfo, ModelField
 
-from .events import ChangeHandler, EventType, RegisteredChangeEvent, RegisteredEvent
+from .archive import ArchivePolicy
+from .events import (
+    ChangeHandler,
+    EventType,
+    RegisteredChangeEvent,
+    RegisteredEvent,
+    accepted_arguments,
+)
+from .ids import IdGenerator, ShortUUIDGenerator
+from .search import SearchMaker
+from .serialization import to_json_bytes
 
 TDocument = TypeVar("TDocument", bound="BaseDocument")
+TPartial = TypeVar("TPartial", bound="PartialDocument")
+
+Migration = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+"""Key of the schema version in stored documents, reserved to vanmongo"""
+SCHEMA_VERSION = "_schema_version"
+
+
+class RetryPolicy(BaseModel):
+    """Retry policy for versioned updates that lose a concurrent write"""
+
+    attempts: int = 5
+    backoff: float = 0.01
+    max_backoff: float = 0.5
+
+    def delay(self, attempt: int) -> float:
+        """Exponential backoff with full jitter"""
+        return random() * min(self.backoff * 2.0**attempt, self.max_backoff)
+
+
+class BatchPolicy(BaseModel):
+    """
+    Sizes batches to a byte budget from the observed size of documents
+
+    Sizes are estimated separately per kind of batch, "cursor" for the
+    documents read from MongoDB and "search" for the documents sent to search.
+    """
+
+    target_bytes: int = 1024 * 1024
+    min_size: int = 10
+    max_size: int = 1000
+    initial_size: int = 100
+    """Every how many documents the size is measured"""
+    sample_every: int = 10
+    """Weight of a new measurement in the moving average"""
+    smoothing: float = 0.2
+    _sizes: Dict[str, float] = PrivateAttr(default_factory=dict)
+
+    def observe(self, size: int, kind: str = "cursor"):
+        """Record the size in bytes of a document"""
+        average = self._sizes.get(kind)
+        if average is None:
+            self._sizes[kind] = size
+        else:
+            self._sizes[kind] = average + self.smoothing * (size - average)
+
+    def batch_size(self, kind: str = "cursor") -> int:
+        """Number of documents per batch to stay around target_bytes"""
+        average = self._sizes.get(kind)
+        if not average:
+            return self.initial_size
+        size = int(self.target_bytes / average)
+        return max(self.min_size, min(self.max_size, size))
+
+
+class PartialDocument(BaseModel):
+    """Subset of the fields of a document, see BaseDocument.partial"""
+
+    """Document the fields are taken from"""
+    _document: ClassVar[Type["BaseDocument"]] = NotImplemented
+    """Fields loaded besides the ids"""
+    _fields: ClassVar[Tuple[str, ...]] = ()
+    """Autogenerated _id"""
+    object_id: Any = Field(alias="_id")
+    """Short unique id"""
+    id: str
+
+    @classmethod
+    def _projection(cls) -> Optional[Dict[str, int]]:
+        """MongoDB projection of the fields"""
+        if cls._document._migrations:
+            # Migrations may read any field of documents stored before them
+            return None
+        fields = cls._document.__fields__
+        return {fields[name].alias: 1 for name in ("id",) + cls._fields}
+
+    @classmethod
+    def parse_obj(cls: Type[TPartial], obj: Any) -> TPartial:
+        if cls._document._migrations and isinstance(obj, dict):
+            obj, _ = cls._document._migrate(obj)
+        return super().parse_obj(obj)
+
+    def __reduce__(self):
+        # Partial models are created at runtime, pickled through their document
+        return (load_partial, (self._document, self._fields, self.__dict__))
+
+
+def load_partial(
+    document: Type["BaseDocument"], fields: Tuple[str, ...], values: Dict[str, Any]
+) -> PartialDocument:
+    return document.partial(*fields).construct(**values)
+
+
+PARTIALS: Dict[Tuple[type, Tuple[str, ...]], Type[PartialDocument]] = {}
 
 
 class BaseDocument(BaseModel):
@@ -30,6 +137,30 @@ class BaseDocument(BaseModel):
     _sort_options: ClassVar[List[str]] = NotImplemented
     """meilisearch fields"""
     _search_fields: ClassVar[Optional[List[str]]] = None
+    """Builds the search documents"""
+    _search_maker: ClassVar[SearchMaker] = SearchMaker()
+    """Optimistic concurrency control on updates"""
+    _versioned: ClassVar[bool] = False
+    """Retry policy for version conflicts"""
+    _retry_policy: ClassVar[RetryPolicy] = RetryPolicy()
+    """Generator of the short unique id"""
+    _id_generator: ClassVar[IdGenerator] = ShortUUIDGenerator()
+    """Unique field used to order documents, "id" when ids are sortable"""
+    _order_field: ClassVar[str] = "_id"
+    """Fields of the shard key, included in queries to target a single shard"""
+    _shard_key: ClassVar[Optional[List[str]]] = None
+    """Batch sizes of cursors and search indexing"""
+    _batch_policy: ClassVar[BatchPolicy] = BatchPolicy()
+    """Events are recorded in the outbox and dispatched in the background"""
+    _outbox: ClassVar[bool] = False
+    """find_one and find_connection results are cached"""
+    _cache: ClassVar[bool] = False
+    """Documents between the page boundaries of find_connection(page=)"""
+    _page_index: ClassVar[Optional[int]] = None
+    """Functions upgrading stored documents, by schema version"""
+    _migrations: ClassVar[Dict[int, Migration]] = {}
+    """Old documents are moved to an archive collection"""
+    _archive: ClassVar[Optional[ArchivePolicy]] = None
     """Autogenerated _id"""
     object_id: Any = Field(alias="_id")
     """Short unique id"""
@@ -38,32 +169,197 @@ class BaseDocument(BaseModel):
     updated_at: datetime
     """Date created"""
     created_at: datetime
+    """Upgraded on read, the stored document still has an older schema"""
+    _migrated: bool = PrivateAttr(default=False)
+
+    def to_json_bytes(self) -> bytes:
+        """Fast JSON encoding of the document"""
+        return to_json_bytes(self)
+
+    @classmethod
+    def _add_field(cls, name: str, annotation: Any, alias: Optional[str] = None):
+        """
+        Declare a field managed by vanmongo, only on the documents using it
+        Fields the document declares itself are never replaced
+        """
+        field = cls.__fields__.get(name)
+        if field and field.field_info.extra.get("managed"):
+            return
+        if field:
+            raise Exception(f'Document already declares a "{name}" field')
+        cls.__fields__[name] = ModelField.infer(
+            name=name,
+            value=FieldInfo(None, alias=alias, managed=True),
+            annotation=annotation,
+            class_validators=None,
+            config=cls.__config__,
+        )
+
+    @classmethod
+    def parse_obj(cls: Type[TDocument], obj: Any) -> TDocument:
+        if not cls._migrations or not isinstance(obj, dict):
+            return super().parse_obj(obj)
+        obj, migrated = cls._migrate(obj)
+        document = super().parse_obj(obj)
+        document._migrated = migrated
+        return document
+
+    @classmethod
+    def _schema_version(cls) -> Optional[int]:
+        return max(cls._migrations, default=None)
+
+    @classmethod
+    def _migrate(cls, raw: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+        """Apply the migrations newer than the schema version of a raw document"""
+        stored = raw.get(SCHEMA_VERSION) or 0
+        pending = sorted(version for version in cls._migrations if version > stored)
+        if not pending:
+            return raw, False
+        raw = dict(raw)
+        for version in pending:
+            raw = cls._migrations[version](raw)
+        raw[SCHEMA_VERSION] = pending[-1]
+        return raw, True
+
+    def _shard_filter(self) -> Dict[str, Any]:
+        """Shard key values of the document"""
+        return {key: getattr(self, key) for key in self._shard_key or []}
+
+    @classmethod
+    def partial(cls, *fields: str) -> Type[PartialDocument]:
+        """
+        Model of only some fields of the document, the ids are always included
+        Pass it to find, find_connection or load to project and validate only
+        those fields
+        """
+        names = tuple(sorted(set(fields) - {"id", "object_id"}))
+        key = (cls, names)
+        if key not in PARTIALS:
+            for name in names:
+                if name not in cls.__fields__:
+                    raise Exception(f'Document has no field "{name}"')
+            Partial = create_model(  # type: ignore
+                f"{cls.__name__}Partial",
+                __base__=PartialDocument,
+                **{
+                    name: (
+                        cls.__fields__[name].annotation,
+                        cls.__fields__[name].field_info,
+                    )
+                    for name in names
+                },
+            )
+            Partial._document = cls
+            Partial._fields = names
+            PARTIALS[key] = Partial
+        return PARTIALS[key]
+
+    @classmethod
+    def search_document(
+        cls,
+        make: Optional[Callable[..., Any]] = None,
+        cpu_bound: bool = False,
+        concurrency: int = 50,
+    ) -> Any:
+        """
+        Register the function building the search document of a document
+        It can be sync or async, cpu_bound functions run on batches of
+        documents in a process pool and must be declared at module level.
+        Use as decorator, with or without arguments
+        """
+
+        def register(make: Callable[..., Any]):
+            cls._search_maker = SearchMaker(make, cpu_bound, concurrency)
+            return make
+
+        return register(make) if make else register
+
+    @classmethod
+    def migration(cls, version: int) -> Callable[[Migration], Migration]:
+        """
+        Register the function upgrading raw documents to a schema version
+        Documents stored with an older version are upgraded when read, in
+        version order, and written whole on their next update. Use
+        Collection.migrate to persist the upgrades of all documents.
+        Use as decorator
+        """
+
+        def register(migrate: Migration) -> Migration:
+            if version < 1:
+                raise Exception("Schema versions start at 1")
+            if version in cls._migrations:
+                raise Exception(f"Migration {version} is already registered")
+            # Latest migration applied, stored under the reserved key
+            cls._add_field("schema_version", Optional[int], alias=SCHEMA_VERSION)
+            cls._migrations[version] = migrate
+            return migrate
+
+        return register
 
     @classmethod
     def on_change(
         cls: Type[TDocument],
-        handler: Callable[[EventType, TDocument], Coroutine[Any, Any, None]],
-    ):
-        cls.__events.append(
-            RegisteredChangeEvent(type=EventType.CHANGE, handler=handler)
-        )
+        handler: Optional[Callable[..., Any]] = None,
+        fields: Optional[List[str]] = None,
+    ) -> Any:
+        """
+        Register a handler called when documents are created or updated
+        With fields, updates which change none of them don't call the handler.
+        Handlers accepting changes or previous keyword arguments receive the
+        changed values of updates and the values they replaced.
+        Use as decorator, with or without arguments
+        """
+
+        def register(handler: Callable[..., Any]):
+            cls.__events.append(
+                RegisteredChangeEvent(
+                    type=EventType.CHANGE,
+                    handler=handler,
+                    fields=fields,
+                    arguments=accepted_arguments(handler),
+                )
+            )
+            return handler
+
+        return register(handler) if handler else register
 
     @classmethod
-    async def _trigger_create(cls: Type[TDocument], value: TDocument, context=None):
+    async def __trigger(
+        cls: Type[TDocument],
+        type: EventType,
+        value: TDocument,
+        context=None,
+        changes: Optional[Dict[str, Any]] = None,
+        previous: Optional[Dict[str, Any]] = None,
+    ):
+        arguments = {"changes": changes, "previous": previous}
         for registered_handler in cls.__events:
             result = None
             if registered_handler.type == EventType.CHANGE:
+                if not registered_handler.watches(changes):
+                    continue
                 handler = cast(ChangeHandler, registered_handler.handler)
-                result = handler(EventType.CREATE, value, context=context)
+                result = handler(
+                    type,
+                    value,
+                    context=context,
+                    **{name: arguments[name] for name in registered_handler.arguments},
+                )
             if result and isawaitable(result):
                 await result
 
     @classmethod
-    async def _trigger_update(cls: Type[TDocument], value: TDocument, context=None):
-        for registered_handler in cls.__events:
-            result = None
-            if registered_handler.type == EventType.CHANGE:
-                handler = cast(ChangeHandler, registered_handler.handler)
-                result = handler(EventType.UPDATE, value, context=context)
-            if result and isawaitable(result):
-                await result
+    async def _trigger_create(cls: Type[TDocument], value: TDocument, context=None):
+        await cls.__trigger(EventType.CREATE, value, context=context)
+
+    @classmethod
+    async def _trigger_update(
+        cls: Type[TDocument],
+        value: TDocument,
+        context=None,
+        changes: Optional[Dict[str, Any]] = None,
+        previous: Optional[Dict[str, Any]] = None,
+    ):
+        await cls.__trigger(
+            EventType.UPDATE, value, context=context, changes=changes, previous=previous
+        )
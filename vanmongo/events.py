@@ -1,5 +1,6 @@
 from enum import Enum
-from typing import TYPE_CHECKING, Any, Literal, Protocol, TypeVar, Union
+from inspect import Parameter, signature
+from typing import TYPE_CHECKING, Any, List, Literal, Optional, Protocol, TypeVar, Union
 
 from pydantic import BaseModel
 
@@ -22,9 +23,33 @@ class ChangeHandler(Protocol[TDocument]):
         ...
 
 
+"""Keyword arguments handlers receive when they accept them"""
+CHANGE_ARGUMENTS = ["changes", "previous"]
+
+
+def accepted_arguments(handler: Any) -> List[str]:
+    """Optional keyword arguments the handler accepts"""
+    try:
+        parameters = signature(handler).parameters
+    except (TypeError, ValueError):
+        return []
+    if any(p.kind == Parameter.VAR_KEYWORD for p in parameters.values()):
+        return CHANGE_ARGUMENTS.copy()
+    return [name for name in CHANGE_ARGUMENTS if name in parameters]
+
+
 class RegisteredChangeEvent(BaseModel):
     type: Literal[EventType.CHANGE]
     handler: Any
+    """Updates are skipped when none of these fields changed"""
+    fields: Optional[List[str]] = None
+    """Of changes and previous, the ones passed to the handler"""
+    arguments: List[str] = []
+
+    def watches(self, changes: Optional[dict]) -> bool:
+        if self.fields is None or changes is None:
+            return True
+        return any(field in changes for field in self.fields)
 
 
 RegisteredEvent = Union[RegisteredChangeEvent]
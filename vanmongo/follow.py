@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from asyncio import sleep
+from datetime import timedelta
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncGenerator,
+    AsyncIterator,
+    Dict,
+    Optional,
+    Type,
+)
+
+from bson.objectid import ObjectId
+from pydantic import BaseModel
+from pymongo import CursorType
+
+from .connection import MongoCursor, keyset_query, node_cursor
+from .document import PartialDocument
+from .ids import utcnow
+from .stream import aclose
+
+if TYPE_CHECKING:
+    from .collection import Collection
+    from .main import Client
+
+CHECKPOINT_COLLECTION = "vanmongo_checkpoints"
+
+
+class PollPolicy(BaseModel):
+    """Wait between polls that found no new documents"""
+
+    interval: float = 0.5
+    backoff: float = 2
+    max_interval: float = 10
+    settle: float = 1
+    """
+    Seconds since their updated_at before documents are followed, updated_at
+    is stamped before the write commits, so writes which commit late or come
+    from a lagging clock are still ahead of the keyset when they appear
+    """
+
+    def delay(self, empty_polls: int) -> float:
+        """Exponential backoff after consecutive empty polls"""
+        return min(self.interval * self.backoff**empty_polls, self.max_interval)
+
+
+class Checkpoint(ABC):
+    """Keeps the position of a follow so it resumes where it stopped"""
+
+    @abstractmethod
+    async def load(self) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    async def save(self, cursor: str):
+        ...
+
+    @abstractmethod
+    async def clear(self):
+        """Forget the position, the next run starts over"""
+
+
+class MemoryCheckpoint(Checkpoint):
+    """Checkpoint kept in memory, resumes follows within the process"""
+
+    def __init__(self, cursor: Optional[str] = None):
+        self.cursor = cursor
+
+    async def load(self) -> Optional[str]:
+        return self.cursor
+
+    async def save(self, cursor: str):
+        self.cursor = cursor
+
+    async def clear(self):
+        self.cursor = None
+
+
+class MongoCheckpoint(Checkpoint):
+    """Checkpoint stored by name in the vanmongo_checkpoints collection"""
+
+    def __init__(self, client: Client, name: str):
+        self.client = client
+        self.name = name
+
+    @property
+    def collection(self):
+        return self.client.db[CHECKPOINT_COLLECTION]
+
+    async def load(self) -> Optional[str]:
+        raw = await self.collection.find_one({"_id": self.name})
+        return raw["cursor"] if raw else None
+
+    async def save(self, cursor: str):
+        await self.collection.update_one(
+            {"_id": self.name},
+            {"$set": {"cursor": cursor, "updated_at": utcnow()}},
+            upsert=True,
+        )
+
+    async def clear(self):
+        await self.collection.delete_one({"_id": self.name})
+
+
+def merge_query(query: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Any]:
+    if set(query) & set(after):
+        return {"$and": [query, after]}
+    return {**query, **after}
+
+
+async def follow_documents(
+    collection: Collection,
+    query: Dict[str, Any],
+    after: Optional[str],
+    poll: PollPolicy,
+    checkpoint: Optional[Checkpoint],
+    batch_size: int,
+    partial: Optional[Type[PartialDocument]],
+    tailable: bool,
+) -> AsyncGenerator[Any, None]:
+    if checkpoint:
+        after = await checkpoint.load() or after
+    cursor = MongoCursor.base64_decode(after) if after else None
+    if cursor and not ObjectId.is_valid(cursor.id):
+        # Cursor of a connection of documents ordered by id, found by its _id
+        raw = await collection.collection.find_one({"id": cursor.id}, {"_id": 1})
+        # Removed meanwhile, all the documents of the same updated_at follow
+        cursor = cursor.copy(
+            update={"id": str(raw["_id"] if raw else ObjectId("0" * 24))}
+        )
+    saved = cursor
+
+    sort = None if tailable else "updated_at"
+    # Unique, unlike ids, so the keyset never skips documents
+    order_field = "_id"
+    if partial and sort and sort not in partial.__fields__:
+        # Cursors need the value of the sort field
+        partial = collection.Document.partial(*partial._fields, sort)
+
+    empty_polls = 0
+    try:
+        while True:
+            page_query = query
+            if cursor:
+                after_query = keyset_query(cursor, sort, order_field)
+                page_query = merge_query(query, after_query)
+
+            documents: AsyncIterator[Any]
+            if tailable:
+                documents = tail_documents(collection, page_query, partial)
+            else:
+                settled = utcnow() - timedelta(seconds=poll.settle)
+                page_query = merge_query(page_query, {"updated_at": {"$lt": settled}})
+                documents = collection._find_updated(
+                    page_query, batch_size, partial
+                ).__aiter__()
+
+            count = 0
+            try:
+                async for document in documents:
+                    yield document
+                    # Only documents which were processed are checkpointed
+                    cursor = node_cursor(document, sort, order_field)
+                    count += 1
+                    if checkpoint and tailable and count % batch_size == 0:
+                        # Tailing only stops once the cursor dies
+                        await checkpoint.save(cursor.base64_encode())
+                        saved = cursor
+            finally:
+                await aclose(documents)
+
+            if checkpoint and cursor is not saved and cursor:
+                await checkpoint.save(cursor.base64_encode())
+                saved = cursor
+
+            if tailable or count < batch_size:
+                # Caught up, wait for new documents
+                if count:
+                    empty_polls = 0
+                await sleep(poll.delay(empty_polls))
+                if not count:
+                    empty_polls += 1
+    finally:
+        if checkpoint and cursor is not saved and cursor:
+            await checkpoint.save(cursor.base64_encode())
+
+
+async def tail_documents(
+    collection: Collection,
+    query: Dict[str, Any],
+    partial: Optional[Type[PartialDocument]],
+) -> AsyncGenerator[Any, None]:
+    """Documents of a capped collection in insertion order, until the cursor dies"""
+    Model: Any = partial or collection.Document
+    projection = partial._projection() if partial else None
+    cursor = collection.collection.find(
+        query, projection, cursor_type=CursorType.TAILABLE_AWAIT
+    )
+    try:
+        while cursor.alive:
+            async for raw in cursor:
+                yield Model.parse_obj(raw)
+    finally:
+        await cursor.close()
@@ -0,0 +1,149 @@
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from os import urandom
+from typing import Dict, List, Optional, Type, Union
+
+from bson.objectid import ObjectId
+from shortuuid import ShortUUID
+
+
+def utcnow() -> datetime:
+    """Current time with the same precision as mongo"""
+    now = datetime.utcnow()
+    # Truncated like mongo, rounding up to the next second would go back in time
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+
+class RandomPool:
+    """Random bytes read from os.urandom in large blocks"""
+
+    def __init__(self, size: int = 4096):
+        self.size = size
+        self.__buffer = b""
+        self.__position = 0
+
+    def take(self, count: int) -> bytes:
+        if self.__position + count > len(self.__buffer):
+            remaining = self.__buffer[self.__position :]
+            self.__buffer = remaining + urandom(max(self.size, count))
+            self.__position = 0
+        start = self.__position
+        self.__position += count
+        return self.__buffer[start : self.__position]
+
+
+class IdGenerator(ABC):
+    """Generates the short unique id of documents"""
+
+    """Ids are generated in increasing order"""
+    sortable: bool = False
+
+    @abstractmethod
+    def generate_many(self, count: int, now: Optional[datetime] = None) -> List[str]:
+        """Generate count ids at once, now is shared by the whole batch"""
+
+    def generate(self, now: Optional[datetime] = None) -> str:
+        return self.generate_many(1, now)[0]
+
+
+class ShortUUIDGenerator(IdGenerator):
+    """Random ids using the shortuuid alphabet (default)"""
+
+    def __init__(self, length: int = 10, alphabet: Optional[str] = None):
+        self.length = length
+        self.alphabet = alphabet or ShortUUID().get_alphabet()
+        # Reject bytes above the largest multiple of the alphabet to avoid bias
+        self.__limit = 256 - 256 % len(self.alphabet)
+        self.__pool = RandomPool()
+
+    def generate_many(self, count: int, now: Optional[datetime] = None) -> List[str]:
+        alphabet = self.alphabet
+        size = len(alphabet)
+        limit = self.__limit
+
+        needed = count * self.length
+        chars: List[str] = []
+        while len(chars) < needed:
+            # Oversample a bit so a single read is almost always enough
+            missing = needed - len(chars)
+            for byte in self.__pool.take(missing + missing // 4 + 8):
+                if byte < limit:
+                    chars.append(alphabet[byte % size])
+
+        joined = "".join(chars[:needed])
+        length = self.length
+        return [joined[i : i + length] for i in range(0, needed, length)]
+
+
+class ObjectIdGenerator(IdGenerator):
+    """Hex encoded ObjectIds, sortable by second"""
+
+    def generate_many(self, count: int, now: Optional[datetime] = None) -> List[str]:
+        if now is None:
+            return [str(ObjectId()) for _ in range(count)]
+        # Time of now, the process and counter bytes keep the ids unique
+        time = ObjectId.from_datetime(now).binary[:4]
+        return [str(ObjectId(time + ObjectId().binary[4:])) for _ in range(count)]
+
+
+CROCKFORD_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+# Naive datetimes are utc throughout vanmongo
+EPOCH = datetime(1970, 1, 1)
+
+
+class SortableIdGenerator(IdGenerator):
+    """
+    ULID-like ids, a millisecond time prefix followed by randomness
+
+    Ids generated by the same process are strictly increasing, which keeps
+    inserts at the end of the id index.
+    """
+
+    sortable = True
+
+    def __init__(self):
+        self.__pool = RandomPool()
+        self.__last_time = -1
+        self.__last_random = 0
+
+    def generate_many(self, count: int, now: Optional[datetime] = None) -> List[str]:
+        time = ((now or datetime.utcnow()) - EPOCH) // timedelta(milliseconds=1)
+
+        if time <= self.__last_time:
+            # Monotonic within the same millisecond or if the clock went back
+            time = self.__last_time
+            value = self.__last_random
+        else:
+            value = int.from_bytes(self.__pool.take(10), "big") >> 1
+
+        ids = []
+        for _ in range(count):
+            value += 1
+            ids.append(encode_crockford((time << 80) | value, 26))
+
+        self.__last_time = time
+        self.__last_random = value
+        return ids
+
+
+def encode_crockford(value: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        chars.append(CROCKFORD_ALPHABET[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+ID_GENERATORS: Dict[str, Type[IdGenerator]] = {
+    "shortuuid": ShortUUIDGenerator,
+    "objectid": ObjectIdGenerator,
+    "sortable": SortableIdGenerator,
+}
+
+
+def get_id_generator(strategy: Union[str, IdGenerator]) -> IdGenerator:
+    if isinstance(strategy, IdGenerator):
+        return strategy
+    if strategy not in ID_GENERATORS:
+        raise Exception(f'Unknown id strategy "{strategy}"')
+    return ID_GENERATORS[strategy]()
@@ -1,115 +1,351 @@
 from __future__ import annotations
 
-from asyncio import gather
-from typing import Any, ClassVar, Dict, Generic, List, Optional, Type, TypeVar, overload
+import logging
+import re
+from asyncio import Task, ensure_future, gather
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import (
+    Any,
+    AsyncContextManager,
+    AsyncIterator,
+    Awaitable,
+    ClassVar,
+    Dict,
+    Generic,
+    Iterator,
+    List,
+    Literal,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+    overload,
+)
 
 from aiodataloader import DataLoader
-from aiostream import stream
-from async_search_client import Client as SearchClient
-from motor.motor_asyncio import AsyncIOMotorClient
 from pydantic import BaseModel
 
+from .admission import (
+    AdmissionController,
+    AdmissionMetrics,
+    AdmissionPolicy,
+    Priority,
+    unlimited,
+)
+from .archive import ArchiveMover, ArchivePolicy, archive_name
+from .backends import Backend, get_backend
+from .cache import CacheBackend, ResultCache
 from .collection import Collection
+from .deadline import Deadline
 from .document import BaseDocument as InternalBaseDocument
-
+from .document import BatchPolicy, PartialDocument, RetryPolicy
+from .ids import IdGenerator, get_id_generator
+from .outbox import OUTBOX_COLLECTION, OutboxDispatcher
+from .pages import PageRefresher, dirty_values, mark_pages
+from .plan import QueryPlanChecker
+from .transaction import Transaction
+
+T = TypeVar("T")
 TContext = TypeVar("TContext", bound="BaseModel")
 TDocument = TypeVar("TDocument", bound="BaseDocument")
 TCollection = TypeVar("TCollection", bound="BaseCollection")
 
+logger = logging.getLogger(__name__)
+
+# Tenant of the client whose write triggered the current events
+event_tenant: ContextVar[Optional[str]] = ContextVar("event_tenant", default=None)
+
+TENANT_PATTERN = re.compile(r"[A-Za-z0-9_-]+")
+
 
 class Config(BaseModel):
     mongo_url: str
     mongo_database: str
     meilisearch_url: Optional[str] = None
     meilisearch_key: Optional[str] = None
+    setup: Literal["eager", "lazy", "background"] = "eager"
+    dispatch_outbox: bool = False
+    tenant_database: str = "{database}_{tenant}"
+    tenant_index_prefix: str = "{tenant}_"
+    check_query_plans: Optional[Literal["warn", "raise"]] = None
+    query_plan_sample_rate: float = 1.0
+    refresh_pages: Optional[float] = None
+    archive_interval: Optional[float] = None
+
+
+def create_find_by_ids(
+    client: Client, doc, partial: Optional[Type[PartialDocument]] = None
+):
+    Model = partial or doc
+    projection = partial._projection() if partial else None
+
+    async def find_group(shard, ids):
+        query = {"id": {"$in": ids}}
+        if shard is not None:
+            query.update(zip(doc._shard_key, shard))
+
+        async def read(collection: str):
+            # Batches run after the loads were queued, the deadline may have passed
+            cursor = client.db[collection].find(
+                query, projection, max_time_ms=client.max_time_ms()
+            )
+            try:
+                return [Model.parse_obj(raw) async for raw in cursor]
+            finally:
+                await cursor.close()
+
+        async with client.admit(doc._collection):
+            found = await client.within_deadline(read(doc._collection))
+        if not doc._archive or len(found) == len(ids):
+            return found
+
+        # Falls back to the archive for the ids missing from the collection
+        query["id"] = {"$in": list(set(ids) - {document.id for document in found})}
+        async with client.admit(archive_name(doc)):
+            archived = await client.within_deadline(read(archive_name(doc)))
+        return found + archived
+
+    async def find_by_ids(keys):
+        # Keys are ids or (id, shard key values), batch per shard to target them
+        groups: Dict[Any, List[str]] = {}
+        for key in keys:
+            id, shard = key if isinstance(key, tuple) else (key, None)
+            groups.setdefault(shard, []).append(id)
 
-
-def create_find_by_ids(db, doc):
-    async def find_by_ids(ids):
         documents = {}
-        async for raw in db[doc._collection].find({"$or": [{"id": i} for i in ids]}):
-            document = doc.parse_obj(raw)
-            documents[document.id] = document
-        return [documents.get(i) for i in ids]
+        results = await gather(*(find_group(s, ids) for s, ids in groups.items()))
+        for result in results:
+            for document in result:
+                documents[document.id] = document
+        return [
+            documents.get(key[0] if isinstance(key, tuple) else key) for key in keys
+        ]
 
     return find_by_ids
 
 
-async def default_make(instance: TDocument):
-    if not instance._search_fields:
-        raise AssertionError()
-    return instance.dict(include=set(["id"] + instance._search_fields))
-
-
 class Client(Generic[TContext]):
     """The VanMongo Client class"""
 
     __client: ClassVar[Any] = NotImplemented
     __search: ClassVar[Any] = NotImplemented
     __documents: ClassVar[Dict[str, Type[BaseDocument]]] = {}
+    __setup_task: ClassVar[Optional[Task]] = None
+    __tenant_setups: ClassVar[Dict[str, Task]] = {}
+    __search_listeners: ClassVar[Set[str]] = set()
+    __cache_listeners: ClassVar[Set[str]] = set()
+    __pages_listeners: ClassVar[Set[str]] = set()
+    __search_executor: ClassVar[Optional[Executor]] = None
+    __result_cache: ClassVar[Optional[ResultCache]] = None
+    __owns_search_executor: ClassVar[bool] = False
+    __plan_checker: ClassVar[Optional[QueryPlanChecker]] = None
+    __dispatcher: ClassVar[Optional[OutboxDispatcher]] = None
+    __tenant_dispatchers: ClassVar[Dict[str, OutboxDispatcher]] = {}
+    __page_refresher: ClassVar[Optional[PageRefresher]] = None
+    __tenant_page_refreshers: ClassVar[Dict[str, PageRefresher]] = {}
+    __archive_mover: ClassVar[Optional[ArchiveMover]] = None
+    __tenant_archive_movers: ClassVar[Dict[str, ArchiveMover]] = {}
+    __admission: ClassVar[Optional[AdmissionController]] = None
+    __transactions_supported: ClassVar[Optional[bool]] = None
     __loaders: Any = NotImplemented
+    __transaction: Optional[Transaction] = None
     config: ClassVar[Config] = NotImplemented
     context: Optional[TContext] = None
-
-    def __init__(self, context: TContext = None):
-        """Creates a VanMongo client instance"""
+    tenant: Optional[str] = None
+    priority: Priority = "interactive"
+    deadline: Optional[Deadline] = None
+
+    def __init__(
+        self,
+        context: TContext = None,
+        tenant: Optional[str] = None,
+        priority: Priority = "interactive",
+        timeout: Optional[float] = None,
+        deadline: Optional[Deadline] = None,
+    ):
+        """
+        Creates a VanMongo client instance
+        With a tenant, documents are read and written in the tenant's database
+        and search indexes, which are set up on the first operation
+        Operations of "batch" clients only get a share of the admission slots
+        Operations fail with DeadlineExceeded after the deadline, timeout
+        seconds from now or the deadline of the context, and are stopped on
+        the server with maxTimeMS
+        """
         if self.__client == NotImplemented:
             raise Exception("Client cannot be used before it has been initialized")
+        if tenant is not None and not TENANT_PATTERN.fullmatch(tenant):
+            raise Exception(f'Invalid tenant "{tenant}"')
 
         self.context = context
+        self.tenant = tenant
+        self.priority = priority
+        self.deadline = deadline or getattr(context, "deadline", None)
+        if timeout is not None and not deadline:
+            self.deadline = Deadline.after(timeout)
+
+        if not self.__setup_task and self.config.setup == "lazy":
+            Client.__start_setup()
 
         self.__loaders = {}
         for key, doc in self.__documents.items():
-            self.__loaders[key] = DataLoader(create_find_by_ids(self.db, doc))
+            self.__loaders[key] = DataLoader(create_find_by_ids(self, doc))
 
     @classmethod
-    async def __mongo_setup_indexes(cls):
-        db = cls.__client[cls.config.mongo_database]
+    async def __mongo_setup_indexes(cls, tenant: Optional[str] = None):
+        db = cls.__client[cls.database_name(tenant)]
 
         # Setup indexes
 
         # TODO only create indexes that don't already exist
         for key, doc in cls.__documents.items():
-            collection = db[key]
-
-            await collection.create_index("id", name="id")
-
-            for sort_key in doc._sort_options:
-                await collection.create_index(
-                    [(sort_key, 1), ("_id", 1)], name=f"sort_{sort_key}"
+            # The archive is read by id and paged through like the collection
+            names = [key, archive_name(doc)] if doc._archive else [key]
+            for name in names:
+                collection = db[name]
+
+                await collection.create_index("id", name="id")
+
+                if doc._shard_key and doc._shard_key != ["id"]:
+                    await collection.create_index(
+                        [(key, 1) for key in doc._shard_key], name="shard_key"
+                    )
+
+                for sort_key in doc._sort_options:
+                    await collection.create_index(
+                        [(sort_key, 1), (doc._order_field, 1)],
+                        name=f"sort_{sort_key}",
+                    )
+
+            if doc._order_field != "_id":
+                # Follows page on (updated_at, _id) whatever the order field
+                await db[key].create_index(
+                    [("updated_at", 1), ("_id", 1)], name="follow_updated_at"
                 )
 
+        if any(doc._outbox for doc in cls.__documents.values()):
+            await db[OUTBOX_COLLECTION].create_index(
+                "available_at", name="available_at"
+            )
+
     @classmethod
-    async def __search_setup_indexes(cls):
+    async def __search_setup_indexes(cls, tenant: Optional[str] = None):
         search = cls.__search
 
         for key, doc in cls.__documents.items():
             if not doc._search_fields:
                 continue
 
-            index = await search.get_or_create_index(key)
-            items = cls().use(doc)
+            await search.get_or_create_index(cls.index_name(key, tenant))
+
+            # Set up listener first, changes made while populating are kept
+            # Shared by all tenants, the index is picked from the writing client
+            async def update(type, item, context=None, key=key, doc=doc):
+                index = search.index(cls.index_name(key, event_tenant.get()))
+                maker = doc._search_maker
+                executor = cls.search_executor() if maker.cpu_bound else None
+                made = await maker.make_many([item], executor)
+                await index.update_documents(made)
+
+            if key not in cls.__search_listeners:
+                cls.__search_listeners.add(key)
+                # Only changes to the searched fields are reindexed
+                doc.on_change(update, fields=doc._search_fields)
+
+            # Populating must not starve the requests served meanwhile
+            await cls(tenant=tenant, priority="batch").use(doc).reindex()
+
+    @classmethod
+    def __cache_setup_invalidation(cls):
+        # Writes of all tenants bump the version of their collection
+        for key, doc in cls.__documents.items():
+            if not doc._cache or key in cls.__cache_listeners:
+                continue
+
+            async def invalidate(type, item, context=None, key=key):
+                if cls.__result_cache:
+                    database = cls.database_name(event_tenant.get())
+                    await cls.__result_cache.invalidate(database, key)
 
-            async with stream.chunks(items.find(), 50).stream() as chunks:
-                async for chunk in chunks:
-                    items_futures = []
+            cls.__cache_listeners.add(key)
+            doc.on_change(invalidate)
 
-                    # TODO support sync or async
+    @classmethod
+    def __pages_setup_marks(cls):
+        # Writes of all tenants mark the page boundaries they may have moved
+        for key, doc in cls.__documents.items():
+            if not doc._page_index or key in cls.__pages_listeners:
+                continue
 
-                    for n in chunk:
-                        items_futures.append(default_make(n))
+            async def mark(type, item, context=None, changes=None, previous=None):
+                db = cls.__client[cls.database_name(event_tenant.get())]
+                await mark_pages(db, item, dirty_values(type, item, changes, previous))
 
-                    items = await gather(*items_futures)
+            cls.__pages_listeners.add(key)
+            doc.on_change(mark)
 
-                    await index.update_documents(items)
+    @classmethod
+    async def __setup(cls):
+        # Setup mongo indexes
+        await cls.__mongo_setup_indexes()
 
-            # TODO make this not terrible
+        # Setup search
+        if cls.__search != NotImplemented:
+            await cls.__search_setup_indexes()
+
+    @classmethod
+    def __start_setup(cls):
+        cls.__setup_task = ensure_future(cls.__setup())
 
-            # Set up listener
-            async def test(type, item, context=None):
-                await index.update_documents([await default_make(item)])
+    @classmethod
+    async def __setup_tenant(cls, tenant: str):
+        await cls.__mongo_setup_indexes(tenant)
 
-            doc.on_change(test)
+        if cls.__search != NotImplemented:
+            await cls.__search_setup_indexes(tenant)
+
+    @classmethod
+    def __start_tenant_setup(cls, tenant: str):
+        # Started from operations, clients may be created without a running loop
+        if tenant in cls.__tenant_setups:
+            return
+
+        def done(task: Task):
+            if task.cancelled() or not task.exception():
+                return
+            logger.error(
+                'Setting up tenant "%s" failed', tenant, exc_info=task.exception()
+            )
+            # The next operation of the tenant tries again
+            if cls.__tenant_setups.get(tenant) is task:
+                del cls.__tenant_setups[tenant]
+
+        task = ensure_future(cls.__setup_tenant(tenant))
+        task.add_done_callback(done)
+        cls.__tenant_setups[tenant] = task
+
+        # Outbox entries are written in the tenant database
+        if cls.config.dispatch_outbox and tenant not in cls.__tenant_dispatchers:
+            cls.__tenant_dispatchers[tenant] = OutboxDispatcher(cls(tenant=tenant))
+            cls.__tenant_dispatchers[tenant].start()
+
+        # So are the page indexes
+        if cls.config.refresh_pages and tenant not in cls.__tenant_page_refreshers:
+            cls.__tenant_page_refreshers[tenant] = PageRefresher(
+                cls(tenant=tenant), cls.config.refresh_pages
+            )
+            cls.__tenant_page_refreshers[tenant].start()
+
+        # And the archives
+        if cls.config.archive_interval and tenant not in cls.__tenant_archive_movers:
+            cls.__tenant_archive_movers[tenant] = ArchiveMover(
+                cls(tenant=tenant, priority="batch"), cls.config.archive_interval
+            )
+            cls.__tenant_archive_movers[tenant].start()
 
     @classmethod
     async def initialize(
@@ -118,6 +354,19 @@ class Client(Generic[TContext]):
         mongo_database: str = None,
         meilisearch_url: Optional[str] = None,
         meilisearch_key: Optional[str] = None,
+        setup: Literal["eager", "lazy", "background"] = "eager",
+        backend: Optional[Backend] = None,
+        check_query_plans: Optional[Literal["warn", "raise"]] = None,
+        query_plan_sample_rate: float = 1.0,
+        dispatch_outbox: bool = False,
+        tenant_database: str = "{database}_{tenant}",
+        tenant_index_prefix: str = "{tenant}_",
+        search_executor: Optional[Executor] = None,
+        cache: Optional[CacheBackend] = None,
+        cache_ttl: float = 60,
+        refresh_pages: Optional[float] = None,
+        admission: Optional[AdmissionPolicy] = None,
+        archive_interval: Optional[float] = None,
     ):
         """
         Initialize client setting for Vanmongo
@@ -127,33 +376,155 @@ class Client(Generic[TContext]):
         mongo_database: The name of the database. Eg. "mydb"
         meilisearch_url: The URL of MeiliSearch’s address
         meilisearch_key: The key for access permission for the MeiliSearch API
+        setup: When indexes are set up and search is populated
+            "eager" waits for the setup before returning,
+            "background" starts the setup without waiting for it and
+            "lazy" starts the setup once the first client is created.
+            Use Client.ready() to wait for the setup to complete
+        backend: Creates the MongoDB and MeiliSearch clients, defaults to
+            in-memory stand-ins for "memory://" urls and motor otherwise
+        check_query_plans: Explain find and find_connection queries and
+            "warn" or "raise" when they scan the collection or sort in memory.
+            Each query shape is explained once, meant for development and CI
+        query_plan_sample_rate: Share of new query shapes that are explained
+        dispatch_outbox: Run an OutboxDispatcher in the background until
+            shutdown, dispatching the events of documents declared with outbox,
+            and one per tenant from its first operation
+        tenant_database: Name of the database of Client(tenant=...),
+            formatted with the database and tenant
+        tenant_index_prefix: Prefix of the search indexes of a tenant
+        search_executor: Runs the cpu_bound search document functions,
+            defaults to a process pool created on first use
+        cache: Caches the find_one and find_connection results of documents
+            declared with cache, invalidated by every write to their collection
+        cache_ttl: Seconds results are cached at most
+        refresh_pages: Refresh the page indexes of documents declared with
+            page_index in the background every refresh_pages seconds,
+            and those of each tenant from its first operation
+        admission: Limits the MongoDB operations running at once, globally
+            and per collection, operations beyond them wait in a bounded queue
+        archive_interval: Move the old documents of documents declared with
+            archive in the background every archive_interval seconds,
+            and those of each tenant from its first operation
         """
         cls.config = Config(
             mongo_url=mongo_url,
             mongo_database=mongo_database,
             meilisearch_url=meilisearch_url,
             meilisearch_key=meilisearch_key,
+            setup=setup,
+            check_query_plans=check_query_plans,
+            query_plan_sample_rate=query_plan_sample_rate,
+            dispatch_outbox=dispatch_outbox,
+            tenant_database=tenant_database,
+            tenant_index_prefix=tenant_index_prefix,
+            refresh_pages=refresh_pages,
+            archive_interval=archive_interval,
         )
-        cls.__client = AsyncIOMotorClient(cls.config.mongo_url)
+        cls.__search_executor = search_executor
+        if admission:
+            cls.__admission = AdmissionController(admission)
+        backend = backend or get_backend(cls.config.mongo_url)
+        cls.__client = backend.create_mongo_client(cls.config.mongo_url)
+
+        if cls.config.check_query_plans:
+            cls.__plan_checker = QueryPlanChecker(
+                cls.config.check_query_plans, cls.config.query_plan_sample_rate
+            )
 
-        # Setup mongo indexes
-        await cls.__mongo_setup_indexes()
+        if cache:
+            cls.__result_cache = ResultCache(cache, cache_ttl)
+            cls.__cache_setup_invalidation()
+
+        cls.__pages_setup_marks()
 
-        # Setup search
         if cls.config.meilisearch_url:
-            cls.__search = SearchClient(
+            cls.__search = backend.create_search_client(
                 cls.config.meilisearch_url, cls.config.meilisearch_key
             )
 
-            await cls.__search_setup_indexes()
+        if setup == "eager":
+            await cls.__setup()
+        elif setup == "background":
+            cls.__start_setup()
+
+        if dispatch_outbox:
+            cls.__dispatcher = OutboxDispatcher(cls())
+            cls.__dispatcher.start()
+
+        if refresh_pages:
+            cls.__page_refresher = PageRefresher(cls(), refresh_pages)
+            cls.__page_refresher.start()
+
+        if archive_interval:
+            # Moves must not starve the requests served meanwhile
+            cls.__archive_mover = ArchiveMover(cls(priority="batch"), archive_interval)
+            cls.__archive_mover.start()
+
+    @classmethod
+    async def ready(cls, tenant: Optional[str] = None):
+        """Wait for indexes and search to be set up, of a tenant if given"""
+        if tenant is not None:
+            cls.__start_tenant_setup(tenant)
+            await cls.__tenant_setups[tenant]
+        if cls.__setup_task:
+            await cls.__setup_task
+        elif cls.config.setup == "lazy":
+            cls.__start_setup()
+            await cls.ready()
 
     @classmethod
     async def shutdown(cls):
+        if cls.__dispatcher:
+            await cls.__dispatcher.stop()
+
+        for dispatcher in cls.__tenant_dispatchers.values():
+            await dispatcher.stop()
+
+        if cls.__page_refresher:
+            await cls.__page_refresher.stop()
+
+        for refresher in cls.__tenant_page_refreshers.values():
+            await refresher.stop()
+
+        if cls.__archive_mover:
+            await cls.__archive_mover.stop()
+
+        for mover in cls.__tenant_archive_movers.values():
+            await mover.stop()
+
+        setups = list(cls.__tenant_setups.values())
+        if cls.__setup_task:
+            setups.append(cls.__setup_task)
+        for setup in setups:
+            setup.cancel()
+        await gather(*setups, return_exceptions=True)
+
         if cls.__search != NotImplemented:
             await cls.__search.aclose()
 
+        if cls.__owns_search_executor and cls.__search_executor:
+            cls.__search_executor.shutdown()
+
         cls.__client = NotImplemented
         cls.__search = NotImplemented
+        cls.__setup_task = None
+        cls.__tenant_setups = {}
+        cls.__search_listeners = set()
+        cls.__cache_listeners = set()
+        cls.__pages_listeners = set()
+        cls.__search_executor = None
+        cls.__owns_search_executor = False
+        cls.__plan_checker = None
+        cls.__result_cache = None
+        cls.__dispatcher = None
+        cls.__tenant_dispatchers = {}
+        cls.__page_refresher = None
+        cls.__tenant_page_refreshers = {}
+        cls.__archive_mover = None
+        cls.__tenant_archive_movers = {}
+        cls.__admission = None
+        cls.__transactions_supported = None
         cls.__documents = {}
         cls.__loaders = NotImplemented
         cls.config = NotImplemented
@@ -165,9 +536,50 @@ class Client(Generic[TContext]):
             raise Exception(f'Document with collection "{key}" already exists')
         cls.__documents[key] = Document
 
+    @classmethod
+    def get_document(cls, collection: str) -> Type[BaseDocument]:
+        return cls.__documents[collection]
+
+    @classmethod
+    def documents(cls) -> List[Type[BaseDocument]]:
+        return list(cls.__documents.values())
+
+    async def supports_transactions(self) -> bool:
+        """Whether MongoDB runs as a replica set or sharded cluster"""
+        if Client.__transactions_supported is None:
+            hello = await self.db.command("ismaster")
+            Client.__transactions_supported = (
+                bool(hello.get("setName")) or hello.get("msg") == "isdbgrid"
+            )
+        return Client.__transactions_supported
+
+    @classmethod
+    def database_name(cls, tenant: Optional[str] = None) -> str:
+        if tenant is None:
+            return cls.config.mongo_database
+        return cls.config.tenant_database.format(
+            database=cls.config.mongo_database, tenant=tenant
+        )
+
+    @classmethod
+    def index_name(cls, collection: str, tenant: Optional[str] = None) -> str:
+        if tenant is None:
+            return collection
+        return cls.config.tenant_index_prefix.format(tenant=tenant) + collection
+
     @property
     def db(self):
-        return self.__client[self.config.mongo_database]
+        # Tenants share the connection pool of the client
+        return self.__client[self.database_name(self.tenant)]
+
+    @contextmanager
+    def events(self) -> Iterator[None]:
+        """Events triggered in the block were caused by this client"""
+        token = event_tenant.set(self.tenant)
+        try:
+            yield
+        finally:
+            event_tenant.reset(token)
 
     @property
     def search(self):
@@ -175,10 +587,90 @@ class Client(Generic[TContext]):
             raise Exception("Search has not been initialized")
         return self.__search
 
+    def admit(self, collection: str) -> AsyncContextManager[None]:
+        """Wait for a slot to run an operation on the collection"""
+        if self.tenant is not None:
+            Client.__start_tenant_setup(self.tenant)
+        if not self.__admission:
+            return unlimited()
+        return self.__admission.admit(collection, self.priority, self.deadline)
+
+    def max_time_ms(self) -> Optional[int]:
+        """Time left before the deadline, passed to MongoDB as maxTimeMS"""
+        return self.deadline.max_time_ms() if self.deadline else None
+
+    async def within_deadline(self, operation: Awaitable[T]) -> T:
+        """Wait for an operation, cancelled once the deadline passes"""
+        if self.tenant is not None:
+            Client.__start_tenant_setup(self.tenant)
+        if not self.deadline:
+            return await operation
+        return await self.deadline.run(operation)
+
+    @property
+    def admission_metrics(self) -> Dict[Tuple[str, Priority], AdmissionMetrics]:
+        """Admitted and rejected operations per collection and priority"""
+        return self.__admission.metrics if self.__admission else {}
+
+    @property
+    def result_cache(self) -> Optional[ResultCache]:
+        return self.__result_cache
+
+    @classmethod
+    def search_executor(cls) -> Executor:
+        if not cls.__search_executor:
+            cls.__search_executor = ProcessPoolExecutor()
+            cls.__owns_search_executor = True
+        return cls.__search_executor
+
+    @property
+    def plan_checker(self) -> Optional[QueryPlanChecker]:
+        return self.__plan_checker
+
     @property
     def loaders(self):
         return self.__loaders
 
+    def partial_loader(self, Partial: Type[PartialDocument]) -> DataLoader:
+        """Loader of partial documents, kept apart from the full documents"""
+        key = (Partial._document._collection, Partial._fields)
+        if key not in self.__loaders:
+            self.__loaders[key] = DataLoader(
+                create_find_by_ids(self, Partial._document, Partial)
+            )
+        loader: DataLoader = self.__loaders[key]
+        return loader
+
+    @property
+    def active_transaction(self) -> Optional[Transaction]:
+        return self.__transaction
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[Transaction]:
+        """
+        Group the writes of all collections into a single transaction
+
+        Writes are queued and committed when the block exits, events are
+        triggered once the commit succeeded. Queued writes are not visible to
+        reads until then, except for updates by id which continue from the
+        queued state of the document.
+        Requires MongoDB to run as a replica set.
+        """
+        if self.__transaction:
+            raise Exception("Transaction already in progress")
+        if self.tenant is not None:
+            Client.__start_tenant_setup(self.tenant)
+
+        transaction = Transaction(self)
+        self.__transaction = transaction
+        try:
+            yield transaction
+            await transaction.commit()
+        finally:
+            self.__transaction = None
+
+        await transaction.trigger_events()
+
     @overload
     def use(
         self: "Client[TContext]", DocumentorCollection: Type[TDocument]
@@ -232,12 +724,22 @@ class BaseDocument(InternalBaseDocument):
         collection: Optional[str] = None,
         sort_options: Optional[List[str]] = None,
         search: Optional[List[str]] = None,
+        versioned: bool = False,
+        retry_policy: Optional[RetryPolicy] = None,
+        id_strategy: Union[str, IdGenerator] = "shortuuid",
+        shard_key: Optional[List[str]] = None,
+        batch_policy: Optional[BatchPolicy] = None,
+        outbox: bool = False,
+        cache: bool = False,
+        page_index: Optional[int] = None,
+        archive: Optional[ArchivePolicy] = None,
         **kwargs,
     ):
         # NOTE: known issue in mypy
         # https://github.com/python/mypy/issues/4660
         super().__init_subclass__(*args, **kwargs)  # type: ignore
         cls.__events = []
+        cls._migrations = {}
 
         if collection:
             cls._collection = collection
@@ -251,4 +753,27 @@ class BaseDocument(InternalBaseDocument):
 
         cls._search_fields = search
 
+        cls._versioned = versioned
+        if versioned:
+            # Incremented on every update
+            cls._add_field("version", Optional[int])
+        if retry_policy:
+            cls._retry_policy = retry_policy
+
+        cls._id_generator = get_id_generator(id_strategy)
+        cls._order_field = "id" if cls._id_generator.sortable else "_id"
+
+        cls._shard_key = shard_key
+
+        # Observed sizes are kept per document
+        cls._batch_policy = (batch_policy or BatchPolicy()).copy(deep=True)
+
+        cls._outbox = outbox
+
+        cls._cache = cache
+
+        cls._page_index = page_index
+
+        cls._archive = archive
+
         Client._register_document(cls)
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+from asyncio import sleep
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from pydantic import BaseModel
+from pymongo import ASCENDING, ReplaceOne
+
+from .archive import archive_name
+from .connection import MongoCursor, keyset_query
+from .document import SCHEMA_VERSION
+from .follow import Checkpoint, MongoCheckpoint
+
+if TYPE_CHECKING:
+    from .collection import Collection
+
+
+class MigrationStats(BaseModel):
+    """Progress of a backfill"""
+
+    """Outdated documents read"""
+    documents: int = 0
+    """Documents written, those updated meanwhile were already migrated"""
+    migrated: int = 0
+    seconds: float = 0
+
+    @property
+    def docs_per_second(self) -> float:
+        return self.documents / self.seconds if self.seconds else 0
+
+
+async def migrate_documents(
+    collection: Collection,
+    batch_size: int = 500,
+    max_rate: Optional[float] = None,
+    checkpoint: Optional[Checkpoint] = None,
+    archived: bool = False,
+) -> MigrationStats:
+    """Write the migrated version of every outdated document"""
+    Document = collection.Document
+    latest = Document._schema_version()
+    if latest is None:
+        raise Exception("Document declares no migrations")
+
+    # Backfills must not starve the requests served meanwhile
+    client = type(collection.client)(
+        tenant=collection.client.tenant,
+        priority="batch",
+        deadline=collection.client.deadline,
+    )
+    name = archive_name(Document) if archived else Document._collection
+    target = collection.archive_collection if archived else collection.collection
+    # Per version, backfills of new migrations start over
+    checkpoint = checkpoint or MongoCheckpoint(client, f"migrations:{name}:{latest}")
+    order_field = Document._order_field
+
+    outdated = {"$or": [{SCHEMA_VERSION: {"$lt": latest}}, {SCHEMA_VERSION: None}]}
+    stats = MigrationStats()
+    start = perf_counter()
+    while True:
+        query: Dict[str, Any] = outdated
+        position = await checkpoint.load()
+        if position:
+            cursor = MongoCursor.base64_decode(position)
+            query = {**outdated, **keyset_query(cursor, None, order_field)}
+
+        async with client.admit(name):
+            raws = [
+                raw
+                async for raw in target.find(query)
+                .sort(order_field, ASCENDING)
+                .limit(batch_size)
+            ]
+        if not raws:
+            break
+
+        requests = []
+        for raw in raws:
+            migrated, _ = Document._migrate(raw)
+            # Updates write migrated documents whole, those are left alone
+            requests.append(
+                ReplaceOne(
+                    {"_id": raw["_id"], SCHEMA_VERSION: raw.get(SCHEMA_VERSION)},
+                    migrated,
+                )
+            )
+        async with client.admit(name):
+            result = await target.bulk_write(requests, ordered=False)
+
+        stats.documents += len(raws)
+        stats.migrated += result.modified_count
+        await checkpoint.save(
+            MongoCursor(id=str(raws[-1][order_field])).base64_encode()
+        )
+
+        stats.seconds = perf_counter() - start
+        if len(raws) < batch_size:
+            break
+        if max_rate:
+            # Spread the writes so the primary keeps up with the requests
+            ahead = stats.documents / max_rate - stats.seconds
+            if ahead > 0:
+                await sleep(ahead)
+
+    # Documents outdated later, e.g. restored from the archive, may land
+    # before the position, the next backfill walks everything again
+    await checkpoint.clear()
+    stats.seconds = perf_counter() - start
+    return stats
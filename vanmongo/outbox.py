@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import logging
+from asyncio import Semaphore, Task, ensure_future, gather, sleep
+from datetime import timedelta
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from bson.objectid import ObjectId
+from pymongo import ASCENDING
+
+from .document import BaseDocument, RetryPolicy
+from .events import EventType
+from .ids import utcnow
+
+if TYPE_CHECKING:
+    from .main import Client
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_COLLECTION = "vanmongo_outbox"
+
+
+def outbox_entry(
+    type: EventType,
+    document: BaseDocument,
+    changes: Optional[Dict[str, Any]] = None,
+    previous: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Outbox entry of an event, written along with the document"""
+    now = utcnow()
+    return {
+        "collection": document._collection,
+        "type": type.value,
+        "document": document.dict(by_alias=True),
+        "changes": changes,
+        "previous": previous,
+        "attempts": 0,
+        "available_at": now,
+        "created_at": now,
+    }
+
+
+class OutboxDispatcher:
+    """
+    Runs the handlers of the events recorded in the outbox
+
+    Entries are claimed in batches with a lease, entries whose lease expired
+    because their dispatcher died are claimed again, so any number of
+    dispatchers can run side by side. Handlers of an entry run again until
+    they all succeed, delivery is at least once. Entries which fail
+    retry_policy.attempts times are kept with their error and not retried.
+    """
+
+    def __init__(
+        self,
+        client: Client,
+        batch_size: int = 100,
+        concurrency: int = 10,
+        lease: timedelta = timedelta(seconds=30),
+        poll_interval: float = 1,
+        retry_policy: RetryPolicy = RetryPolicy(
+            attempts=10, backoff=1, max_backoff=300
+        ),
+    ):
+        self.client = client
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self.retry_policy = retry_policy
+        self.__task: Optional[Task] = None
+
+    @property
+    def collection(self):
+        return self.client.db[OUTBOX_COLLECTION]
+
+    async def claim(self) -> List[Dict[str, Any]]:
+        """Lease a batch of available entries"""
+        now = utcnow()
+        available = {"available_at": {"$lte": now}}
+        cursor = self.collection.find(available, {"_id": 1})
+        cursor.sort([("available_at", ASCENDING)]).limit(self.batch_size)
+        ids = [raw["_id"] async for raw in cursor]
+        if not ids:
+            return []
+
+        # Only entries still available are leased, others were claimed meanwhile
+        lease = ObjectId()
+        await self.collection.update_many(
+            {"_id": {"$in": ids}, **available},
+            {
+                "$set": {"available_at": now + self.lease, "lease": lease},
+                "$inc": {"attempts": 1},
+            },
+        )
+        return [raw async for raw in self.collection.find({"lease": lease})]
+
+    async def dispatch(self, entry: Dict[str, Any]):
+        """Run the handlers of an entry, then remove it or schedule a retry"""
+        lease = {"_id": entry["_id"], "lease": entry["lease"]}
+        try:
+            # Entries of unknown or changed documents fail like their handlers
+            Document = self.client.get_document(entry["collection"])
+            document = Document.parse_obj(entry["document"])
+            with self.client.events():
+                if entry["type"] == EventType.CREATE.value:
+                    await Document._trigger_create(document)
+                else:
+                    await Document._trigger_update(
+                        document, changes=entry["changes"], previous=entry["previous"]
+                    )
+        except Exception as error:
+            logger.exception("Outbox event %s failed", entry["_id"])
+            attempts = entry["attempts"]
+            retry_at = None
+            if attempts < self.retry_policy.attempts:
+                delay = self.retry_policy.delay(attempts)
+                retry_at = utcnow() + timedelta(seconds=delay)
+            await self.collection.update_one(
+                lease, {"$set": {"available_at": retry_at, "error": repr(error)}}
+            )
+            return
+        await self.collection.delete_one(lease)
+
+    async def run_once(self) -> int:
+        """Dispatch one batch of entries, returns the number of entries"""
+        entries = await self.claim()
+        semaphore = Semaphore(self.concurrency)
+
+        async def dispatch(entry):
+            async with semaphore:
+                await self.dispatch(entry)
+
+        await gather(*(dispatch(entry) for entry in entries))
+        return len(entries)
+
+    async def run(self):
+        """Dispatch entries until cancelled"""
+        while True:
+            try:
+                if await self.run_once() == self.batch_size:
+                    continue
+            except Exception:
+                logger.exception("Outbox dispatch failed")
+            await sleep(self.poll_interval)
+
+    def start(self):
+        if not self.__task:
+            self.__task = ensure_future(self.run())
+
+    async def stop(self):
+        if self.__task:
+            self.__task.cancel()
+            await gather(self.__task, return_exceptions=True)
+            self.__task = None
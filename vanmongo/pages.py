@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import logging
+from asyncio import Task, ensure_future, gather, sleep
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from bson.objectid import ObjectId
+from pymongo import ASCENDING, ReturnDocument
+
+from .connection import MongoCursor, keyset_query
+from .events import EventType
+from .ids import utcnow
+
+if TYPE_CHECKING:
+    from .collection import Collection
+    from .document import BaseDocument
+    from .main import Client
+
+logger = logging.getLogger(__name__)
+
+PAGES_COLLECTION = "vanmongo_pages"
+
+
+def pages_key(collection: str, sort: Optional[str]) -> str:
+    return f"{collection}:{sort or ''}"
+
+
+def before(value: Any, other: Any) -> bool:
+    # None sorts first, as in MongoDB
+    if other is None:
+        return False
+    return value is None or value < other
+
+
+def dirty_values(
+    type: EventType,
+    document: BaseDocument,
+    changes: Optional[Dict[str, Any]] = None,
+    previous: Optional[Dict[str, Any]] = None,
+) -> Dict[Optional[str], Any]:
+    """
+    Lowest value of every sort a write may have moved documents at, the
+    boundaries before it are still in place
+    """
+    order_value = document.object_id if document._order_field == "_id" else document.id
+    values: Dict[Optional[str], Any] = {}
+    if type == EventType.CREATE:
+        values[None] = order_value
+        for sort in document._sort_options:
+            values[sort] = getattr(document, sort)
+        return values
+
+    for sort in document._sort_options:
+        if sort == "updated_at":
+            # Its previous value is not known, but it never precedes created_at
+            values[sort] = document.created_at
+        elif changes and sort in changes:
+            old, new = (previous or {}).get(sort), changes[sort]
+            values[sort] = old if before(old, new) else new
+    return values
+
+
+class PageIndex:
+    """
+    Boundaries of the pages of a collection, the sort values of every
+    page_size-th document per sort option, walked on the sort indexes
+
+    Writes mark the position from which the boundaries may have moved, a
+    refresh only walks the index from the last boundary before it, so
+    appending documents only walks the new ones. Pages are exact as of the
+    last refresh, in between they may be shifted by the documents written.
+    """
+
+    def __init__(self, collection: Collection, page_size: int):
+        self.collection = collection
+        self.page_size = page_size
+
+    @property
+    def pages(self):
+        return self.collection.client.db[PAGES_COLLECTION]
+
+    def __order_value(self, id: str) -> Any:
+        order_field = self.collection.Document._order_field
+        return ObjectId(id) if order_field == "_id" else id
+
+    def __find(self, sort: Optional[str], query: Dict[str, Any]):
+        order_field = self.collection.Document._order_field
+        projection = {order_field: 1, **({sort: 1} if sort else {})}
+        mongo_sort = [(order_field, ASCENDING)]
+        if sort:
+            mongo_sort = [(sort, ASCENDING)] + mongo_sort
+        return self.collection.collection.find(query, projection).sort(mongo_sort)
+
+    def __boundary(self, sort: Optional[str], raw: Dict[str, Any]) -> Dict[str, Any]:
+        order_field = self.collection.Document._order_field
+        return {"id": str(raw[order_field]), "value": raw.get(sort) if sort else None}
+
+    async def refresh(self, sort: Optional[str] = None):
+        """Walk the documents after the last boundary still in place"""
+        key = pages_key(self.collection.Document._collection, sort)
+
+        # Writes from now on mark the boundaries again
+        state = await self.pages.find_one_and_update(
+            {"_id": key},
+            {"$unset": {"dirty_from": ""}},
+            upsert=True,
+            return_document=ReturnDocument.BEFORE,
+        )
+
+        boundaries: List[Dict[str, Any]] = []
+        if state and state.get("page_size") == self.page_size:
+            if "dirty_from" not in state:
+                return
+            dirty_from = state["dirty_from"]
+            for boundary in state["boundaries"]:
+                value = (
+                    boundary["value"] if sort else self.__order_value(boundary["id"])
+                )
+                if not before(value, dirty_from):
+                    break
+                boundaries.append(boundary)
+
+        query: Dict[str, Any] = {}
+        if boundaries:
+            cursor = MongoCursor(sort=sort, **boundaries[-1])
+            query = keyset_query(cursor, sort, self.collection.Document._order_field)
+
+        count = len(boundaries) * self.page_size
+        async for raw in self.__find(sort, query):
+            count += 1
+            if count % self.page_size == 0:
+                boundaries.append(self.__boundary(sort, raw))
+
+        await self.pages.update_one(
+            {"_id": key},
+            {
+                "$set": {
+                    "boundaries": boundaries,
+                    "count": count,
+                    "page_size": self.page_size,
+                    "refreshed_at": utcnow(),
+                }
+            },
+        )
+
+    async def cursor(
+        self, page: int, size: int, sort: Optional[str] = None, reverse: bool = False
+    ) -> Optional[str]:
+        """Cursor of the document before a page of find_connection"""
+        if page < 1:
+            raise Exception("Pages start at 1")
+        if page == 1:
+            return None
+
+        key = pages_key(self.collection.Document._collection, sort)
+        state = await self.pages.find_one({"_id": key})
+        if not state or state.get("page_size") != self.page_size:
+            await self.refresh(sort)
+            state = await self.pages.find_one({"_id": key})
+
+        # Position of the document before the page in ascending order
+        position = (page - 1) * size - 1
+        if reverse:
+            position = state["count"] - (page - 1) * size
+        if position < 0 or position >= state["count"]:
+            raise Exception(f"Page {page} is out of range")
+
+        # Start from the last boundary before it, skipping less than page_size
+        boundaries = state["boundaries"]
+        walked = min(position // self.page_size, len(boundaries))
+        query: Dict[str, Any] = {}
+        if walked:
+            cursor = MongoCursor(sort=sort, **boundaries[walked - 1])
+            query = keyset_query(cursor, sort, self.collection.Document._order_field)
+        skip = position - walked * self.page_size
+
+        async for raw in self.__find(sort, query).skip(skip).limit(1):
+            return MongoCursor(sort=sort, **self.__boundary(sort, raw)).base64_encode()
+        raise Exception(f"Page {page} is out of range")
+
+
+async def mark_pages(db: Any, document: BaseDocument, values: Dict[Optional[str], Any]):
+    """Mark the boundaries from the lowest value written"""
+    pages = db[PAGES_COLLECTION]
+    for sort, value in values.items():
+        await pages.update_one(
+            {"_id": pages_key(document._collection, sort)},
+            {"$min": {"dirty_from": value}},
+        )
+
+
+class PageRefresher:
+    """Refreshes the page indexes of all documents declared with page_index"""
+
+    def __init__(self, client: Client, interval: float = 60):
+        self.client = client
+        self.interval = interval
+        self.__task: Optional[Task] = None
+
+    async def run_once(self):
+        for Document in self.client.documents():
+            if Document._page_index:
+                await self.client.use(Document).refresh_pages()
+
+    async def run(self):
+        """Refresh pages until cancelled"""
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Page refresh failed")
+            await sleep(self.interval)
+
+    def start(self):
+        if not self.__task:
+            self.__task = ensure_future(self.run())
+
+    async def stop(self):
+        if self.__task:
+            self.__task.cancel()
+            await gather(self.__task, return_exceptions=True)
+            self.__task = None
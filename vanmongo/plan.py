@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import json
+from random import random
+from typing import TYPE_CHECKING, Any, Dict, List, Literal, Optional, Tuple
+from warnings import warn
+
+if TYPE_CHECKING:
+    from .collection import Collection
+
+FULL_BOUNDS = "[MinKey, MaxKey]"
+
+
+class QueryPlanWarning(UserWarning):
+    """A query scans the whole collection or sorts in memory"""
+
+
+class QueryPlanError(Exception):
+    """A query scans the whole collection or sorts in memory"""
+
+
+def query_shape(query: Any) -> Any:
+    """The query with values replaced, queries of the same shape share a plan"""
+    if not isinstance(query, dict):
+        # Values and value lists, $in of any length shares the plan
+        return 1
+    return {
+        # Operators and field names are kept, logical branches walked
+        key: [query_shape(branch) for branch in value]
+        if key in ("$or", "$and", "$nor")
+        else query_shape(value)
+        for key, value in query.items()
+    }
+
+
+def query_fields(query: Dict[str, Any]) -> List[str]:
+    fields: List[str] = []
+    for key, value in query.items():
+        if key in ("$or", "$and", "$nor"):
+            for branch in value:
+                fields += [f for f in query_fields(branch) if f not in fields]
+        elif not key.startswith("$") and key not in fields:
+            fields.append(key)
+    return fields
+
+
+def plan_problems(stage: Dict[str, Any], parent_filter: bool = False) -> List[str]:
+    """Problems found in a winning plan"""
+    # Slot based execution nests the classic plan
+    stage = stage.get("queryPlan", stage)
+    name = stage.get("stage")
+
+    problems = []
+    if name == "COLLSCAN":
+        problems.append("COLLSCAN")
+    elif name == "SORT":
+        problems.append("SORT")
+    elif name == "IXSCAN" and parent_filter:
+        bounds = stage.get("indexBounds") or {}
+        if bounds and all(b == [FULL_BOUNDS] for b in bounds.values()):
+            problems.append(f"full scan of index {stage.get('indexName')}")
+
+    children = stage.get("inputStages") or []
+    if stage.get("inputStage"):
+        children = [stage["inputStage"]]
+    has_filter = name == "FETCH" and bool(stage.get("filter"))
+    for child in children:
+        problems += [p for p in plan_problems(child, has_filter) if p not in problems]
+    return problems
+
+
+def suggest_index(collection: Collection, query: Dict[str, Any], sort: List[Any]):
+    Document = collection.Document
+    indexed = ["_id", "id"] + Document._sort_options + (Document._shard_key or [])
+    missing = [field for field, _ in sort if field not in indexed]
+    missing += [f for f in query_fields(query) if f not in indexed and f not in missing]
+    if not missing:
+        return ""
+    return (
+        f"; index {', '.join(missing)} by adding them to "
+        f"{Document.__name__}(sort_options=[...])"
+    )
+
+
+class QueryPlanChecker:
+    """
+    Explains a sample of queries per query shape and warns about or raises on
+    collection scans and blocking in-memory sorts
+
+    Verdicts are cached per shape so every shape is only explained once.
+    """
+
+    def __init__(
+        self, mode: Literal["warn", "raise"] = "warn", sample_rate: float = 1.0
+    ):
+        self.mode = mode
+        self.sample_rate = sample_rate
+        self.verdicts: Dict[Tuple[str, str, str], Optional[str]] = {}
+
+    async def check(
+        self,
+        collection: Collection,
+        query: Dict[str, Any],
+        sort: List[Any],
+        limit: Optional[int] = None,
+    ):
+        key = (
+            collection.Document._collection,
+            json.dumps(query_shape(query), sort_keys=True),
+            json.dumps(sort),
+        )
+
+        if key not in self.verdicts:
+            if random() >= self.sample_rate:
+                return
+
+            cursor = collection.collection.find(query).sort(sort)
+            if limit:
+                cursor.limit(limit)
+            explained = await cursor.explain()
+
+            problems = plan_problems(explained["queryPlanner"]["winningPlan"])
+            self.verdicts[key] = None
+            if problems:
+                message = (
+                    f'Query {key[1]} sorted by {key[2]} on "{key[0]}" uses '
+                    f"{', '.join(problems)}{suggest_index(collection, query, sort)}"
+                )
+                self.verdicts[key] = message
+                if self.mode == "warn":
+                    warn(message, QueryPlanWarning, stacklevel=4)
+
+        verdict = self.verdicts[key]
+        if verdict and self.mode == "raise":
+            raise QueryPlanError(verdict)
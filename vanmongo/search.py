@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from asyncio import Semaphore, gather, get_event_loop
+from concurrent.futures import Executor
+from inspect import iscoroutinefunction
+from typing import Any, Callable, Dict, List, Optional
+
+SearchDocument = Dict[str, Any]
+
+
+def default_make(instance: Any) -> SearchDocument:
+    if not instance._search_fields:
+        raise AssertionError()
+    document: SearchDocument = instance.dict(
+        include=set(["id"] + instance._search_fields)
+    )
+    return document
+
+
+def make_batch(
+    make: Callable[[Any], SearchDocument], instances: List[Any]
+) -> List[SearchDocument]:
+    # Runs in the executor, one call per batch keeps the pickling overhead low
+    return [make(instance) for instance in instances]
+
+
+class SearchMaker:
+    """
+    Builds the search documents of a document class
+
+    make is either sync, async, or cpu_bound: a sync function run on whole
+    batches in the search executor, a process pool by default. make and the
+    documents of cpu_bound makers must be picklable, declared at module level.
+    """
+
+    def __init__(
+        self,
+        make: Callable[[Any], Any] = default_make,
+        cpu_bound: bool = False,
+        concurrency: int = 50,
+    ):
+        if cpu_bound and iscoroutinefunction(make):
+            raise Exception("make must be sync to run in a process pool")
+        self.make = make
+        self.cpu_bound = cpu_bound
+        self.concurrency = concurrency
+
+    async def make_many(
+        self, instances: List[Any], executor: Optional[Executor] = None
+    ) -> List[SearchDocument]:
+        """Search documents of the instances, in the same order"""
+        if self.cpu_bound:
+            return await get_event_loop().run_in_executor(
+                executor, make_batch, self.make, instances
+            )
+
+        if not iscoroutinefunction(self.make):
+            return [self.make(instance) for instance in instances]
+
+        semaphore = Semaphore(self.concurrency)
+
+        async def make(instance: Any) -> SearchDocument:
+            async with semaphore:
+                document: SearchDocument = await self.make(instance)
+                return document
+
+        return list(await gather(*(make(instance) for instance in instances)))
@@ -0,0 +1,48 @@
+import json
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Type
+
+from bson.objectid import ObjectId
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore
+
+
+ENCODERS: Dict[Type[Any], Callable[[Any], Any]] = {
+    ObjectId: str,
+    datetime: datetime.isoformat,
+    date: date.isoformat,
+    set: list,
+    frozenset: list,
+}
+
+
+def register_encoder(type: Type[Any], encoder: Callable[[Any], Any]):
+    """Register how values of a type not supported by JSON are encoded"""
+    ENCODERS[type] = encoder
+
+
+def default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        # Shallow, nested values are encoded on their own
+        return dict(value)
+    for base in type(value).__mro__:
+        encoder = ENCODERS.get(base)
+        if encoder:
+            return encoder(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def to_json_bytes(value: Any) -> bytes:
+    """
+    Encode a value as JSON
+    Uses orjson when installed, documents and connections are encoded with
+    the same keys as pydantic's .json()
+    Non-string dict keys are converted to strings with either encoder
+    """
+    if orjson:
+        return orjson.dumps(value, default=default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=default, separators=(",", ":")).encode()
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+from asyncio import Future, ensure_future, gather
+from collections import deque
+from inspect import isawaitable
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Deque,
+    Generic,
+    List,
+    Optional,
+    TypeVar,
+    Union,
+    overload,
+)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+async def aclose(iterator: AsyncIterator[Any]):
+    # Closing a generator closes the cursor it reads from
+    close = getattr(iterator, "aclose", None)
+    if close:
+        await close()
+
+
+class ResultStream(Generic[T]):
+    """
+    Results of a query, iterated with async for
+
+    Every step pulls from the one before only when it needs another item, so
+    the work in flight stays bounded and the cursor is only read as fast as the
+    results are consumed.
+    Iterations left early are closed, and the cursors they read from, by
+    aclose or when leaving async with.
+    """
+
+    def __init__(self, source: Callable[[], AsyncIterator[T]]):
+        self.__source = source
+        # Kept until closed, async for drops its iterator when left early
+        self.__iterators: List[AsyncIterator[T]] = []
+
+    def __aiter__(self) -> AsyncIterator[T]:
+        iterator = self.__source()
+        self.__iterators.append(iterator)
+        return iterator
+
+    async def aclose(self):
+        """Close the iterations of the stream which are still open"""
+        iterators, self.__iterators = self.__iterators, []
+        for iterator in iterators:
+            await aclose(iterator)
+
+    async def __aenter__(self) -> ResultStream[T]:
+        return self
+
+    async def __aexit__(self, *args):
+        await self.aclose()
+
+    def chunks(self, size: Union[int, Callable[[], int]]) -> ResultStream[List[T]]:
+        """
+        Group results in lists of size items, the last one can be smaller
+        Pass a callable to size every chunk when it is started
+        """
+
+        async def chunks():
+            items = self.__aiter__()
+            try:
+                chunk: List[T] = []
+                limit = size() if callable(size) else size
+                async for item in items:
+                    chunk.append(item)
+                    if len(chunk) >= limit:
+                        yield chunk
+                        chunk = []
+                        limit = size() if callable(size) else size
+                if chunk:
+                    yield chunk
+            finally:
+                await aclose(items)
+
+        return ResultStream(chunks)
+
+    @overload
+    def map(
+        self,
+        fn: Callable[[T], Awaitable[R]],
+        concurrency: int = 1,
+        return_exceptions: bool = False,
+    ) -> ResultStream[R]:
+        ...
+
+    @overload
+    def map(
+        self,
+        fn: Callable[[T], R],
+        concurrency: int = 1,
+        return_exceptions: bool = False,
+    ) -> ResultStream[R]:
+        ...
+
+    def map(
+        self,
+        fn: Callable[[T], Union[R, Awaitable[R]]],
+        concurrency: int = 1,
+        return_exceptions: bool = False,
+    ) -> ResultStream[R]:
+        """
+        Call fn with every result, sync or async, running up to concurrency
+        calls at once. Results keep the order of the stream
+        With return_exceptions errors are returned in place of their result
+        instead of raised
+        """
+
+        async def call(item: T) -> R:
+            result = fn(item)
+            if isawaitable(result):
+                return await result
+            return result
+
+        async def mapped():
+            items = self.__aiter__()
+            pending: Deque[Future] = deque()
+
+            async def next_result():
+                try:
+                    return await pending.popleft()
+                except Exception as error:
+                    if return_exceptions:
+                        return error
+                    raise
+
+            try:
+                async for item in items:
+                    pending.append(ensure_future(call(item)))
+                    if len(pending) >= concurrency:
+                        yield await next_result()
+                while pending:
+                    yield await next_result()
+            finally:
+                for future in pending:
+                    future.cancel()
+                await gather(*pending, return_exceptions=True)
+                await aclose(items)
+
+        return ResultStream(mapped)
+
+    async def to_list(self, max: Optional[int] = None) -> List[T]:
+        """Collect the results, at most max of them"""
+        results: List[T] = []
+        if max == 0:
+            return results
+        items = self.__aiter__()
+        try:
+            async for item in items:
+                results.append(item)
+                if max and len(results) >= max:
+                    break
+        finally:
+            await aclose(items)
+        return results
+
+    async def for_each(
+        self,
+        fn: Callable[[T], Awaitable[Any]],
+        concurrency: int = 1,
+        return_exceptions: bool = False,
+    ) -> List[Exception]:
+        """
+        Await fn with every result, see map
+        With return_exceptions the errors are collected and returned
+        """
+        errors: List[Exception] = []
+        async with self.map(fn, concurrency, return_exceptions) as results:
+            async for result in results:
+                if return_exceptions and isinstance(result, Exception):
+                    errors.append(result)
+        return errors
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+from functools import partial
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional
+
+from pymongo import InsertOne, UpdateOne
+
+from .collection import ConcurrentUpdateError
+from .document import BaseDocument
+from .events import EventType
+from .outbox import OUTBOX_COLLECTION, outbox_entry
+
+if TYPE_CHECKING:
+    from vanmongo import Client
+
+
+class Transaction:
+    """
+    Unit of work collecting the writes of all collections of a client
+
+    Writes are committed together in a single MongoDB transaction, grouped
+    into one bulk write per collection. Events are only triggered after the
+    commit succeeded, events of outbox documents are committed with them.
+    """
+
+    client: Client
+
+    def __init__(self, client: Client):
+        self.client = client
+        self.__operations: Dict[str, List[Any]] = {}
+        self.__updates: Dict[str, int] = {}
+        self.__documents: Dict[str, Dict[str, BaseDocument]] = {}
+        self.__events: List[Callable[[], Awaitable[None]]] = []
+
+    def get(self, collection: str, id: str) -> Optional[BaseDocument]:
+        """Document written earlier in this transaction"""
+        return self.__documents.get(collection, {}).get(id)
+
+    def insert(self, document: BaseDocument, raw: Dict[str, Any]):
+        key = document._collection
+        self.__operations.setdefault(key, []).append(InsertOne(raw))
+        self.__documents.setdefault(key, {})[document.id] = document
+        if document._outbox:
+            self.__record(outbox_entry(EventType.CREATE, document))
+            return
+        self.__events.append(
+            partial(document._trigger_create, document, context=self.client.context)
+        )
+
+    def update(
+        self,
+        document: BaseDocument,
+        update_filter: Dict[str, Any],
+        update: Dict[str, Any],
+        changes: Optional[Dict[str, Any]] = None,
+        previous: Optional[Dict[str, Any]] = None,
+    ):
+        key = document._collection
+        self.__operations.setdefault(key, []).append(UpdateOne(update_filter, update))
+        self.__updates[key] = self.__updates.get(key, 0) + 1
+        self.__documents.setdefault(key, {})[document.id] = document
+        if document._outbox:
+            self.__record(outbox_entry(EventType.UPDATE, document, changes, previous))
+            return
+        self.__events.append(
+            partial(
+                document._trigger_update,
+                document,
+                context=self.client.context,
+                changes=changes,
+                previous=previous,
+            )
+        )
+
+    def __record(self, entry: Dict[str, Any]):
+        # Committed atomically with the documents
+        self.__operations.setdefault(OUTBOX_COLLECTION, []).append(InsertOne(entry))
+
+    async def commit(self):
+        """Write all queued operations atomically"""
+        if not self.__operations:
+            return
+
+        db = self.client.db
+        async with await db.client.start_session() as session:
+            async with session.start_transaction():
+                for key, operations in self.__operations.items():
+                    result = await db[key].bulk_write(operations, session=session)
+                    # Versioned updates don't match after a concurrent write
+                    if result.matched_count < self.__updates.get(key, 0):
+                        raise ConcurrentUpdateError(
+                            f'Documents in "{key}" were modified concurrently'
+                        )
+
+        self.__operations = {}
+        self.__updates = {}
+
+    async def trigger_events(self):
+        events, self.__events = self.__events, []
+        with self.client.events():
+            for event in events:
+                await event()
@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+from asyncio import Queue, ensure_future, gather, to_thread
+from time import perf_counter
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import bson
+from bson import json_util
+from pydantic import BaseModel
+from pymongo.errors import BulkWriteError
+
+from .collection import Collection
+
+FORMATS = ("ndjson", "bson")
+DUPLICATE_KEY_ERROR = 11000
+
+
+class TransferStats(BaseModel):
+    """Progress of an export or import"""
+
+    """Documents exported or inserted"""
+    documents: int = 0
+    """Documents skipped by an import as they already exist"""
+    duplicates: int = 0
+    seconds: float = 0
+    """Byte offset up to which the file has been completely processed"""
+    offset: int = 0
+
+    @property
+    def docs_per_second(self) -> float:
+        return self.documents / self.seconds if self.seconds else 0
+
+
+class TransferError(Exception):
+    """Import failed, resume from stats.offset"""
+
+    def __init__(self, message: str, stats: TransferStats):
+        super().__init__(message)
+        self.stats = stats
+
+
+def check_format(format: str):
+    if format not in FORMATS:
+        raise Exception(f'Unknown format "{format}", expected one of {FORMATS}')
+
+
+def encode(raw: Dict[str, Any], format: str) -> bytes:
+    if format == "bson":
+        return bson.encode(raw)
+    # Extended JSON keeps ObjectIds and dates
+    return (
+        json_util.dumps(raw, json_options=json_util.RELAXED_JSON_OPTIONS) + "\n"
+    ).encode()
+
+
+def read_records(file: IO[bytes], format: str) -> Iterator[Tuple[Dict[str, Any], int]]:
+    """Raw documents with the byte offset right after them"""
+    offset = file.tell()
+    raw: Dict[str, Any]
+    while True:
+        if format == "bson":
+            size_bytes = file.read(4)
+            if not size_bytes:
+                return
+            data = size_bytes + file.read(int.from_bytes(size_bytes, "little") - 4)
+            raw = bson.decode(data)
+        else:
+            data = file.readline()
+            if not data:
+                return
+            if not data.strip():
+                offset += len(data)
+                continue
+            raw = json_util.loads(data.decode())
+        offset += len(data)
+        yield raw, offset
+
+
+def read_batch(
+    records: Iterator[Tuple[Dict[str, Any], int]], batch_size: int
+) -> Tuple[List[Dict[str, Any]], int]:
+    """Up to batch_size raw documents with the byte offset right after them"""
+    batch: List[Dict[str, Any]] = []
+    end = 0
+    for raw, end in records:
+        batch.append(raw)
+        if len(batch) >= batch_size:
+            break
+    return batch, end
+
+
+def write_batch(file: IO[bytes], batch: List[Dict[str, Any]], format: str) -> int:
+    return file.write(b"".join(encode(raw, format) for raw in batch))
+
+
+async def export_documents(
+    collection: Collection,
+    path: str,
+    format: str = "ndjson",
+    query: Dict[str, Any] = {},
+    batch_size: int = 1000,
+) -> TransferStats:
+    """
+    Stream the raw documents of a collection to a NDJSON or BSON file
+    Documents are written as stored, without validation
+    """
+    check_format(format)
+
+    stats = TransferStats()
+    start = perf_counter()
+    # Encoding and file I/O run in a thread, the loop keeps serving requests
+    file = await to_thread(open, path, "wb")
+    try:
+        cursor = collection.collection.find(query, batch_size=batch_size)
+        batch: List[Dict[str, Any]] = []
+        async for raw in cursor.sort("_id"):
+            batch.append(raw)
+            if len(batch) >= batch_size:
+                stats.offset += await to_thread(write_batch, file, batch, format)
+                stats.documents += len(batch)
+                batch = []
+        if batch:
+            stats.offset += await to_thread(write_batch, file, batch, format)
+            stats.documents += len(batch)
+    finally:
+        await to_thread(file.close)
+    stats.seconds = perf_counter() - start
+    return stats
+
+
+async def import_documents(
+    collection: Collection,
+    path: str,
+    format: str = "ndjson",
+    batch_size: int = 1000,
+    workers: int = 4,
+    offset: int = 0,
+    on_progress: Optional[Callable[[TransferStats], Any]] = None,
+) -> TransferStats:
+    """
+    Insert the documents of an exported file in batches
+    id, _id and timestamps are preserved and documents that already exist are
+    skipped and counted as duplicates, so a failed import can be resumed from
+    TransferError.stats.offset
+    """
+    check_format(format)
+
+    stats = TransferStats(offset=offset)
+    start = perf_counter()
+
+    queue: Queue = Queue(maxsize=workers * 2)
+    completed: Dict[int, Tuple[int, int, int]] = {}
+    next_sequence = 0
+
+    def complete(sequence: int, inserted: int, duplicates: int, end: int):
+        nonlocal next_sequence
+        completed[sequence] = (inserted, duplicates, end)
+        # Only advance the offset over batches completed without gaps
+        while next_sequence in completed:
+            inserted, duplicates, end = completed.pop(next_sequence)
+            stats.documents += inserted
+            stats.duplicates += duplicates
+            stats.offset = end
+            next_sequence += 1
+        stats.seconds = perf_counter() - start
+        if on_progress:
+            on_progress(stats)
+
+    async def worker():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            sequence, batch, end = item
+            try:
+                await collection.collection.insert_many(batch, ordered=False)
+            except BulkWriteError as error:
+                errors = error.details.get("writeErrors", [])
+                if any(e.get("code") != DUPLICATE_KEY_ERROR for e in errors):
+                    raise
+                complete(sequence, error.details["nInserted"], len(errors), end)
+                continue
+            complete(sequence, len(batch), 0, end)
+
+    async def read():
+        # Reading and decoding run in a thread, the loop keeps serving requests
+        file = await to_thread(open, path, "rb")
+        try:
+            file.seek(offset)
+            records = read_records(file, format)
+            sequence = 0
+            while True:
+                batch, end = await to_thread(read_batch, records, batch_size)
+                if not batch:
+                    break
+                await queue.put((sequence, batch, end))
+                sequence += 1
+        finally:
+            await to_thread(file.close)
+        for _ in range(workers):
+            await queue.put(None)
+
+    tasks = [ensure_future(read())] + [ensure_future(worker()) for _ in range(workers)]
+    try:
+        await gather(*tasks)
+    except Exception as error:
+        for task in tasks:
+            task.cancel()
+        await gather(*tasks, return_exceptions=True)
+        stats.seconds = perf_counter() - start
+        raise TransferError(f"Import failed: {error}", stats) from error
+
+    stats.seconds = perf_counter() - start
+    return stats